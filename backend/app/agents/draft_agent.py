@@ -1,6 +1,8 @@
 from .base_agent import BaseAgent
 from openai import AsyncOpenAI
 from app.core.config import settings
+from app.core.deadline import llm_timeout
+from app.services.resilience import dependencies
 import logging
 
 logger = logging.getLogger(__name__)
@@ -11,7 +13,7 @@ class DraftAgent(BaseAgent):
     
     def __init__(self, model: str = "gpt-4o", temperature: float = None):
         super().__init__(model, temperature or settings.DRAFT_TEMPERATURE)
-        self.client = AsyncOpenAI()
+        self.client = AsyncOpenAI(max_retries=0)  # Retried by dependencies["openai"]
     
     async def execute(self, topic: str, **kwargs) -> str:
         """Generate a draft essay on the given topic"""
@@ -31,8 +33,10 @@ Your essay should:
 Write the complete essay now."""
         
         try:
-            response = await self.client.chat.completions.create(
+            response = await dependencies["openai"].call(
+                self.client.chat.completions.create,
                 model=self.model,
+                timeout=llm_timeout(),
                 messages=[{"role": "user", "content": prompt}],
                 temperature=self.temperature,
             )
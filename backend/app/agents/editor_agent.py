@@ -1,22 +1,14 @@
 from .base_agent import BaseAgent
+from .patch_revision import PatchRevisionMixin
 from openai import AsyncOpenAI
 from app.core.config import settings
+from app.core.deadline import llm_timeout
+from app.services.resilience import dependencies
 import logging
 
 logger = logging.getLogger(__name__)
 
-
-class EditorAgent(BaseAgent):
-    """Agent for editing and polishing content (from Q5)"""
-    
-    def __init__(self, model: str = "gpt-4o", temperature: float = None):
-        super().__init__(model, temperature or settings.EDITOR_TEMPERATURE)
-        self.client = AsyncOpenAI()
-    
-    async def execute(self, task: str, **kwargs) -> str:
-        """Execute editorial task"""
-        
-        system_prompt = """You are an expert editor agent specialized in reflecting on, critiquing, and improving written content.
+SYSTEM_PROMPT = """You are an expert editor agent specialized in reflecting on, critiquing, and improving written content.
 
 Your responsibilities include:
 - Providing constructive, detailed feedback on drafts
@@ -31,12 +23,26 @@ Your responsibilities include:
 **CRITICAL: Always provide feedback and edits in the SAME LANGUAGE as the input text** (French text -> French feedback, English text -> English feedback, etc.).
 
 Your feedback should be specific, actionable, and focused on elevating the quality of the work to publication standards."""
+
+
+class EditorAgent(PatchRevisionMixin, BaseAgent):
+    """Agent for editing and polishing content (from Q5)"""
+    
+    def __init__(self, model: str = "gpt-4o", temperature: float = None, revision_mode: str = None):
+        super().__init__(model, temperature or settings.EDITOR_TEMPERATURE)
+        self.client = AsyncOpenAI(max_retries=0)  # Retried by dependencies["openai"]
+        self.revision_mode = revision_mode
+    
+    async def execute(self, task: str, **kwargs) -> str:
+        """Execute editorial task"""
         
         try:
-            response = await self.client.chat.completions.create(
+            response = await dependencies["openai"].call(
+                self.client.chat.completions.create,
                 model=self.model,
+                timeout=llm_timeout(),
                 messages=[
-                    {"role": "system", "content": system_prompt},
+                    {"role": "system", "content": SYSTEM_PROMPT},
                     {"role": "user", "content": task}
                 ],
                 temperature=self.temperature,
@@ -49,3 +55,28 @@ Your feedback should be specific, actionable, and focused on elevating the quali
         except Exception as e:
             logger.error(f"Editor agent error: {e}")
             raise
+    
+    async def revise(self, text: str, instructions: str, mode: str = None) -> str:
+        """Return an edited version of text (full rewrite, or targeted edits in patch mode)"""
+        
+        result = await self.revise_document(text, instructions, mode=mode)
+        self.log_execution(instructions, result)
+        return result
+    
+    async def _full_revision(self, text: str, instructions: str):
+        response = await dependencies["openai"].call(
+            self.client.chat.completions.create,
+            model=self.model,
+            timeout=llm_timeout(),
+            messages=self._edit_messages(
+                f"{instructions}\n\nText:\n{text}\n\nReturn only the complete edited text, without commentary."
+            ),
+            temperature=self.temperature,
+        )
+        return response.choices[0].message.content, getattr(response, "usage", None)
+    
+    def _edit_messages(self, content: str) -> list:
+        return [
+            {"role": "system", "content": SYSTEM_PROMPT},
+            {"role": "user", "content": content}
+        ]
@@ -0,0 +1,112 @@
+from app.core.config import settings
+from app.core.deadline import llm_timeout
+from app.services.resilience import dependencies
+from app.services.metrics_service import metrics_service
+from app.utils import apply_edits, PatchError
+from abc import ABC, abstractmethod
+import json
+import time
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Structured output for patch mode: a list of targeted edits instead of the full text
+EDITS_FORMAT = {
+    "type": "json_schema",
+    "json_schema": {
+        "name": "document_edits",
+        "strict": True,
+        "schema": {
+            "type": "object",
+            "properties": {
+                "edits": {
+                    "type": "array",
+                    "items": {
+                        "type": "object",
+                        "properties": {
+                            "kind": {"type": "string", "enum": ["section", "replace"]},
+                            "anchor": {"type": "string"},
+                            "replacement": {"type": "string"}
+                        },
+                        "required": ["kind", "anchor", "replacement"],
+                        "additionalProperties": False
+                    }
+                }
+            },
+            "required": ["edits"],
+            "additionalProperties": False
+        }
+    }
+}
+
+EDITS_INSTRUCTIONS = """Do NOT rewrite the whole document. Return only the targeted edits needed, as JSON:
+- {"kind": "section", "anchor": "<exact heading text>", "replacement": "<the complete new section, heading included>"} to rewrite a whole section
+- {"kind": "replace", "anchor": "<passage copied verbatim, occurring once>", "replacement": "<new passage>"} for smaller changes
+Anchors must be copied exactly from the document. Keep the document's language. Return {"edits": []} if nothing needs to change."""
+
+
+class PatchRevisionMixin(ABC):
+    """
+    Patch-based revision for agents that rewrite a document (REVISION_MODE="patch").
+    
+    The model returns targeted edits that are validated and applied locally, so output
+    tokens scale with the changes rather than the document. Agents provide
+    _full_revision(text, instructions) as the fallback when edits do not apply.
+    """
+    
+    revision_mode: str = None
+    
+    async def revise_document(self, text: str, instructions: str, mode: str = None) -> str:
+        """Revise text following instructions, as targeted edits or a full rewrite"""
+        
+        mode = mode or self.revision_mode or settings.REVISION_MODE
+        start = time.perf_counter()
+        
+        if mode == "patch":
+            try:
+                revised, usage, edit_count = await self._patch_revision(text, instructions)
+                self._record_revision("patch", start, usage, edits=edit_count)
+                return revised
+            except (PatchError, json.JSONDecodeError, KeyError, TypeError) as e:
+                logger.warning(f"{self.__class__.__name__} edits did not apply ({e}); falling back to full rewrite")
+        
+        revised, usage = await self._full_revision(text, instructions)
+        self._record_revision("full" if mode != "patch" else "patch_fallback", start, usage)
+        return revised
+    
+    async def _patch_revision(self, text: str, instructions: str):
+        response = await dependencies["openai"].call(
+            self.client.chat.completions.create,
+            model=self.model,
+            timeout=llm_timeout(),
+            messages=self._edit_messages(
+                f"{self._edit_request(instructions)}\n\nDocument:\n{text}\n\n{EDITS_INSTRUCTIONS}"
+            ),
+            temperature=self.temperature,
+            response_format=EDITS_FORMAT,
+        )
+        edits = json.loads(response.choices[0].message.content)["edits"]
+        return apply_edits(text, edits), getattr(response, "usage", None), len(edits)
+    
+    @abstractmethod
+    async def _full_revision(self, text: str, instructions: str):
+        """Full rewrite; returns (revised text, usage)"""
+        pass
+    
+    def _edit_request(self, instructions: str) -> str:
+        return instructions
+    
+    def _edit_messages(self, content: str) -> list:
+        return [{"role": "user", "content": content}]
+    
+    def _record_revision(self, mode: str, start: float, usage, **fields):
+        completion_tokens = getattr(usage, "completion_tokens", None)
+        if isinstance(completion_tokens, int):
+            fields["completion_tokens"] = completion_tokens
+        # One stage per mode so /metrics/stages compares output tokens and latency directly
+        metrics_service.record_stage(
+            f"revision_{mode}",
+            agent=self.__class__.__name__,
+            duration_ms=round((time.perf_counter() - start) * 1000, 1),
+            **fields
+        )
@@ -1,6 +1,8 @@
 from .base_agent import BaseAgent
 from openai import AsyncOpenAI
 from app.core.config import settings
+from app.core.deadline import llm_timeout
+from app.services.hedging import hedging
 import ast
 import json
 import logging
@@ -13,7 +15,7 @@ class PlannerAgent(BaseAgent):
     
     def __init__(self, model: str = "gpt-4o-mini", temperature: float = None):
         super().__init__(model, temperature or settings.PLANNER_TEMPERATURE)
-        self.client = AsyncOpenAI()
+        self.client = AsyncOpenAI(max_retries=0)  # Retried by dependencies["openai"]
     
     async def execute(self, topic: str, **kwargs) -> list:
         """Generate a research plan as a list of steps"""
@@ -41,8 +43,11 @@ Topic: "{topic}"
 """
         
         try:
-            response = await self.client.chat.completions.create(
+            response = await hedging.call(
+                "planner",
+                self.client.chat.completions.create,
                 model=self.model,
+                timeout=llm_timeout(),
                 messages=[{"role": "user", "content": user_prompt}],
                 temperature=self.temperature,
             )
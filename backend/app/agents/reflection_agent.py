@@ -1,6 +1,8 @@
 from .base_agent import BaseAgent
 from openai import AsyncOpenAI
 from app.core.config import settings
+from app.core.deadline import llm_timeout
+from app.services.resilience import dependencies
 import logging
 
 logger = logging.getLogger(__name__)
@@ -11,7 +13,7 @@ class ReflectionAgent(BaseAgent):
     
     def __init__(self, model: str = "gpt-4o-mini", temperature: float = None):
         super().__init__(model, temperature or settings.REFLECTION_TEMPERATURE)
-        self.client = AsyncOpenAI()
+        self.client = AsyncOpenAI(max_retries=0)  # Retried by dependencies["openai"]
     
     async def execute(self, draft: str, **kwargs) -> str:
         """Provide constructive feedback on a draft"""
@@ -54,8 +56,10 @@ Please analyze this essay critically and provide feedback addressing the followi
 Provide your feedback in paragraph form, being critical but constructive. Focus on specific issues and suggest concrete improvements."""
         
         try:
-            response = await self.client.chat.completions.create(
+            response = await dependencies["openai"].call(
+                self.client.chat.completions.create,
                 model=self.model,
+                timeout=llm_timeout(),
                 messages=[{"role": "user", "content": prompt}],
                 temperature=self.temperature,
             )
@@ -1,6 +1,9 @@
 from .base_agent import BaseAgent
 from openai import AsyncOpenAI
 from app.core.config import settings
+from app.core.deadline import DeadlineExceeded, llm_timeout, remaining, run_stage
+from app.services.resilience import call_tool, dependencies
+from app.tools.prefetch import ToolPrefetcher
 from datetime import datetime
 import asyncio
 import json
@@ -14,11 +17,26 @@ class ResearchAgent(BaseAgent):
     
     def __init__(self, model: str = "gpt-4o", temperature: float = None):
         super().__init__(model, temperature or settings.RESEARCH_TEMPERATURE)
-        self.client = AsyncOpenAI()
+        self.client = AsyncOpenAI(max_retries=0)  # Retried by dependencies["openai"]
         self.collected_sources: list = []
+        self.timed_out_tools: list = []  # Tools cut off by their deadline share (the report is partial)
     
-    async def execute(self, task: str, tools: list = None, tool_func_mapping: dict = None, **kwargs) -> str:
-        """Execute research task using available tools with full execution support"""
+    async def execute(
+        self,
+        task: str,
+        tools: list = None,
+        tool_func_mapping: dict = None,
+        prefetch_query: str = None,
+        prefetch: ToolPrefetcher = None,
+        **kwargs
+    ) -> str:
+        """
+        Execute research task using available tools with full execution support.
+        
+        With TOOL_PREFETCH enabled, the search tools start on prefetch_query (default: the
+        task, if short) concurrently with the first completion. A prefetcher that is
+        already running (e.g. started during planning) can be passed in instead.
+        """
         
         # Setup tools and functions
         if tools is None:
@@ -62,20 +80,31 @@ Instructions:
         # Reset sources for this execution
         self.collected_sources = []
         
+        prefetch_query = prefetch_query or (task if len(task) <= 300 else None)
+        if prefetch is None and tools and tool_func_mapping and settings.TOOL_PREFETCH and prefetch_query:
+            prefetch = ToolPrefetcher(
+                tool_func_mapping,
+                prefetch_query,
+                [t.get("function", {}).get("name") for t in tools]
+            )
+            prefetch.start()
+        tool_call_count = 0
+        
         try:
             messages = [{"role": "user", "content": prompt}]
             
             # First API call - may return tool_calls
             kwargs_api = {
                 "model": self.model,
-                "messages": messages
+                "messages": messages,
+                "timeout": llm_timeout()
             }
             if tools:
                 kwargs_api["tools"] = tools
                 kwargs_api["tool_choice"] = "auto"
             
             # Get initial response
-            response = await self.client.chat.completions.create(**kwargs_api)
+            response = await dependencies["openai"].call(self.client.chat.completions.create, **kwargs_api)
             message = response.choices[0].message
             
             # If tools were used, need to execute them manually (SDK doesn't auto-execute)
@@ -95,13 +124,16 @@ Instructions:
                 })
                 
                 # Execute each tool call
+                tool_call_count = len(message.tool_calls)
                 for tool_call in message.tool_calls:
                     func_name = tool_call.function.name
                     func_args = json.loads(tool_call.function.arguments)
                     
                     if func_name in tool_func_mapping:
                         tool_func = tool_func_mapping[func_name]
-                        tool_result = await asyncio.to_thread(tool_func, **func_args)
+                        tool_result = await prefetch.take(func_name, func_args) if prefetch else None
+                        if tool_result is None:
+                            tool_result = await self._call_tool(func_name, tool_func, func_args)
                         # Collect sources from tool results
                         if isinstance(tool_result, list):
                             for item in tool_result:
@@ -117,8 +149,10 @@ Instructions:
                         })
                 
                 # Get final response after tool execution
-                final_response = await self.client.chat.completions.create(
+                final_response = await dependencies["openai"].call(
+                    self.client.chat.completions.create,
                     model=self.model,
+                    timeout=llm_timeout(),
                     messages=messages
                 )
                 result = final_response.choices[0].message.content
@@ -131,4 +165,23 @@ Instructions:
         except Exception as e:
             logger.error(f"Research agent error: {e}")
             raise
-
+        finally:
+            if prefetch:
+                prefetch.finish(tool_calls=tool_call_count)
+    
+    async def _call_tool(self, func_name: str, tool_func, func_args: dict):
+        """
+        Run one tool call within DEADLINE_TOOL_SHARE of the remaining time.
+        
+        Bulkheaded per tool; worker threads cannot be cancelled, so a hung tool is
+        abandoned at its share and the model gets an error result, keeping the rest
+        of the run's time for the other tools and the write-up.
+        """
+        left = remaining()
+        reserve = left * (1 - settings.DEADLINE_TOOL_SHARE) if left else 0.0
+        try:
+            return await run_stage(call_tool(tool_func, **func_args), func_name, reserve=reserve)
+        except DeadlineExceeded:
+            logger.warning(f"{func_name} timed out; continuing with the other sources")
+            self.timed_out_tools.append(func_name)
+            return [{"error": f"{func_name} timed out; use another source"}]
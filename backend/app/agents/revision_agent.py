@@ -1,22 +1,80 @@
 from .base_agent import BaseAgent
+from .patch_revision import PatchRevisionMixin
 from openai import AsyncOpenAI
 from app.core.config import settings
+from app.core.deadline import llm_timeout
+from app.services.resilience import dependencies
+from typing import AsyncGenerator
 import logging
 
 logger = logging.getLogger(__name__)
 
 
-class RevisionAgent(BaseAgent):
+class RevisionAgent(PatchRevisionMixin, BaseAgent):
     """Agent for revising drafts based on feedback (from Q2)"""
     
-    def __init__(self, model: str = "gpt-4o", temperature: float = None):
+    def __init__(self, model: str = "gpt-4o", temperature: float = None, revision_mode: str = None):
         super().__init__(model, temperature or settings.REVISION_TEMPERATURE)
-        self.client = AsyncOpenAI()
+        self.client = AsyncOpenAI(max_retries=0)  # Retried by dependencies["openai"]
+        self.revision_mode = revision_mode
     
     async def execute(self, original_draft: str, reflection: str, **kwargs) -> str:
-        """Revise a draft based on feedback"""
+        """Revise a draft based on feedback (full rewrite, or targeted edits in patch mode)"""
         
-        prompt = f"""You are an expert essay writer tasked with revising an essay based on constructive feedback.
+        try:
+            result = await self.revise_document(original_draft, reflection, mode=kwargs.get("mode"))
+            self.log_execution("Revision of draft", result)
+            return result
+            
+        except Exception as e:
+            logger.error(f"Revision agent error: {e}")
+            raise
+    
+    async def _full_revision(self, original_draft: str, reflection: str):
+        response = await dependencies["openai"].call(
+            self.client.chat.completions.create,
+            model=self.model,
+            timeout=llm_timeout(),
+            messages=[{"role": "user", "content": self._build_prompt(original_draft, reflection)}],
+            temperature=self.temperature,
+        )
+        return response.choices[0].message.content, getattr(response, "usage", None)
+    
+    def _edit_request(self, reflection: str) -> str:
+        return f"""You are an expert essay writer revising an essay based on constructive feedback.
+
+Feedback and Critique:
+{reflection}
+
+Address all issues mentioned in the feedback while maintaining the original topic and intent."""
+    
+    async def stream(self, original_draft: str, reflection: str) -> AsyncGenerator[str, None]:
+        """Revise a draft, yielding the revised text as it is generated"""
+        
+        prompt = self._build_prompt(original_draft, reflection)
+        
+        try:
+            response = await dependencies["openai"].call(
+                self.client.chat.completions.create,
+                model=self.model,
+                timeout=llm_timeout(),
+                messages=[{"role": "user", "content": prompt}],
+                temperature=self.temperature,
+                stream=True,
+            )
+            
+            async for chunk in response:
+                if chunk.choices and chunk.choices[0].delta.content:
+                    yield chunk.choices[0].delta.content
+            
+        except Exception as e:
+            logger.error(f"Revision agent stream error: {e}")
+            raise
+    
+    def _build_prompt(self, original_draft: str, reflection: str) -> str:
+        """Build the revision prompt"""
+        
+        return f"""You are an expert essay writer tasked with revising an essay based on constructive feedback.
 
 Original Essay Draft:
 {original_draft}
@@ -37,18 +95,3 @@ Your task is to rewrite the essay, incorporating all the feedback provided above
 **CRITICAL: Write the revision in the SAME LANGUAGE as the original essay** (French essay -> French revision, English essay -> English revision, etc.).
 
 Write the complete revised essay now. Output only the final revised essay, without any meta-commentary or explanations."""
-        
-        try:
-            response = await self.client.chat.completions.create(
-                model=self.model,
-                messages=[{"role": "user", "content": prompt}],
-                temperature=self.temperature,
-            )
-            
-            result = response.choices[0].message.content
-            self.log_execution("Revision of draft", result)
-            return result
-            
-        except Exception as e:
-            logger.error(f"Revision agent error: {e}")
-            raise
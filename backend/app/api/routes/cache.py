@@ -1,5 +1,8 @@
-from fastapi import APIRouter
+from fastapi import APIRouter, HTTPException
+from app.models.schemas import CacheWarmRequest
 from app.services.cache_service import cache_service
+from app.workflows.cache_warmer import WarmupError, cache_warmer
+from app.workflows.revalidation import revalidator
 from typing import Dict, Any
 import logging
 
@@ -10,7 +13,38 @@ logger = logging.getLogger(__name__)
 @router.get("/stats", response_model=Dict[str, Any])
 async def get_cache_stats():
     """Get cache statistics"""
-    return cache_service.get_cache_stats()
+    stats = cache_service.get_cache_stats()
+    if stats.get("enabled"):
+        stats["revalidation"] = revalidator.snapshot()
+    return stats
+
+
+@router.post("/warm", status_code=202)
+async def start_cache_warmup(request: CacheWarmRequest):
+    """Warm the cache in the background with a topic list or the most requested topics"""
+    try:
+        cache_warmer.start(
+            topics=request.topics,
+            workflow_type=request.workflow_type,
+            limit=request.limit,
+            refresh=request.refresh,
+            concurrency=request.concurrency
+        )
+    except WarmupError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    return cache_warmer.status()
+
+
+@router.get("/warm")
+async def get_cache_warmup_status():
+    """Progress of the current (or last) cache warm-up"""
+    return cache_warmer.status()
+
+
+@router.delete("/warm")
+async def cancel_cache_warmup():
+    """Stop the running cache warm-up (finished topics stay cached)"""
+    return {"cancelled": cache_warmer.cancel()}
 
 
 @router.delete("/{topic_hash}")
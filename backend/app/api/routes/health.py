@@ -1,6 +1,9 @@
 from fastapi import APIRouter
 from app.models.schemas import HealthResponse
 from app.core.config import settings
+from app.services.resilience import dependencies
+from app.services.admission import admission_controller
+from app.services.hedging import hedging
 from datetime import datetime
 
 router = APIRouter()
@@ -32,3 +35,17 @@ async def health_check():
         tools_available=tools_available,
         models_configured=models_configured
     )
+
+
+@router.get("/health/dependencies")
+async def dependency_health():
+    """Circuit breaker state, bulkhead occupancy and rejection counts per external dependency"""
+    
+    return {"dependencies": dependencies.snapshot(), "hedging": hedging.snapshot()}
+
+
+@router.get("/health/admission")
+async def admission_health():
+    """Workflow admission: current limit, runs in flight, queue depth and rejections"""
+    
+    return {"admission": admission_controller.snapshot()}
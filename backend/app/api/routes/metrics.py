@@ -10,6 +10,18 @@ async def get_metrics_summary():
     return metrics_service.get_summary()
 
 
+@router.get("/streaming")
+async def get_streaming_metrics():
+    """Get SSE delivery metrics (time-to-first-byte, queue depth, coalescing)"""
+    return metrics_service.get_stream_summary()
+
+
+@router.get("/stages")
+async def get_stage_metrics():
+    """Get per-stage measurements (render latency, tokens, cache and prefetch hit rates)"""
+    return metrics_service.get_stage_summary()
+
+
 @router.delete("/")
 async def reset_metrics():
     """Reset all metrics (delete metrics.json)"""
@@ -1,85 +1,327 @@
 import asyncio
 import json
 import logging
-from typing import AsyncGenerator
+import math
+import time
+from collections import deque
+from app.core import deadline
+from app.core.config import settings
+from app.core.deadline import DeadlineExceeded, deadline_scope, run_stage
+from app.services.admission import AdmissionRejected, AdmissionTicket, admission_controller
+from app.services.metrics_service import metrics_service
+from app.workflows.convergence import ConvergenceDetector
+from app.workflows.pipeline import SectionPipeline
+from typing import AsyncGenerator, NamedTuple, Optional, Dict, Any
 
 logger = logging.getLogger(__name__)
 
-async def stream_workflow_progress(workflow_type: str, topic: str, workflow_func, cache_service, **kwargs) -> AsyncGenerator[str, None]:
+
+def parse_sse_event(event: str) -> Optional[Dict[str, Any]]:
+    """Decode a "data: {...}" SSE frame back into its JSON payload (None for comments/invalid frames)"""
+    event_str = event.strip()
+    if not event_str.startswith("data: "):
+        return None
+    try:
+        payload = json.loads(event_str[6:])
+    except json.JSONDecodeError:
+        return None
+    return payload if isinstance(payload, dict) else None
+
+
+class EventChannel:
+    """
+    Bounded queue between the workflow producer and the SSE writer.
+    
+    Slow-consumer policy: when the queue is full, pending "progress" events are
+    coalesced (only the newest survives) and a new "progress" event never blocks
+    the workflow; all other events apply backpressure until the writer catches up.
+    """
+    
+    def __init__(self, maxsize: int):
+        self.maxsize = max(1, maxsize)
+        self._events: deque = deque()
+        self._cond = asyncio.Condition()
+        self._closed = False
+        self.max_depth = 0
+        self.coalesced = 0
+    
+    def __len__(self) -> int:
+        return len(self._events)
+    
+    async def put(self, frame: str, event_type: Optional[str] = None):
+        async with self._cond:
+            if event_type == "progress" and len(self._events) >= self.maxsize:
+                pending = [e for e in self._events if e[0] == "progress"]
+                for item in pending:
+                    self._events.remove(item)
+                self.coalesced += len(pending)
+                if len(self._events) >= self.maxsize:
+                    self.coalesced += 1
+                    return
+            else:
+                await self._cond.wait_for(lambda: len(self._events) < self.maxsize)
+            self._events.append((event_type, frame))
+            self.max_depth = max(self.max_depth, len(self._events))
+            self._cond.notify_all()
+    
+    async def get(self) -> Optional[str]:
+        """Next frame, or None once the producer closed the channel and it is drained"""
+        async with self._cond:
+            await self._cond.wait_for(lambda: self._events or self._closed)
+            if not self._events:
+                return None
+            _, frame = self._events.popleft()
+            self._cond.notify_all()
+            return frame
+    
+    async def close(self):
+        async with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+
+
+class AdmittedRun(NamedTuple):
+    """Outcome of admit_stream(): a cache entry to replay, or a held run slot"""
+    cache_key: Optional[str]
+    ticket: Optional[AdmissionTicket]
+
+
+def _speculates(workflow_type: str) -> bool:
+    return workflow_type == "multi_agent" and settings.SPECULATIVE_PLANNING
+
+
+async def admit_stream(workflow_type: str, topic: str, workflow_func, cache_service) -> AdmittedRun:
+    """
+    Cache lookup + admission before a streaming response starts, so an overloaded
+    server can still answer 503. Cache hits bypass admission.
+    
+    Raises AdmissionRejected when no run slot is available.
+    """
+    speculating = _speculates(workflow_type)
+    if speculating:
+        with deadline_scope(settings.REQUEST_TIMEOUT):
+            workflow_func.speculate(topic)
+    try:
+        cache_key = await asyncio.to_thread(cache_service.find_cached_entry, topic, workflow_type)
+        if cache_key:
+            if speculating:
+                workflow_func.cancel_speculation()
+            return AdmittedRun(cache_key, None)
+        return AdmittedRun(None, await admission_controller.acquire(workflow_type))
+    except BaseException:
+        if speculating:
+            workflow_func.cancel_speculation()
+        raise
+
+
+async def stream_workflow_progress(workflow_type: str, topic: str, workflow_func, cache_service, admitted: Optional[AdmittedRun] = None, **kwargs) -> AsyncGenerator[str, None]:
     """
     Stream workflow execution progress as SSE events with cache awareness.
     
+    The workflow runs in a background task feeding a bounded EventChannel; this
+    generator only drains the channel, emitting ": keepalive" comments whenever
+    nothing arrived for STREAM_HEARTBEAT_SECONDS so idle proxies keep the connection.
+    
+    `admitted` carries the result of admit_stream(); without it the cache lookup and
+    admission happen inside the stream (rejections become an error event).
+    
     Yields JSON events: {"type": "status", "data": {...}}
     """
+    started = time.monotonic()
+    ttfb = None
+    keepalives = 0
+    metrics_service.record_topic(workflow_type.replace("-", "_"), topic)
+    channel = EventChannel(settings.STREAM_QUEUE_SIZE)
+    # The producer task inherits the run deadline (contextvars are copied at task creation)
+    with deadline_scope(settings.REQUEST_TIMEOUT):
+        producer = asyncio.create_task(
+            _produce_workflow_events(channel, workflow_type, topic, workflow_func, cache_service, admitted, **kwargs)
+        )
+    
+    try:
+        while True:
+            try:
+                frame = await asyncio.wait_for(channel.get(), timeout=settings.STREAM_HEARTBEAT_SECONDS)
+            except asyncio.TimeoutError:
+                keepalives += 1
+                yield ": keepalive\n\n"
+                continue
+            if frame is None:
+                break
+            if ttfb is None:
+                ttfb = time.monotonic() - started
+            yield frame
+    finally:
+        # Client went away (or stream finished): stop the workflow instead of running it headless
+        if not producer.done():
+            producer.cancel()
+        metrics_service.track_stream(
+            workflow_type=workflow_type,
+            ttfb=ttfb,
+            duration=time.monotonic() - started,
+            max_queue_depth=channel.max_depth,
+            coalesced_events=channel.coalesced,
+            keepalives=keepalives
+        )
+
+
+async def _produce_workflow_events(channel: EventChannel, workflow_type: str, topic: str, workflow_func, cache_service, admitted: Optional[AdmittedRun] = None, **kwargs):
+    """Run the workflow (or replay the cache) and push its SSE frames into the channel"""
+    
+    async def emit(frame: str) -> Optional[Dict[str, Any]]:
+        event_data = parse_sse_event(frame)
+        await channel.put(frame, event_data.get("type") if event_data else None)
+        return event_data
+    
+    speculating = False
+    cancelled = False
+    ticket = admitted.ticket if admitted else None
     try:
         # Start event
-        yield "data: " + json.dumps({
+        await emit("data: " + json.dumps({
             "type": "start",
             "workflow_type": workflow_type,
             "topic": topic
-        }) + "\n\n"
+        }) + "\n\n")
         
-        await asyncio.sleep(0.1)  # Ensure client receives start
-        
-        # Check cache first
-        cached_result = cache_service.get_cached_result(topic, workflow_type.replace("-", "_"))
-        if cached_result:
-            # Cache hit - send full result immediately
-            yield "data: " + json.dumps({
-                "type": "cache_hit",
-                "data": cached_result
-            }) + "\n\n"
+        if admitted is not None:
+            # Looked up (and admitted) by admit_stream() before the response started
+            cache_key = admitted.cache_key
+            speculating = _speculates(workflow_type) and ticket is not None
+        else:
+            # Multi-agent: plan (and search the topic) while the cache lookup is in flight
+            speculating = _speculates(workflow_type)
+            if speculating:
+                workflow_func.speculate(topic)
             
-            yield "data: " + json.dumps({"type": "complete"}) + "\n\n"
-            return
+            # Check cache first (off the event loop, so speculative work can progress)
+            cache_key = await asyncio.to_thread(cache_service.find_cached_entry, topic, workflow_type.replace("-", "_"))
+        if cache_key:
+            if speculating:
+                workflow_func.cancel_speculation()
+            replayed = False
+            async for event in stream_cached_result(cache_service, cache_key):
+                await emit(event)
+                replayed = True
+            if replayed:
+                await emit("data: " + json.dumps({"type": "complete"}) + "\n\n")
+                return
         
-        # Cache miss - stream workflow execution
+        # Cache miss - stream workflow execution once a run slot is free
+        if ticket is None:
+            ticket = await admission_controller.acquire(workflow_type)
         result_data = {}
         
         if workflow_type == "tool_research":
             async for event in stream_tool_research_workflow(workflow_func, topic, **kwargs):
-                yield event
-                try:
-                    event_str = event.strip()
-                    if event_str.startswith("data: "):
-                        event_str = event_str[6:]
-                    event_data = json.loads(event_str)
-                    if event_data.get("type") == "step_complete":
-                        result_data = event_data["data"]
-                except (json.JSONDecodeError, KeyError):
-                    pass
+                event_data = await emit(event)
+                if event_data and event_data.get("type") == "step_complete" and "data" in event_data:
+                    result_data = event_data["data"]
         elif workflow_type == "multi_agent":
             async for event in stream_multi_agent_workflow(workflow_func, topic, **kwargs):
-                yield event
-                try:
-                    event_str = event.strip()
-                    if event_str.startswith("data: "):
-                        event_str = event_str[6:]
-                    event_data = json.loads(event_str)
-                    if event_data.get("type") == "step_complete":
-                        step = event_data["step"]
-                        if step == "plan":
-                            result_data["plan"] = event_data["data"]
-                        elif step == "final":
-                            result_data = event_data["data"]
-                except (json.JSONDecodeError, KeyError):
-                    pass
+                event_data = await emit(event)
+                if event_data and event_data.get("type") == "step_complete":
+                    step = event_data.get("step")
+                    if step == "plan":
+                        result_data["plan"] = event_data.get("data")
+                    elif step == "final":
+                        result_data = event_data.get("data") or {}
         
-        # Store in cache after streaming completes
-        if result_data:
+        # Store in cache after streaming completes (partial results are not cached)
+        partial = isinstance(result_data, dict) and result_data.pop("status", None) == "partial"
+        if result_data and not partial:
             cache_service.store_result(topic, workflow_type.replace("-", "_"), result_data)
         
         # Completion event
-        yield "data: " + json.dumps({"type": "complete"}) + "\n\n"
+        await emit("data: " + json.dumps({"type": "complete", **({"status": "partial"} if partial else {})}) + "\n\n")
         
+    except asyncio.CancelledError:
+        cancelled = True
+        raise
     except (KeyboardInterrupt, SystemExit):
         raise
+    except AdmissionRejected as e:
+        await emit("data: " + json.dumps({
+            "type": "error",
+            "message": str(e),
+            "retry_after": math.ceil(e.retry_after)
+        }) + "\n\n")
     except BaseException as e:
         logger.error(f"Streaming error [{workflow_type}]: {type(e).__name__}: {e}", exc_info=True)
-        yield "data: " + json.dumps({
+        await emit("data: " + json.dumps({
             "type": "error",
             "message": str(e)
-        }) + "\n\n"
+        }) + "\n\n")
+    finally:
+        if speculating:
+            workflow_func.cancel_speculation()
+        if ticket is not None:
+            ticket.release(observe=not cancelled)
+        await channel.close()
+
+
+# Cache replay order: small fields go out with the initial cache_hit event, large bodies follow
+CACHE_SUMMARY_FIELDS = ("plan", "sources")
+CACHE_BODY_FIELDS = ("final_report", "revised_report", "reflection", "research_report", "history", "html_output")
+CACHE_CHUNK_CHARS = 16000
+
+# Combined reflect+revise: streamed revision text is sent per line (or at this size)
+REVISION_DELTA_CHARS = 400
+
+
+async def stream_cached_result(cache_service, cache_key: str) -> AsyncGenerator[str, None]:
+    """
+    Replay a cached result as field-level events.
+    
+    The initial cache_hit event carries only the summary fields; every other field is
+    read from storage on demand and sent as "cache_field" events, long strings split into
+    CACHE_CHUNK_CHARS pieces ("append": true on continuation chunks). It also reports the
+    entry's age and whether it is stale (past the soft TTL, refresh requested).
+    
+    Demoted (cold-tier) fields are promoted before anything is sent; if no replica holds
+    them any more, nothing is yielded and the caller runs the workflow instead. Storage
+    reads run in worker threads; only the hit is recorded on the loop (refresh scheduling).
+    """
+    promoted = await asyncio.to_thread(cache_service.ensure_hot, cache_key)
+    if promoted is None:
+        return
+    field_names = await asyncio.to_thread(cache_service.list_cached_fields, cache_key)
+    if not field_names:
+        return
+    
+    summary_fields = [f for f in CACHE_SUMMARY_FIELDS if f in field_names]
+    body_fields = [f for f in CACHE_BODY_FIELDS if f in field_names]
+    body_fields += [f for f in field_names if f not in summary_fields and f not in body_fields]
+    
+    summary = await asyncio.to_thread(cache_service.read_cached_fields, cache_key, summary_fields)
+    if summary is None:
+        return
+    freshness = cache_service.record_hit(cache_key, promoted=promoted)
+    
+    yield "data: " + json.dumps({
+        "type": "cache_hit",
+        "progressive": True,
+        "data": summary,
+        "pending_fields": body_fields,
+        **freshness
+    }) + "\n\n"
+    
+    for field in body_fields:
+        value = (await asyncio.to_thread(cache_service.read_cached_fields, cache_key, [field]) or {}).get(field)
+        if isinstance(value, str) and len(value) > CACHE_CHUNK_CHARS:
+            for offset in range(0, len(value), CACHE_CHUNK_CHARS):
+                yield "data: " + json.dumps({
+                    "type": "cache_field",
+                    "field": field,
+                    "data": value[offset:offset + CACHE_CHUNK_CHARS],
+                    "append": offset > 0
+                }) + "\n\n"
+        else:
+            yield "data: " + json.dumps({
+                "type": "cache_field",
+                "field": field,
+                "data": value
+            }) + "\n\n"
 
 
 async def stream_tool_research_workflow(workflow, topic: str, **kwargs) -> AsyncGenerator[str, None]:
@@ -107,7 +349,10 @@ async def stream_tool_research_workflow(workflow, topic: str, **kwargs) -> Async
     
     research_agent = ResearchAgent(model=workflow.model)
     logger.info(f"[W2] Starting research agent for: {topic[:50]}")
-    research_report = await research_agent.execute(topic, tools=tools, tool_func_mapping=tool_func_mapping)
+    research_report = await run_stage(
+        workflow._research(research_agent, topic, tools=tools, tool_func_mapping=tool_func_mapping),
+        "research"
+    )
     logger.info(f"[W2] Research agent completed, len={len(research_report or '')}")
     
     yield "data: " + json.dumps({
@@ -123,28 +368,122 @@ async def stream_tool_research_workflow(workflow, topic: str, **kwargs) -> Async
         "message": "Analyzing research quality..."
     }) + "\n\n"
     
-    reflection_agent = ReflectionAgent(model=workflow.model)
-    logger.info("[W2] Starting reflection agent")
-    reflection = await reflection_agent.execute(research_report)
-    logger.info("[W2] Reflection agent completed")
+    # Reflection + revision are cached together on the exact research report
+    from app.services.cache_service import cache_service
+    cached_stage = cache_service.get_stage_result("reflection", research_report) or {}
     
-    yield "data: " + json.dumps({
-        "type": "step_complete",
-        "step": "reflection",
-        "data": reflection
-    }) + "\n\n"
+    reflection = cached_stage.get("reflection")
+    revised_report = cached_stage.get("revised_report") if reflection else None
+    body_html = None
+    revision_started = time.monotonic() if not revised_report else None
+    pipelined = kwargs.get("pipelined")
+    if pipelined is None:
+        pipelined = settings.PIPELINED_STAGES
+    combined = kwargs.get("combined_reflection")
+    if combined is None:
+        combined = settings.COMBINED_REFLECT_REVISE
     
-    # Step 3: Revision
-    yield "data: " + json.dumps({
-        "type": "progress",
-        "step": "revised",
-        "message": "Revising based on analysis..."
-    }) + "\n\n"
+    # Render each finished section while the next one is still being generated
+    pipeline = SectionPipeline(workflow._render_section) if pipelined and not revised_report else None
+    reflection_sent = False
+    # A tool cut off by the deadline leaves the research incomplete
+    partial_stage = research_agent.timed_out_tools[0] if research_agent.timed_out_tools else None
     
-    revision_agent = RevisionAgent(model=workflow.model)
-    logger.info("[W2] Starting revision agent")
-    revised_report = await revision_agent.execute(research_report, reflection)
-    logger.info("[W2] Revision agent completed")
+    try:
+        if combined and not revised_report:
+            # One structured-output call: reflection is sent as soon as it closes,
+            # the revised report streams as it grows
+            logger.info("[W2] Starting combined reflection + revision")
+            pending = ""
+            streamed = False
+            try:
+                async for kind, field, value in workflow._reflect_and_rewrite_stream(research_report):
+                    deadline.check("revision")
+                    if field == "reflection" and kind == "complete":
+                        reflection = value
+                        yield _reflection_event(reflection)
+                        yield _revision_progress_event()
+                        reflection_sent = True
+                    elif field == "revised_report" and kind == "delta":
+                        if pipeline:
+                            for index, section in pipeline.feed(value):
+                                streamed = True
+                                yield _section_event(index, section)
+                            continue
+                        pending += value
+                        if "\n" in value or len(pending) >= REVISION_DELTA_CHARS:
+                            streamed = True
+                            yield _revision_delta_event(pending)
+                            pending = ""
+                    elif field == "revised_report" and kind == "complete":
+                        revised_report = value
+            except DeadlineExceeded:
+                raise
+            except Exception as e:
+                if deadline.expired():
+                    raise DeadlineExceeded("reflection") from e
+                # API error (no json_schema support, open circuit, dropped stream): same fallback as truncation
+                logger.error(f"[W2] Combined reflection + revision failed: {e}")
+            if pending:
+                streamed = True
+                yield _revision_delta_event(pending)
+            
+            if not (reflection and revised_report):
+                # Truncated or failed structured output: finish with the two-call path below
+                logger.warning("[W2] Combined reflection output incomplete; falling back to separate revision")
+                revised_report = None
+                if streamed:
+                    yield _revision_reset_event()  # The client drops the truncated revision
+                if pipeline:
+                    pipeline.cancel()
+                    pipeline = SectionPipeline(workflow._render_section)
+        
+        if not reflection:
+            reflection_agent = ReflectionAgent(model=workflow.model)
+            logger.info("[W2] Starting reflection agent")
+            reflection = await run_stage(reflection_agent.execute(research_report), "reflection")
+            logger.info("[W2] Reflection agent completed")
+        
+        if not reflection_sent:
+            yield _reflection_event(reflection)
+            yield _revision_progress_event()
+        
+        if not revised_report:
+            revision_agent = RevisionAgent(model=workflow.model)
+            if pipeline:
+                logger.info("[W2] Starting revision agent (pipelined)")
+                async for delta in revision_agent.stream(research_report, reflection):
+                    deadline.check("revision")
+                    for index, section in pipeline.feed(delta):
+                        yield _section_event(index, section)
+            else:
+                logger.info("[W2] Starting revision agent")
+                revised_report = await run_stage(revision_agent.execute(research_report, reflection), "revision")
+        
+        if pipeline:
+            for index, section in pipeline.finish():
+                yield _section_event(index, section)
+            revised_report = revised_report or pipeline.text
+            body_html = await run_stage(pipeline.assemble(), "formatting")
+    except DeadlineExceeded as e:
+        # Out of time: deliver the research (and whatever revision streamed) as a partial result
+        logger.warning(f"[W2] {e}; returning partial result")
+        partial_stage = partial_stage or e.stage
+        if pipeline:
+            pipeline.cancel()
+        revised_report = revised_report or (pipeline.text if pipeline else None) or research_report
+        body_html = None
+    except BaseException:
+        if pipeline:
+            pipeline.cancel()
+        raise
+    
+    if revision_started is not None and not partial_stage:
+        logger.info("[W2] Revision completed")
+        cache_service.store_stage_result("reflection", research_report, {
+            "reflection": reflection,
+            "revised_report": revised_report
+        })
     
     yield "data: " + json.dumps({
         "type": "step_complete",
@@ -159,19 +498,40 @@ async def stream_tool_research_workflow(workflow, topic: str, **kwargs) -> Async
         "message": "Formatting output..."
     }) + "\n\n"
     
-    html_output = await workflow._convert_to_html(revised_report)
-    
-    # Final result - collect sources from tool call results, filter to relevant ones
-    from app.utils import filter_relevant_sources, strip_inline_links, strip_source_annotations
+    # Collect sources from tool call results, filter to relevant ones (rendered as references)
+    from app.utils import filter_relevant_sources, strip_inline_links, strip_source_annotations, render_document
     raw_sources = list(research_agent.collected_sources)
     sources = filter_relevant_sources(raw_sources, revised_report or research_report)
+    
+    if body_html is not None:
+        html_output = render_document(body_html, sources[:10])
+    else:
+        try:
+            html_output = await run_stage(workflow._render_html(revised_report, sources=sources[:10]), "formatting")
+        except DeadlineExceeded as e:
+            partial_stage = partial_stage or e.stage
+            html_output = workflow._fallback_html(revised_report)
+    
+    if revision_started is not None and not partial_stage:
+        metrics_service.record_stage(
+            "revision_to_html",
+            mode="pipelined" if pipelined else "sequential",
+            reflection_mode="combined" if combined else "separate",
+            render_mode=settings.HTML_RENDER_MODE,
+            duration_ms=round((time.monotonic() - revision_started) * 1000, 1)
+        )
+    
+    # Final result
     final_result = {
         "research_report": strip_source_annotations(strip_inline_links(research_report)),
         "reflection": reflection,
         "revised_report": strip_source_annotations(strip_inline_links(revised_report)),
         "html_output": html_output,
-        "sources": sources[:10]
+        "sources": sources[:10],
+        "status": "partial" if partial_stage else "completed"
     }
+    if partial_stage:
+        metrics_service.record_stage("deadline", workflow="tool_research", timed_out_stage=partial_stage)
     
     yield "data: " + json.dumps({
         "type": "step_complete",
@@ -180,18 +540,64 @@ async def stream_tool_research_workflow(workflow, topic: str, **kwargs) -> Async
     }) + "\n\n"
 
 
+def _reflection_event(reflection: str) -> str:
+    return "data: " + json.dumps({
+        "type": "step_complete",
+        "step": "reflection",
+        "data": reflection
+    }) + "\n\n"
+
+
+def _revision_progress_event() -> str:
+    return "data: " + json.dumps({
+        "type": "progress",
+        "step": "revised",
+        "message": "Revising based on analysis..."
+    }) + "\n\n"
+
+
+def _revision_delta_event(text: str) -> str:
+    """Partial event carrying revised-report text to append (combined, non-pipelined mode)"""
+    return "data: " + json.dumps({
+        "type": "partial",
+        "step": "revised",
+        "append": True,
+        "data": text
+    }) + "\n\n"
+
+
+def _revision_reset_event() -> str:
+    """Partial event replacing all revised text sent so far with nothing (the revision restarts)"""
+    return "data: " + json.dumps({
+        "type": "partial",
+        "step": "revised",
+        "append": False,
+        "reset": True,
+        "data": ""
+    }) + "\n\n"
+
+
+def _section_event(index: int, section: str) -> str:
+    """Partial event for a revised section whose rendering has started"""
+    return "data: " + json.dumps({
+        "type": "partial",
+        "step": "revised",
+        "index": index,
+        "data": section
+    }) + "\n\n"
+
+
 async def stream_multi_agent_workflow(workflow, topic: str, **kwargs) -> AsyncGenerator[str, None]:
     """Stream multi-agent workflow with step-by-step execution"""
     
     max_steps = kwargs.get("max_steps", 4)
     
-    # Planning step - silently execute (plan already shown in frontend)
-    from app.agents import PlannerAgent
-    planner = PlannerAgent()
-    plan_steps = await planner.execute(topic)
+    # Planning step - silently execute (plan already shown in frontend); may already be running
+    plan_steps = await run_stage(workflow._planned(topic), "plan")
     
     if workflow.limit_steps:
         plan_steps = plan_steps[:min(len(plan_steps), max_steps)]
+    plan_steps = await workflow._optimize(plan_steps)
     
     yield "data: " + json.dumps({
         "type": "step_complete",
@@ -199,8 +605,11 @@ async def stream_multi_agent_workflow(workflow, topic: str, **kwargs) -> AsyncGe
         "data": plan_steps
     }) + "\n\n"
     
-    # Execute each step
+    # Execute each step (keeping part of the remaining time for the synthesis)
     history = []
+    partial_stage = None
+    reserve = workflow._synthesis_reserve()
+    convergence = ConvergenceDetector()
     for i, step in enumerate(plan_steps, 1):
         yield "data: " + json.dumps({
             "type": "progress",
@@ -208,33 +617,34 @@ async def stream_multi_agent_workflow(workflow, topic: str, **kwargs) -> AsyncGe
             "message": f"Step {i}/{len(plan_steps)}: {step[:60]}..."
         }) + "\n\n"
         
-        decision = await workflow._decide_agent(step)
-        agent_name = decision.get("agent")
-        task = decision.get("task")
-        
-        context = workflow._build_context(history)
-        enriched_task = f"You are {agent_name}.\n\nContext:\n{context}\n\nTask:\n{task}"
-        
-        agent = workflow.agents.get(agent_name)
-        if agent_name == "research_agent" and agent:
-            from app.tools.arxiv_tool import arxiv_tool_def, arxiv_search_tool
-            from app.tools.tavily_tool import tavily_tool_def, tavily_search_tool
-            from app.tools.wikipedia_tool import wikipedia_tool_def, wikipedia_search_tool
-            output = await agent.execute(
-                enriched_task,
-                tools=[arxiv_tool_def, tavily_tool_def, wikipedia_tool_def],
-                tool_func_mapping={
-                    "arxiv_search_tool": arxiv_search_tool,
-                    "tavily_search_tool": tavily_search_tool,
-                    "wikipedia_search_tool": wikipedia_search_tool,
-                }
+        try:
+            skipped = convergence.skips(step)
+            if not skipped:
+                decision = await run_stage(workflow._decide_agent(step), f"step_{i}", reserve=reserve)
+                agent_name = decision.get("agent")
+                task = decision.get("task")
+                skipped = convergence.skips(step, agent_name)
+            if skipped:
+                item = convergence.skip(step)
+                history.append(item)
+                yield "data: " + json.dumps({"type": "step_complete", "step": f"step_{i}", "data": item}) + "\n\n"
+                continue
+            
+            context = await workflow._build_context(history, task)
+            enriched_task = f"You are {agent_name}.\n\nContext:\n{context}\n\nTask:\n{task}"
+            
+            output = await run_stage(
+                workflow._execute_step(agent_name, task, enriched_task, draft=workflow._latest_draft(history)),
+                f"step_{i}",
+                reserve=reserve
             )
-        elif agent:
-            output = await agent.execute(enriched_task)
-        else:
-            output = f"Unknown agent: {agent_name}"
+        except DeadlineExceeded as e:
+            logger.warning(f"[W1] {e}; skipping remaining steps")
+            partial_stage = e.stage
+            break
         
         history.append({"step": step, "agent": agent_name, "output": output})
+        await convergence.observe(agent_name, output)
         
         yield "data: " + json.dumps({
             "type": "step_complete",
@@ -242,6 +652,9 @@ async def stream_multi_agent_workflow(workflow, topic: str, **kwargs) -> AsyncGe
             "data": {"step": step, "agent": agent_name, "output": output}
         }) + "\n\n"
     
+    convergence.finish()
+    workflow._release_prefetch()
+    
     # Final synthesis - WriterAgent produces polished report (mirrors MultiAgentWorkflow.execute)
     yield "data: " + json.dumps({
         "type": "progress",
@@ -254,7 +667,7 @@ async def stream_multi_agent_workflow(workflow, topic: str, **kwargs) -> AsyncGe
 Based on all the work done by the team below, produce a comprehensive, well-structured final report on the topic: "{topic}"
 
 Team work history:
-{workflow._build_context(history)}
+{await workflow._build_context(history, topic, settings.CONTEXT_SYNTHESIS_TOKEN_BUDGET)}
 
 **Your task:**
 - Synthesize all research findings into a coherent narrative
@@ -265,7 +678,15 @@ Team work history:
 
 **IMPORTANT:** Return ONLY the final polished report text, NOT meta-commentary or explanations about what you did."""
 
-    final_report = await workflow.agents["writer_agent"].execute(synthesis_task)
+    try:
+        final_report = await run_stage(workflow.agents["writer_agent"].execute(synthesis_task), "synthesis")
+    except DeadlineExceeded as e:
+        partial_stage = partial_stage or e.stage
+        final_report = workflow._partial_report(history)
+    timed_out_tools = workflow.agents["research_agent"].timed_out_tools
+    partial_stage = partial_stage or (timed_out_tools[0] if timed_out_tools else None)
+    if partial_stage:
+        metrics_service.record_stage("deadline", workflow="multi_agent", timed_out_stage=partial_stage)
 
     # Collect and filter sources (extract from raw report before stripping)
     import re as _re
@@ -282,5 +703,11 @@ Team work history:
     yield "data: " + json.dumps({
         "type": "step_complete",
         "step": "final",
-        "data": {"plan": plan_steps, "history": history, "final_report": final_report, "sources": sources[:10]}
+        "data": {
+            "plan": plan_steps,
+            "history": history,
+            "final_report": final_report,
+            "sources": sources[:10],
+            "status": "partial" if partial_stage else "completed"
+        }
     }) + "\n\n"
@@ -0,0 +1,184 @@
+from fastapi import APIRouter, WebSocket, WebSocketDisconnect
+from app.workflows.tool_research import ToolResearchWorkflow
+from app.workflows.multi_agent import MultiAgentWorkflow
+from app.services.cache_service import cache_service
+from app.api.routes.streaming import stream_workflow_progress, parse_sse_event
+from app.core.config import settings
+from typing import Any, AsyncGenerator, Dict, Set
+import asyncio
+import json
+import logging
+import uuid
+
+router = APIRouter()
+logger = logging.getLogger(__name__)
+
+
+def create_workflow_stream(workflow_type: str, topic: str, params: Dict[str, Any]) -> AsyncGenerator[str, None]:
+    """Build the SSE event stream for a run (same construction as the GET /stream endpoints)"""
+
+    if workflow_type == "tool_research":
+        tools = params.get("tools") or ["arxiv", "wikipedia", "tavily"]
+        if isinstance(tools, str):
+            tools = [t.strip() for t in tools.split(",")]
+        workflow = ToolResearchWorkflow(
+            model=params.get("model"),
+            tools=tools,
+            max_results=int(params.get("max_results", 3))
+        )
+        return stream_workflow_progress(
+            "tool_research", topic, workflow, cache_service,
+            tools=tools,
+            pipelined=params.get("pipelined"),
+            combined_reflection=params.get("combined_reflection")
+        )
+
+    if workflow_type == "multi_agent":
+        max_steps = int(params.get("max_steps", 4))
+        workflow = MultiAgentWorkflow(
+            model=params.get("model"),
+            max_steps=max_steps,
+            limit_steps=True
+        )
+        return stream_workflow_progress("multi_agent", topic, workflow, cache_service, max_steps=max_steps)
+
+    raise ValueError(f"Unknown workflow type: {workflow_type}")
+
+
+class RunMultiplexer:
+    """
+    Multiplexes several workflow runs over one WebSocket connection.
+
+    Every run produces the same events as the SSE stream, tagged with its run_id.
+    Memory per connection is bounded by the number of concurrent runs and the
+    size of the outgoing queue: runs block on a full queue instead of buffering.
+    """
+
+    def __init__(
+        self,
+        websocket: WebSocket,
+        max_runs: int = None,
+        queue_size: int = None
+    ):
+        self.websocket = websocket
+        self.max_runs = max_runs or settings.WS_MAX_RUNS_PER_CONNECTION
+        self.outbox: asyncio.Queue = asyncio.Queue(maxsize=queue_size or settings.WS_SEND_QUEUE_SIZE)
+        self.runs: Dict[str, asyncio.Task] = {}
+        self.subscribed: Set[str] = set()
+
+    async def sender(self):
+        """Drain the outgoing queue onto the socket"""
+        while True:
+            message = await self.outbox.get()
+            await self.websocket.send_json(message)
+
+    async def handle(self, message: Dict[str, Any]):
+        """Dispatch a client control message"""
+
+        action = message.get("action")
+        run_id = message.get("run_id")
+
+        if action == "subscribe":
+            await self._subscribe(message)
+        elif action == "unsubscribe" and run_id in self.runs:
+            self.subscribed.discard(run_id)
+            await self.outbox.put({"type": "unsubscribed", "run_id": run_id})
+        elif action == "cancel" and run_id in self.runs:
+            self.runs[run_id].cancel()
+            self.subscribed.discard(run_id)
+            await self.outbox.put({"type": "cancelled", "run_id": run_id})
+        elif action in ("unsubscribe", "cancel"):
+            await self.outbox.put({"type": "error", "run_id": run_id, "message": f"Unknown run: {run_id}"})
+        else:
+            await self.outbox.put({"type": "error", "run_id": run_id, "message": f"Unknown action: {action}"})
+
+    async def _subscribe(self, message: Dict[str, Any]):
+        """Validate a subscribe request and start the run"""
+
+        run_id = str(message.get("run_id") or uuid.uuid4())
+        workflow_type = str(message.get("workflow_type", "")).replace("-", "_")
+        topic = str(message.get("topic", "")).strip()
+
+        error = None
+        if run_id in self.runs:
+            error = "Run id already in use"
+        elif len(self.runs) >= self.max_runs:
+            error = f"Maximum {self.max_runs} concurrent runs per connection"
+        elif not topic:
+            error = "Topic cannot be empty"
+        elif len(topic) > 500:
+            error = "Topic must be 500 characters or less"
+
+        stream = None
+        if error is None:
+            try:
+                stream = create_workflow_stream(workflow_type, topic, message.get("params") or {})
+            except ValueError as e:
+                error = str(e)
+
+        if error:
+            await self.outbox.put({"type": "error", "run_id": run_id, "message": error})
+            return
+
+        self.subscribed.add(run_id)
+        self.runs[run_id] = asyncio.create_task(self._run(run_id, stream))
+        await self.outbox.put({"type": "subscribed", "run_id": run_id, "workflow_type": workflow_type})
+
+    async def _run(self, run_id: str, stream: AsyncGenerator[str, None]):
+        """Forward one run's events; unsubscribed runs keep executing so the result still gets cached"""
+        try:
+            async for event in stream:
+                event_data = parse_sse_event(event)
+                if event_data is not None and run_id in self.subscribed:
+                    event_data["run_id"] = run_id
+                    await self.outbox.put(event_data)
+        except asyncio.CancelledError:
+            logger.info(f"WebSocket run {run_id} cancelled")
+            raise
+        finally:
+            await stream.aclose()
+            self.runs.pop(run_id, None)
+            self.subscribed.discard(run_id)
+
+    async def close(self):
+        """Cancel all runs owned by this connection"""
+        tasks = list(self.runs.values())
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+
+@router.websocket("/ws")
+async def workflow_websocket(websocket: WebSocket):
+    """
+    Run several workflows over one connection.
+
+    Client messages:
+        {"action": "subscribe", "run_id": "...", "workflow_type": "tool_research", "topic": "...", "params": {...}}
+        {"action": "unsubscribe", "run_id": "..."}
+        {"action": "cancel", "run_id": "..."}
+
+    Server messages use the SSE event schema plus a "run_id" field.
+    """
+    await websocket.accept()
+    mux = RunMultiplexer(websocket)
+    sender = asyncio.create_task(mux.sender())
+
+    try:
+        while True:
+            raw = await websocket.receive_text()
+            try:
+                message = json.loads(raw)
+            except json.JSONDecodeError:
+                message = None
+            if isinstance(message, dict):
+                await mux.handle(message)
+            else:
+                await mux.outbox.put({"type": "error", "message": "Messages must be JSON objects"})
+    except WebSocketDisconnect:
+        logger.info("WebSocket client disconnected")
+    except Exception as e:
+        logger.error(f"WebSocket error: {e}", exc_info=True)
+    finally:
+        await mux.close()
+        sender.cancel()
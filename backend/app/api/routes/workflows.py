@@ -3,22 +3,30 @@ from app.models.schemas import (
     ToolResearchWorkflowRequest,
     ToolResearchWorkflowResponse,
     MultiAgentWorkflowRequest,
-    MultiAgentWorkflowResponse
+    MultiAgentWorkflowResponse,
+    BatchWorkflowRequest,
+    BatchWorkflowResponse
 )
 from app.workflows.tool_research import ToolResearchWorkflow
 from app.workflows.multi_agent import MultiAgentWorkflow
+from app.workflows.batch import batch_runs
 from app.services.cache_service import cache_service
+from app.services.admission import AdmissionRejected, admission_controller
 from app.utils import strip_inline_links, strip_source_annotations
 
 
 def _clean(text):
     return strip_source_annotations(strip_inline_links(text)) if text else text
 from app.services.metrics_service import metrics_service
+from app.core.config import settings
+from app.core.deadline import deadline_scope
 from app.core.logging_config import StructuredLogger
 from app.core.app_insights import track_workflow
-from app.api.routes.streaming import stream_workflow_progress
-from fastapi.responses import StreamingResponse
+from app.api.routes.streaming import AdmittedRun, admit_stream, stream_workflow_progress
+from fastapi.responses import JSONResponse, StreamingResponse
+from starlette.background import BackgroundTask
 from datetime import datetime
+import math
 import time
 import uuid
 import json
@@ -27,6 +35,27 @@ router = APIRouter()
 logger = StructuredLogger(__name__)
 
 
+def _overloaded(error: AdmissionRejected) -> JSONResponse:
+    """503 for a run that was not admitted (cache hits never get here)"""
+    retry_after = math.ceil(error.retry_after)
+    return JSONResponse(
+        status_code=503,
+        content={
+            "detail": "Server is at capacity. Please retry later.",
+            "reason": error.reason,
+            "retry_after": retry_after
+        },
+        headers={"Retry-After": str(retry_after)}
+    )
+
+
+def _release_on_close(admitted: AdmittedRun):
+    """Free the run slot if the stream never started (the producer normally releases it)"""
+    if admitted.ticket is None:
+        return None
+    return BackgroundTask(admitted.ticket.release, observe=False)
+
+
 @router.post("/tool-research", response_model=ToolResearchWorkflowResponse)
 async def execute_tool_research_workflow(request: ToolResearchWorkflowRequest):
     """Execute tool-enhanced research workflow (Q3)"""
@@ -37,8 +66,10 @@ async def execute_tool_research_workflow(request: ToolResearchWorkflowRequest):
     try:
         logger.info(f"Starting tool research workflow {workflow_id} for topic: {request.topic}")
         
+        metrics_service.record_topic("tool_research", request.topic)
+        
         # Check cache
-        cached_result = cache_service.get_cached_result(request.topic, "tool_research")
+        cached_result = await cache_service.get_cached_result_async(request.topic, "tool_research")
         if cached_result:
             execution_time = time.time() - start_time
             return ToolResearchWorkflowResponse(
@@ -62,17 +93,24 @@ async def execute_tool_research_workflow(request: ToolResearchWorkflowRequest):
             max_results=request.max_results
         )
         
-        result = await workflow.execute(request.topic, export_format=request.export_format)
+        ticket = await admission_controller.acquire("tool_research")
+        try:
+            with deadline_scope(settings.REQUEST_TIMEOUT):
+                result = await workflow.execute(request.topic, export_format=request.export_format)
+        finally:
+            ticket.release()
         execution_time = time.time() - start_time
+        status = result.pop("status", "completed")
         
-        # Store in cache
-        cache_service.store_result(request.topic, "tool_research", result)
+        # Store in cache (partial results are not cached)
+        if status == "completed":
+            cache_service.store_result(request.topic, "tool_research", result)
         
         return ToolResearchWorkflowResponse(
             workflow_id=workflow_id,
             workflow_type="tool_research",
             topic=request.topic,
-            status="completed",
+            status=status,
             created_at=datetime.now(),
             execution_time=execution_time,
             result=result,
@@ -84,6 +122,9 @@ async def execute_tool_research_workflow(request: ToolResearchWorkflowRequest):
             sources=result.get("sources", [])
         )
         
+    except AdmissionRejected as e:
+        logger.warning(f"Tool research workflow {workflow_id} rejected: {e}")
+        return _overloaded(e)
     except Exception as e:
         execution_time = time.time() - start_time
         logger.error(f"Tool research workflow {workflow_id} failed: {e}")
@@ -111,8 +152,10 @@ async def execute_multi_agent_workflow(request: MultiAgentWorkflowRequest):
     try:
         logger.info(f"Starting multi-agent workflow {workflow_id} for topic: {request.topic}")
         
+        metrics_service.record_topic("multi_agent", request.topic)
+        
         # Check cache
-        cached_result = cache_service.get_cached_result(request.topic, "multi_agent")
+        cached_result = await cache_service.get_cached_result_async(request.topic, "multi_agent")
         if cached_result:
             execution_time = time.time() - start_time
             return MultiAgentWorkflowResponse(
@@ -134,17 +177,24 @@ async def execute_multi_agent_workflow(request: MultiAgentWorkflowRequest):
             limit_steps=request.limit_steps
         )
         
-        result = await workflow.execute(request.topic)
+        ticket = await admission_controller.acquire("multi_agent")
+        try:
+            with deadline_scope(settings.REQUEST_TIMEOUT):
+                result = await workflow.execute(request.topic)
+        finally:
+            ticket.release()
         execution_time = time.time() - start_time
+        status = result.pop("status", "completed")
         
-        # Store in cache
-        cache_service.store_result(request.topic, "multi_agent", result)
+        # Store in cache (partial results are not cached)
+        if status == "completed":
+            cache_service.store_result(request.topic, "multi_agent", result)
         
         return MultiAgentWorkflowResponse(
             workflow_id=workflow_id,
             workflow_type="multi_agent",
             topic=request.topic,
-            status="completed",
+            status=status,
             created_at=datetime.now(),
             execution_time=execution_time,
             result=result,
@@ -153,6 +203,9 @@ async def execute_multi_agent_workflow(request: MultiAgentWorkflowRequest):
             final_report=_clean(result.get("final_report", ""))
         )
         
+    except AdmissionRejected as e:
+        logger.warning(f"Multi-agent workflow {workflow_id} rejected: {e}")
+        return _overloaded(e)
     except Exception as e:
         execution_time = time.time() - start_time
         logger.error(f"Multi-agent workflow {workflow_id} failed: {e}")
@@ -173,7 +226,7 @@ async def execute_multi_agent_workflow(request: MultiAgentWorkflowRequest):
 
 
 @router.get("/tool-research/stream")
-async def stream_tool_research_workflow(topic: str, tools: str = "arxiv,wikipedia,tavily", model: str = None, max_results: int = 3):
+async def stream_tool_research_workflow(topic: str, tools: str = "arxiv,wikipedia,tavily", model: str = None, max_results: int = 3, pipelined: bool = None, combined_reflection: bool = None):
     """Stream tool research workflow with real-time progress events"""
     
     # Validate topic
@@ -195,9 +248,15 @@ async def stream_tool_research_workflow(topic: str, tools: str = "arxiv,wikipedi
         max_results=max_results
     )
     
+    try:
+        admitted = await admit_stream("tool_research", topic, workflow, cache_service)
+    except AdmissionRejected as e:
+        return _overloaded(e)
+    
     return StreamingResponse(
-        stream_workflow_progress("tool_research", topic, workflow, cache_service, tools=tools_list),
+        stream_workflow_progress("tool_research", topic, workflow, cache_service, admitted=admitted, tools=tools_list, pipelined=pipelined, combined_reflection=combined_reflection),
         media_type="text/event-stream",
+        background=_release_on_close(admitted),
         headers={
             "Cache-Control": "no-cache",
             "Connection": "keep-alive",
@@ -227,8 +286,67 @@ async def stream_multi_agent_workflow(topic: str, max_steps: int = 4, model: str
         limit_steps=True
     )
     
+    try:
+        admitted = await admit_stream("multi_agent", topic, workflow, cache_service)
+    except AdmissionRejected as e:
+        return _overloaded(e)
+    
+    return StreamingResponse(
+        stream_workflow_progress("multi_agent", topic, workflow, cache_service, admitted=admitted, max_steps=max_steps),
+        media_type="text/event-stream",
+        background=_release_on_close(admitted),
+        headers={
+            "Cache-Control": "no-cache",
+            "Connection": "keep-alive",
+            "X-Accel-Buffering": "no"
+        }
+    )
+
+
+@router.post("/batch", response_model=BatchWorkflowResponse, status_code=202)
+async def start_batch_workflow(request: BatchWorkflowRequest):
+    """Run one workflow over many topics (deduplicated, cache-served, bounded concurrency)"""
+    
+    batch = batch_runs.start(
+        request.topics,
+        request.workflow_type,
+        params={
+            "model": request.model,
+            "tools": request.tools,
+            "max_results": request.max_results,
+            "export_format": request.export_format,
+            "max_steps": request.max_steps
+        },
+        concurrency=request.concurrency
+    )
+    logger.info(f"Started batch {batch.batch_id}: {len(request.topics)} {request.workflow_type} topics")
+    return BatchWorkflowResponse(**batch.snapshot(include_results=False))
+
+
+@router.get("/batch/{batch_id}")
+async def get_batch_workflow(batch_id: str, include_results: bool = True):
+    """Batch status, per-topic outcomes and (optionally) results"""
+    
+    batch = batch_runs.get(batch_id)
+    if batch is None:
+        raise HTTPException(status_code=404, detail="Batch not found")
+    return batch.snapshot(include_results=include_results)
+
+
+@router.get("/batch/{batch_id}/stream")
+async def stream_batch_workflow(batch_id: str):
+    """Stream batch progress and per-topic results (replayed from the start, then live)"""
+    
+    batch = batch_runs.get(batch_id)
+    if batch is None:
+        raise HTTPException(status_code=404, detail="Batch not found")
+    
+    async def event_stream():
+        async for event in batch.follow():
+            yield "data: " + json.dumps(event, default=str) + "\n\n"
+    
     return StreamingResponse(
-        stream_workflow_progress("multi_agent", topic, workflow, cache_service, max_steps=max_steps),
+        event_stream(),
         media_type="text/event-stream",
         headers={
             "Cache-Control": "no-cache",
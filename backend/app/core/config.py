@@ -1,5 +1,5 @@
 from pydantic_settings import BaseSettings
-from typing import List
+from typing import Dict, List
 import os
 
 
@@ -51,15 +51,122 @@ class Settings(BaseSettings):
     # Workflow
     MAX_WORKFLOW_STEPS: int = 4
     MAX_TOOL_TURNS: int = 6
-    REQUEST_TIMEOUT: int = 300
+    PLAN_OPTIMIZER: bool = True  # Multi-agent: drop duplicate/redundant plan steps, fuse same-agent runs
+    PLAN_DEDUP_SIMILARITY: float = 0.9  # Embedding similarity for duplicate steps (cache model loaded)
+    PLAN_DEDUP_TOKEN_OVERLAP: float = 0.8  # Word overlap (Jaccard) for duplicate steps otherwise
+    PLAN_FUSE_MAX_STEPS: int = 3  # Most consecutive same-agent steps fused into one call
+    CONVERGENCE_DETECTION: bool = True  # Multi-agent: skip remaining writer/editor steps once drafts stop changing
+    CONVERGENCE_THRESHOLD: float = 0.98  # Similarity between successive refinement outputs that counts as converged
+    CONTEXT_TOKEN_BUDGET: int = 1500  # Multi-agent: prior-step context per step prompt
+    CONTEXT_SYNTHESIS_TOKEN_BUDGET: int = 6000  # Multi-agent: team history in the final synthesis prompt
+    CONTEXT_CHUNK_TOKENS: int = 200  # Step outputs are indexed in chunks of about this size
+    CONTEXT_SUMMARIZE: bool = False  # Replace older step outputs with cached cheap-model summaries
+    CONTEXT_RECENT_STEPS: int = 2  # Steps kept verbatim when summarizing
+    CONTEXT_SUMMARY_MODEL: str = "openai:gpt-4o-mini"
+    CONTEXT_SUMMARY_TOKENS: int = 300
+    SPECULATIVE_PLANNING: bool = False  # Multi-agent: plan + topic search during the cache lookup
+    TOOL_PREFETCH: bool = False  # Run the search tools on the task while the first completion decides
+    TOOL_PREFETCH_TOKEN_OVERLAP: float = 0.5  # Query token overlap (Jaccard) to serve a prefetched result
+    TOOL_PREFETCH_SIMILARITY: float = 0.85  # Embedding similarity fallback (when the cache model is loaded)
+    REQUEST_TIMEOUT: int = 300  # Per-run deadline (seconds); stages past it return status="partial"
+    DEADLINE_SYNTHESIS_RESERVE: float = 0.2  # Multi-agent: share of the remaining time kept for the synthesis
+    DEADLINE_TOOL_SHARE: float = 0.4  # Longest a single tool call may take, as a share of the remaining time
+    HTML_RENDER_MODE: str = "local"  # "local" (Markdown + Jinja2 template) or "llm"
+    PIPELINED_STAGES: bool = False  # Stream revision and render sections while later ones generate
+    REVISION_MODE: str = "full"  # "full" rewrite or "patch" (targeted edits applied locally, full-rewrite fallback)
+    COMBINED_REFLECT_REVISE: bool = False  # Streaming path: one structured-output call for reflection + revision
+    
+    # Streaming (SSE writer decoupled from workflow execution)
+    STREAM_QUEUE_SIZE: int = 32
+    STREAM_HEARTBEAT_SECONDS: float = 15.0
+    
+    # WebSocket multiplexing
+    WS_MAX_RUNS_PER_CONNECTION: int = 6
+    WS_SEND_QUEUE_SIZE: int = 100
+    
+    # Resilience: per-dependency circuit breakers and bulkheads
+    BREAKER_FAILURE_THRESHOLD: int = 5  # Consecutive failures before the circuit opens
+    BREAKER_RESET_SECONDS: float = 30.0  # Open -> half-open (one probe call) after this cool-down
+    BULKHEAD_LIMITS: Dict[str, int] = {"openai": 32, "arxiv": 4, "tavily": 8, "wikipedia": 4}
+    BULKHEAD_QUEUE_SIZE: int = 32  # Callers allowed to wait per dependency before failing fast
+    
+    # OpenAI rate governor: per-model RPM/TPM token buckets (shared across replicas through Redis)
+    OPENAI_RATE_GOVERNOR: bool = False
+    OPENAI_RATE_LIMITS: Dict[str, Dict[str, int]] = {
+        "gpt-4o": {"rpm": 500, "tpm": 30000},
+        "gpt-4o-mini": {"rpm": 500, "tpm": 200000},
+        "default": {"rpm": 500, "tpm": 30000}
+    }
+    OPENAI_COMPLETION_TOKEN_ESTIMATE: int = 1024  # Completion tokens assumed when a request sets no max_tokens
+    OPENAI_MAX_RETRIES: int = 2  # Retries of 429/5xx/connection errors (through the governor; SDK retries are off)
+    OPENAI_RETRY_BACKOFF_SECONDS: float = 0.5  # First retry delay, doubled per attempt (or Retry-After if longer)
+    
+    # Hedged requests for small critical-path calls (agent routing, planning)
+    LLM_HEDGING: bool = False
+    LLM_HEDGE_PERCENTILE: float = 95.0  # Send a duplicate once a call is slower than this latency percentile
+    LLM_HEDGE_BUDGET: float = 0.05  # Extra requests allowed, as a share of hedgeable calls
+    LLM_HEDGE_MIN_SAMPLES: int = 20  # Latencies recorded per call kind before hedging starts
+    
+    # Admission control: workflow runs (cache misses) in flight / waiting
+    ADMISSION_MAX_CONCURRENT: int = 8
+    ADMISSION_QUEUE_SIZE: int = 16  # Runs allowed to wait for a slot; beyond that 503 + Retry-After
+    ADMISSION_QUEUE_TIMEOUT_SECONDS: float = 30.0  # Longest wait for a slot before 503
+    ADMISSION_ADAPTIVE: bool = False  # AIMD: tune the limit on observed run latency
+    ADMISSION_TARGET_LATENCY_SECONDS: float = 90.0  # Adaptive: runs slower than this shrink the limit
+    ADMISSION_MIN_CONCURRENT: int = 2
+    ADMISSION_MAX_CONCURRENT_CEILING: int = 32  # Adaptive: upper bound for the limit
+    
+    # Batch runs: many topics per request, deduplicated and sharing tool results
+    BATCH_MAX_TOPICS: int = 500
+    BATCH_CONCURRENCY: int = 4  # Runs in flight per batch (each also takes an admission slot)
+    BATCH_RETAIN: int = 20  # Finished batches kept in memory for status/stream lookups
+    
+    # Cache warming: background runs of popular topics on idle admission slots
+    CACHE_WARM_CONCURRENCY: int = 2  # Warm-up runs in flight
+    CACHE_WARM_RESERVED_SLOTS: int = 2  # Admission slots a warm-up always leaves to requests
+    CACHE_WARM_TOP_TOPICS: int = 50  # Most requested topics warmed when no list is given
+    CACHE_WARM_MIN_REQUESTS: int = 2  # Requests a topic needs to count as popular
+    CACHE_WARM_ON_STARTUP: bool = False  # Warm the most requested tool_research topics at startup
     
     # Semantic Caching
     REDIS_URL: str = "redis://localhost:6379"
     CACHE_ENABLED: bool = True
     CACHE_TTL_SECONDS: int = 2592000  # 30 days
+    CACHE_SOFT_TTL_SECONDS: int = 604800  # 7 days: older hits are served stale and refreshed in the background (0 = off)
+    CACHE_MEMORY_BUDGET_MB: float = 200  # Cache footprint before eviction (keep below Redis maxmemory; 0 = TTLs only)
+    CACHE_EVICTION_TARGET: float = 0.9  # Evict down to this share of the budget
+    CACHE_LFU_HALF_LIFE_HOURS: float = 24.0  # Hits lose half their weight per this long without access
+    CACHE_COLD_TIER: bool = False  # Move large fields of idle entries to a compressed SQLite file
+    CACHE_COLD_PATH: str = "cache_cold.sqlite3"  # Local disk of this replica
+    CACHE_COLD_IDLE_HOURS: float = 24.0  # Entries without a hit for this long are demoted
+    CACHE_COLD_MIN_FIELD_BYTES: int = 2048  # Smaller fields (plan, sources) stay in Redis
+    CACHE_COLD_INTERVAL_SECONDS: float = 300.0  # Background demotion pass interval
+    CACHE_COLD_COMPRESSION_LEVEL: int = 6  # zlib level
+    CACHE_COLD_REMOTE_WAIT_SECONDS: float = 0.5  # Wait for the replica holding a payload to promote it
+    CACHE_L1_MAX_MB: float = 64.0  # In-process cache of decoded results per replica (0 = off)
+    CACHE_L1_TTL_SECONDS: float = 300.0  # Upper bound on L1 staleness if an invalidation is missed
     CACHE_SIMILARITY_THRESHOLD: float = 0.95
+    CACHE_EMBEDDING_DTYPE: str = "int8"  # Stored embeddings: "float32", "float16" or "int8" (+ per-vector scale)
+    CACHE_RERANK_MARGIN: float = 0.005  # Quantized scores this close to the threshold are re-scored exactly
+    CACHE_RERANK_TOP_K: int = 8  # Candidates re-scored at most
     EMBEDDING_MODEL: str = "all-MiniLM-L6-v2"
     
+    # Stage-level caching of intermediate artifacts (threshold 1.0 = exact match on source text)
+    CACHE_STAGE_TTL_SECONDS: Dict[str, int] = {
+        "plan": 604800,        # 7 days
+        "research": 86400,     # 1 day - web results go stale
+        "reflection": 2592000,
+        "html": 2592000,
+        "summary": 2592000
+    }
+    CACHE_STAGE_SIMILARITY: Dict[str, float] = {
+        "plan": 0.95,
+        "research": 0.95,
+        "reflection": 1.0,
+        "html": 1.0,
+        "summary": 1.0
+    }
+    
     # Rate limiting
     RATE_LIMIT_REQUESTS: int = 100
     RATE_LIMIT_WINDOW_SECONDS: int = 900
@@ -0,0 +1,105 @@
+"""
+Per-run deadline carried in a context variable.
+
+A workflow run opens deadline_scope(settings.REQUEST_TIMEOUT); tasks and worker
+threads started inside it (asyncio.create_task, asyncio.to_thread) inherit the
+deadline. Stages await through run_stage(), which derives their timeout from the
+remaining time, and blocking code (tool retries) consults remaining()/sleep().
+"""
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Awaitable, Optional, TypeVar
+import asyncio
+import time
+
+from openai import APITimeoutError, NOT_GIVEN
+
+T = TypeVar("T")
+
+_deadline: ContextVar[Optional[float]] = ContextVar("workflow_deadline", default=None)
+
+
+class DeadlineExceeded(TimeoutError):
+    """The run's deadline passed (or would pass) before a stage finished"""
+
+    def __init__(self, stage: str = None):
+        self.stage = stage
+        super().__init__(f"Deadline exceeded{f' during {stage}' if stage else ''}")
+
+
+@contextmanager
+def deadline_scope(seconds: Optional[float]):
+    """Bound everything run inside the block to `seconds` (never extends an outer deadline)"""
+    current = _deadline.get()
+    deadline = time.monotonic() + seconds if seconds else None
+    if current is not None and (deadline is None or current < deadline):
+        deadline = current
+    token = _deadline.set(deadline)
+    try:
+        yield deadline
+    finally:
+        _deadline.reset(token)
+
+
+def remaining() -> Optional[float]:
+    """Seconds left before the deadline (None when no deadline is set)"""
+    deadline = _deadline.get()
+    return None if deadline is None else max(0.0, deadline - time.monotonic())
+
+
+def expired() -> bool:
+    left = remaining()
+    return left is not None and left <= 0
+
+
+def check(stage: str = None):
+    """Raise DeadlineExceeded if the deadline has passed"""
+    left = remaining()
+    if left is not None and left <= 0:
+        raise DeadlineExceeded(stage)
+
+
+def sleep(seconds: float, stage: str = None):
+    """Blocking sleep that refuses to outlive the deadline (for retry backoff in worker threads)"""
+    left = remaining()
+    if left is not None and left <= seconds:
+        raise DeadlineExceeded(stage)
+    time.sleep(seconds)
+
+
+async def run_stage(awaitable: Awaitable[T], stage: str, reserve: float = 0.0) -> T:
+    """
+    Await a stage with a timeout derived from the remaining time.
+
+    Args:
+        awaitable: The stage's coroutine/task
+        stage: Stage name (reported in DeadlineExceeded)
+        reserve: Seconds to keep back for later stages (e.g. the final synthesis)
+    """
+    left = remaining()
+    if left is None:
+        return await awaitable
+    timeout = left - reserve
+    if timeout <= 0:
+        if asyncio.iscoroutine(awaitable):
+            awaitable.close()
+        raise DeadlineExceeded(stage)
+    try:
+        return await asyncio.wait_for(awaitable, timeout=timeout)
+    except asyncio.TimeoutError:
+        raise DeadlineExceeded(stage) from None
+    except APITimeoutError:
+        # The request timeout (llm_timeout) fired first
+        if remaining() - reserve <= 0:
+            raise DeadlineExceeded(stage) from None
+        raise
+
+
+def llm_timeout():
+    """Per-request OpenAI timeout: the remaining time (client default when no deadline is set)"""
+    left = remaining()
+    if left is None:
+        return NOT_GIVEN
+    if left <= 0:
+        raise DeadlineExceeded("llm")
+    return left
@@ -1,6 +1,7 @@
 from pydantic import BaseModel, Field, field_validator
 from typing import Optional, List, Dict, Any, Literal
 from datetime import datetime
+from app.core.config import settings
 
 
 class WorkflowRequest(BaseModel):
@@ -36,6 +37,62 @@ class MultiAgentWorkflowRequest(WorkflowRequest):
     enable_planning: Optional[bool] = Field(True, description="Enable planning agent")
 
 
+class BatchWorkflowRequest(BaseModel):
+    """Request for a batch of research topics run with one workflow"""
+    topics: List[str] = Field(..., min_length=1, description="Research topics")
+    workflow_type: Literal["tool_research", "multi_agent"] = Field("tool_research", description="Workflow to run per topic")
+    model: Optional[str] = Field(None, description="Override default model")
+    tools: Optional[List[Literal["arxiv", "tavily", "wikipedia"]]] = Field(None, description="Tools to enable (tool_research)")
+    max_results: Optional[int] = Field(5, ge=1, le=10, description="Max results per tool (tool_research)")
+    export_format: Optional[Literal["html", "markdown", "json"]] = Field("html", description="Export format (tool_research)")
+    max_steps: Optional[int] = Field(4, ge=1, le=10, description="Maximum workflow steps (multi_agent)")
+    concurrency: Optional[int] = Field(None, ge=1, le=16, description="Runs in flight (capped by BATCH_CONCURRENCY)")
+    
+    @field_validator('topics')
+    @classmethod
+    def validate_topics(cls, v: List[str]) -> List[str]:
+        """Strip whitespace and validate each topic like a single-topic request"""
+        if len(v) > settings.BATCH_MAX_TOPICS:
+            raise ValueError(f"At most {settings.BATCH_MAX_TOPICS} topics per batch")
+        topics = [t.strip() for t in v]
+        if any(not t for t in topics):
+            raise ValueError("Topics cannot be empty or only whitespace")
+        if any(len(t) > 500 for t in topics):
+            raise ValueError("Topics must be 500 characters or less")
+        return topics
+
+
+class BatchWorkflowResponse(BaseModel):
+    """Accepted batch (results via GET /batch/{batch_id} or its stream)"""
+    batch_id: str
+    workflow_type: str
+    status: Literal["running", "completed"]
+    total: int = Field(..., description="Topics submitted")
+    counts: Dict[str, int] = Field(default_factory=dict, description="Topics per status")
+
+
+class CacheWarmRequest(BaseModel):
+    """Request to warm the semantic cache (topics mined from request counts when omitted)"""
+    topics: Optional[List[str]] = Field(None, description="Topics to warm (default: most requested)")
+    workflow_type: Literal["tool_research", "multi_agent"] = Field("tool_research", description="Workflow to warm")
+    limit: Optional[int] = Field(None, ge=1, description="Topics to warm at most")
+    refresh: bool = Field(False, description="Re-run topics that are already cached")
+    concurrency: Optional[int] = Field(None, ge=1, le=16, description="Runs in flight (capped by CACHE_WARM_CONCURRENCY)")
+    
+    @field_validator('topics')
+    @classmethod
+    def validate_topics(cls, v: Optional[List[str]]) -> Optional[List[str]]:
+        """Drop blank topics and cap the list like a batch"""
+        if v is None:
+            return v
+        topics = [t.strip() for t in v if t.strip()]
+        if len(topics) > settings.BATCH_MAX_TOPICS:
+            raise ValueError(f"At most {settings.BATCH_MAX_TOPICS} topics per warm-up")
+        if any(len(t) > 500 for t in topics):
+            raise ValueError("Topics must be 500 characters or less")
+        return topics
+
+
 class WorkflowResponse(BaseModel):
     """Base response from workflow execution"""
     workflow_id: str = Field(..., description="Unique workflow execution ID")
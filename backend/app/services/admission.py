@@ -0,0 +1,225 @@
+"""
+Admission control for workflow runs.
+
+A run (cache miss) needs a slot before it starts: up to `limit` runs execute at
+once, later ones wait in a bounded FIFO queue for at most the queue timeout, and
+anything beyond that is rejected with AdmissionRejected (the routes answer 503 +
+Retry-After). Cache hits never ask for a slot. Background work (cache warming)
+takes a slot only when it is idle, leaving headroom for interactive requests.
+
+With adaptive mode the limit follows AIMD on observed run latency: +1/limit per
+run that finishes under the target, x0.75 (at most once per target interval) when
+a run takes longer.
+"""
+from app.core.config import settings
+from app.services.metrics_service import metrics_service
+from collections import deque
+from typing import Any, Deque, Dict, Optional
+import asyncio
+import math
+import time
+import logging
+
+logger = logging.getLogger(__name__)
+
+DECREASE_FACTOR = 0.75
+BACKGROUND_POLL_SECONDS = 1.0  # How often background work re-checks for an idle slot
+LATENCY_SMOOTHING = 0.2  # EWMA weight of the newest run
+
+
+class AdmissionRejected(Exception):
+    """The run was not admitted (queue full or waited too long)"""
+
+    def __init__(self, reason: str, retry_after: float):
+        self.reason = reason
+        self.retry_after = retry_after
+        super().__init__(f"Server at capacity ({reason})")
+
+
+class AdmissionTicket:
+    """A held run slot; release() is idempotent"""
+
+    def __init__(self, controller: "AdmissionController"):
+        self.controller = controller
+        self.started = time.monotonic()
+        self.released = False
+
+    def release(self, observe: bool = True):
+        """Give the slot back; observe=False for runs whose latency means nothing (client went away)"""
+        if self.released:
+            return
+        self.released = True
+        self.controller._release(time.monotonic() - self.started if observe else None)
+
+
+class AdmissionController:
+    """Concurrency limit + bounded wait queue in front of workflow runs"""
+
+    def __init__(
+        self,
+        max_concurrent: int,
+        queue_size: int,
+        queue_timeout: float,
+        adaptive: bool = False,
+        target_latency: float = 90.0,
+        min_limit: int = 1,
+        max_limit: int = None
+    ):
+        self.queue_size = max(0, queue_size)
+        self.queue_timeout = queue_timeout
+        self.adaptive = adaptive
+        self.target_latency = target_latency
+        self.min_limit = max(1, min_limit)
+        self.max_limit = max(self.min_limit, max_limit or max_concurrent)
+        self.initial_limit = max(self.min_limit, min(max_concurrent, self.max_limit))
+        self.reset()
+
+    @property
+    def limit(self) -> int:
+        return int(self._limit)
+
+    @property
+    def waiting(self) -> int:
+        return len(self._waiters)
+
+    async def acquire(self, workflow_type: str = None) -> AdmissionTicket:
+        """Wait for a run slot; raises AdmissionRejected when the queue is full or the wait times out"""
+
+        start = time.monotonic()
+        queued = False
+        if self.active < self.limit and not self._waiters:
+            self.active += 1
+        elif len(self._waiters) >= self.queue_size:
+            self._reject("queue_full", workflow_type)
+        else:
+            queued = True
+            self.queued += 1
+            await self._wait(workflow_type)
+
+        self.admitted += 1
+        metrics_service.record_stage(
+            "admission",
+            workflow=workflow_type or "unknown",
+            queued=queued,
+            wait_ms=round((time.monotonic() - start) * 1000, 1),
+            limit=self.limit
+        )
+        return AdmissionTicket(self)
+
+    async def acquire_idle(self, workflow_type: str = None, reserve: int = 0, poll: float = BACKGROUND_POLL_SECONDS) -> AdmissionTicket:
+        """
+        Low-priority slot: wait (without queueing) until nobody is waiting and more
+        than `reserve` slots are free, so background runs never delay a request.
+        """
+
+        start = time.monotonic()
+        # The reserve never takes every slot (a limit shrunk by AIMD would starve warming)
+        while self._waiters or self.active + min(reserve, self.limit - 1) >= self.limit:
+            await asyncio.sleep(poll)
+        self.active += 1
+        self.admitted += 1
+        metrics_service.record_stage(
+            "admission",
+            workflow=workflow_type or "unknown",
+            background=True,
+            wait_ms=round((time.monotonic() - start) * 1000, 1),
+            limit=self.limit
+        )
+        return AdmissionTicket(self)
+
+    async def _wait(self, workflow_type: Optional[str]):
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        try:
+            await asyncio.wait_for(asyncio.shield(waiter), timeout=self.queue_timeout)
+        except (asyncio.TimeoutError, asyncio.CancelledError) as e:
+            if waiter.done() and not waiter.cancelled():
+                # The slot was handed over as we gave up: pass it on
+                self.active -= 1
+                self._wake()
+            else:
+                waiter.cancel()
+                if waiter in self._waiters:
+                    self._waiters.remove(waiter)
+            if isinstance(e, asyncio.CancelledError):
+                raise
+            self._reject("queue_timeout", workflow_type)
+
+    def _reject(self, reason: str, workflow_type: Optional[str]):
+        self.rejections[reason] += 1
+        metrics_service.record_stage("admission", workflow=workflow_type or "unknown", rejected=reason)
+        raise AdmissionRejected(reason, self.retry_after())
+
+    def _release(self, latency: Optional[float]):
+        self.active -= 1
+        if latency is not None:
+            self._observe(latency)
+        self._wake()
+
+    def _wake(self):
+        """Hand free slots to waiters in arrival order (the slot is counted before they resume)"""
+        while self._waiters and self.active < self.limit:
+            waiter = self._waiters.popleft()
+            if waiter.done():
+                continue
+            self.active += 1
+            waiter.set_result(None)
+
+    def _observe(self, latency: float):
+        self.latency_ewma = latency if self.latency_ewma is None else (
+            LATENCY_SMOOTHING * latency + (1 - LATENCY_SMOOTHING) * self.latency_ewma
+        )
+        if not self.adaptive:
+            return
+        now = time.monotonic()
+        if latency > self.target_latency:
+            # One decrease per target interval: runs started under the old limit finish slow too
+            if now - self._last_decrease >= self.target_latency:
+                self._limit = max(float(self.min_limit), self._limit * DECREASE_FACTOR)
+                self._last_decrease = now
+                logger.info(f"Admission limit decreased to {self.limit} (run took {latency:.1f}s)")
+        else:
+            self._limit = min(float(self.max_limit), self._limit + 1 / self._limit)
+
+    def retry_after(self) -> float:
+        """Rough wait until a slot frees up: queue drain time at the observed run latency"""
+        if self.latency_ewma is None:
+            return max(1.0, self.queue_timeout)
+        return max(1.0, self.latency_ewma * (len(self._waiters) + 1) / max(1, self.limit))
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "limit": self.limit,
+            "adaptive": self.adaptive,
+            "active": self.active,
+            "waiting": len(self._waiters),
+            "queue_size": self.queue_size,
+            "admitted": self.admitted,
+            "queued": self.queued,
+            "rejections": dict(self.rejections),
+            "latency_ewma_seconds": None if self.latency_ewma is None else round(self.latency_ewma, 2),
+            "retry_after_seconds": math.ceil(self.retry_after())
+        }
+
+    def reset(self):
+        """Back to the configured limit with no runs, waiters or counters (tests)"""
+        self._limit = float(self.initial_limit)
+        self._waiters: Deque[asyncio.Future] = deque()
+        self._last_decrease = 0.0
+        self.active = 0
+        self.latency_ewma: Optional[float] = None
+        self.admitted = 0
+        self.queued = 0
+        self.rejections = {"queue_full": 0, "queue_timeout": 0}
+
+
+# Global instance
+admission_controller = AdmissionController(
+    settings.ADMISSION_MAX_CONCURRENT,
+    settings.ADMISSION_QUEUE_SIZE,
+    settings.ADMISSION_QUEUE_TIMEOUT_SECONDS,
+    adaptive=settings.ADMISSION_ADAPTIVE,
+    target_latency=settings.ADMISSION_TARGET_LATENCY_SECONDS,
+    min_limit=settings.ADMISSION_MIN_CONCURRENT,
+    max_limit=settings.ADMISSION_MAX_CONCURRENT_CEILING
+)
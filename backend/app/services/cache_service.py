@@ -1,13 +1,34 @@
 import redis
+import asyncio
+import copy
 import hashlib
 import json
+import time
 import numpy as np
-from typing import Optional, Dict, Any, List, Tuple
+from typing import Callable, Optional, Dict, Any, List, Tuple
 from app.core.config import settings
+from app.services.cold_store import ColdStore
+from app.services.local_cache import LocalCache, LocalEntry
+from app.services.metrics_service import metrics_service
 import logging
 
 logger = logging.getLogger(__name__)
 
+# Bookkeeping fields stored alongside a result (hidden from readers)
+META_PREFIX = "_cached_"
+META_TOPIC = "_cached_topic"  # Topic the entry was computed for (what a refresh re-runs)
+META_STORED_AT = "_cached_at"  # Unix time the entry was written
+META_BYTES = "_cached_bytes"  # Payload size of the entry and its embedding sidecar
+META_HITS = "_cached_hits"  # Hits served from the entry
+META_ACCESSED = "_cached_accessed"  # Unix time of the last hit (or the write)
+META_COLD = "_cached_cold"  # Fields moved to the cold tier (JSON list)
+
+EMBEDDING_SUFFIX = ":embedding"
+HIT_BUCKETS = ((0, 0), (1, 1), (2, 4), (5, 9), (10, None))  # Hit count distribution in stats
+INVALIDATION_CHANNEL = "cache-invalidate"  # Pub/sub channel replicas drop their L1 copies on
+PROMOTION_CHANNEL = "cache-cold-promote"  # Requests to the replica holding a cold payload
+L1_HIT_FLUSH = 16  # L1 hits added to an entry's Redis hit count at a time
+
 
 class CacheService:
     """Semantic caching service using Redis and sentence embeddings"""
@@ -16,6 +37,26 @@ class CacheService:
         self.enabled = settings.CACHE_ENABLED
         self.redis_client = None
         self.model = None
+        # Called as revalidator(cache_key, topic, workflow_type) for stale hits; returns True
+        # when a refresh is in flight (set by the app, see app.workflows.revalidation)
+        self.revalidator: Optional[Callable[[str, str, str], bool]] = None
+        # Upper bound of the bytes stored since the last budget scan (None: scan on next store)
+        self._estimated_bytes: Optional[int] = None
+        self.evictions = 0
+        # Compressed on-disk tier for large fields of idle entries (CACHE_COLD_TIER)
+        self.cold_store: Optional[ColdStore] = None
+        self.demotions = 0
+        self.promotions = 0
+        # In-process L1 of decoded results (CACHE_L1_MAX_MB), kept coherent over pub/sub
+        self.local_cache: Optional[LocalCache] = None
+        if settings.CACHE_L1_MAX_MB:
+            self.local_cache = LocalCache(
+                int(settings.CACHE_L1_MAX_MB * 1024 * 1024),
+                settings.CACHE_L1_TTL_SECONDS,
+                on_drop=lambda cache_key, hits: self._touch(cache_key, hits, served=False)
+            )
+        self._listener = None
+        self.tier_hits = {"l1": 0, "redis": 0, "cold": 0}
         
         if self.enabled:
             try:
@@ -42,6 +83,13 @@ class CacheService:
                 self.model = SentenceTransformer(settings.EMBEDDING_MODEL)
                 logger.info(f"Embedding model loaded: {settings.EMBEDDING_MODEL}")
                 logger.info("CACHE FULLY INITIALIZED AND ENABLED")
+                
+                if settings.CACHE_COLD_TIER:
+                    try:
+                        self.cold_store = ColdStore(settings.CACHE_COLD_PATH, settings.CACHE_COLD_COMPRESSION_LEVEL)
+                        logger.info(f"Cache cold tier at {settings.CACHE_COLD_PATH}")
+                    except Exception as e:
+                        logger.error(f"Cache cold tier unavailable: {e}. Keeping every payload in Redis.")
             except Exception as e:
                 logger.error(f"Cache initialization failed: {e}. Running without cache.", exc_info=True)
                 self.enabled = False
@@ -54,75 +102,139 @@ class CacheService:
         """Compute cosine similarity between embeddings"""
         return float(np.dot(emb1, emb2) / (np.linalg.norm(emb1) * np.linalg.norm(emb2)))
     
+    def _encode_embedding(self, embedding: np.ndarray) -> bytes:
+        """
+        Stored form of an embedding (CACHE_EMBEDDING_DTYPE) after unit normalization:
+        float32 (4 bytes/dim), float16 (2 bytes/dim) or int8 prefixed by its float32 scale
+        (1 byte/dim + 4). The layouts differ in length, so entries written under another
+        setting keep decoding.
+        """
+        vector = np.asarray(embedding, dtype=np.float32)
+        vector = vector / (np.linalg.norm(vector) or 1.0)
+        if settings.CACHE_EMBEDDING_DTYPE == "float16":
+            return vector.astype(np.float16).tobytes()
+        if settings.CACHE_EMBEDDING_DTYPE == "int8":
+            scale = np.float32(np.abs(vector).max() / 127 or 1.0)
+            return scale.tobytes() + np.round(vector / scale).astype(np.int8).tobytes()
+        return vector.tobytes()
+    
+    def _decode_embeddings(self, blobs: List[bytes], dims: int) -> np.ndarray:
+        """Dequantized (len(blobs), dims) float32 matrix; rows of unknown layouts stay zero"""
+        matrix = np.zeros((len(blobs), dims), dtype=np.float32)
+        rows_by_size: Dict[int, List[int]] = {4 * dims: [], 2 * dims: [], dims + 4: []}
+        for row, blob in enumerate(blobs):
+            if len(blob) in rows_by_size:
+                rows_by_size[len(blob)].append(row)
+        
+        for size, rows in rows_by_size.items():
+            if not rows:
+                continue
+            packed = b"".join(blobs[row] for row in rows)
+            if size == 4 * dims:
+                matrix[rows] = np.frombuffer(packed, dtype=np.float32).reshape(-1, dims)
+            elif size == 2 * dims:
+                matrix[rows] = np.frombuffer(packed, dtype=np.float16).reshape(-1, dims)
+            else:
+                raw = np.frombuffer(packed, dtype=np.uint8).reshape(-1, size)
+                scales = raw[:, :4].copy().view(np.float32)
+                matrix[rows] = raw[:, 4:].view(np.int8) * scales
+        return matrix
+    
+    def _rank_candidates(self, query: np.ndarray, keys: List[str], blobs: List[bytes], threshold: float) -> Tuple[Optional[str], float]:
+        """
+        Best match for a query among stored embeddings
+        
+        All candidates are scored in one matrix product on the dequantized vectors. A
+        quantized score within CACHE_RERANK_MARGIN of the threshold could land on either
+        side of it, so when the best one does, the top CACHE_RERANK_TOP_K candidates in
+        the band are re-scored with exact float32 embeddings of their topics.
+        
+        Returns:
+            (cache key or None, similarity)
+        """
+        query = np.asarray(query, dtype=np.float32)
+        matrix = self._decode_embeddings(blobs, query.shape[0])
+        norms = np.linalg.norm(matrix, axis=1) * np.linalg.norm(query)
+        scores = np.divide(matrix @ query, norms, out=np.zeros(len(keys), dtype=np.float32), where=norms > 0)
+        
+        order = np.argsort(-scores)[:settings.CACHE_RERANK_TOP_K]
+        best = int(order[0])
+        margin = settings.CACHE_RERANK_MARGIN
+        if scores[best] >= threshold + margin or scores[best] < threshold - margin:
+            return keys[best], float(scores[best])
+        
+        # Entries already stored in float32 are exact; the others are re-embedded from their topic
+        band = [int(i) for i in order if scores[i] >= threshold - margin]
+        inexact = [i for i in band if len(blobs[i]) != 4 * query.shape[0]]
+        pipe = self.redis_client.pipeline(transaction=False)
+        for i in inexact:
+            pipe.hget(keys[i], META_TOPIC)
+        exact = {i: float(scores[i]) for i in band}
+        for i, topic in zip(inexact, pipe.execute(raise_on_error=False)):
+            if isinstance(topic, bytes):
+                exact[i] = self._compute_similarity(query, self._generate_embedding(json.loads(topic)))
+        best = max(exact, key=exact.get)
+        return keys[best], exact[best]
+    
     def _get_topic_hash(self, topic: str) -> str:
         """Generate hash for topic"""
         return hashlib.sha256(topic.lower().strip().encode()).hexdigest()[:16]
     
-    def get_cached_result(
-        self, 
-        topic: str, 
-        workflow_type: str
-    ) -> Optional[Dict[str, Any]]:
+    def find_cached_entry(
+        self,
+        topic: str,
+        workflow_type: str,
+        threshold: Optional[float] = None
+    ) -> Optional[str]:
         """
-        Retrieve cached result for semantically similar topic
+        Find the cache key of the most similar cached topic
         
         Args:
             topic: Research topic
             workflow_type: Type of workflow (reflection, tool_research, multi_agent)
+            threshold: Similarity threshold override (defaults to CACHE_SIMILARITY_THRESHOLD)
             
         Returns:
-            Cached result dict or None
+            Cache key above the similarity threshold, or None
         """
         if not self.enabled:
             return None
         
+        alias = f"{workflow_type}:{self._get_topic_hash(topic)}"
+        if self.local_cache is not None:
+            cache_key = self.local_cache.resolve(alias)
+            if cache_key is not None:
+                return cache_key
+        
         try:
             # Generate embedding for query topic
             query_embedding = self._generate_embedding(topic)
             
             # Get all cache keys for this workflow type
             pattern = f"cache:{workflow_type}:*"
-            keys = self.redis_client.keys(pattern)
+            keys = [k.decode() for k in self.redis_client.keys(pattern) if not k.endswith(EMBEDDING_SUFFIX.encode())]
             
-            if not keys:
+            # Fetch every embedding in one round-trip
+            blobs = self.redis_client.mget([k + EMBEDDING_SUFFIX for k in keys]) if keys else []
+            stored = [(k, b) for k, b in zip(keys, blobs) if b]
+            if not stored:
                 logger.debug(f"No cache entries for {workflow_type}")
                 return None
             
+            if threshold is None:
+                threshold = settings.CACHE_SIMILARITY_THRESHOLD
             # Find most similar cached topic
-            best_match = None
-            best_similarity = 0.0
-            
-            for key in keys:
-                try:
-                    # Get cached embedding
-                    embedding_key = key.decode() + ":embedding"
-                    cached_embedding_bytes = self.redis_client.get(embedding_key)
-                    
-                    if not cached_embedding_bytes:
-                        continue
-                    
-                    cached_embedding = np.frombuffer(cached_embedding_bytes, dtype=np.float32)
-                    
-                    # Compute similarity
-                    similarity = self._compute_similarity(query_embedding, cached_embedding)
-                    
-                    if similarity > best_similarity:
-                        best_similarity = similarity
-                        best_match = key
-                
-                except Exception as e:
-                    logger.warning(f"Error processing cache key {key}: {e}")
-                    continue
+            best_match, best_similarity = self._rank_candidates(
+                query_embedding, [k for k, _ in stored], [b for _, b in stored], threshold
+            )
             
-            # Return result if similarity above threshold
-            if best_match and best_similarity >= settings.CACHE_SIMILARITY_THRESHOLD:
-                result_bytes = self.redis_client.get(best_match)
-                if result_bytes:
-                    result = json.loads(result_bytes.decode())
-                    logger.info(
-                        f"Cache HIT for '{topic}' (similarity: {best_similarity:.3f})"
-                    )
-                    return result
+            if best_match and best_similarity >= threshold:
+                logger.info(
+                    f"Cache HIT for '{topic}' (similarity: {best_similarity:.3f})"
+                )
+                if self.local_cache is not None:
+                    self.local_cache.alias(alias, best_match)
+                return best_match
             
             logger.debug(
                 f"Cache MISS for '{topic}' (best similarity: {best_similarity:.3f})"
@@ -133,11 +245,278 @@ class CacheService:
             logger.error(f"Cache retrieval error: {e}")
             return None
     
+    def read_cached_fields(
+        self,
+        cache_key: str,
+        fields: Optional[List[str]] = None
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Read some (or all) fields of a cached result without loading the rest
+        
+        Args:
+            cache_key: Key returned by find_cached_entry
+            fields: Field names to read, or None for the whole result
+            
+        Returns:
+            Dict of the requested fields that exist, or None if the entry is gone
+        """
+        if not self.enabled:
+            return None
+        
+        local = self.local_cache.get(cache_key) if self.local_cache is not None else None
+        if local is not None:
+            # Copies: callers may modify what they get, the L1 copy is shared
+            if fields is None:
+                return copy.deepcopy(local.fields)
+            return {f: copy.deepcopy(local.fields[f]) for f in fields if f in local.fields}
+        
+        try:
+            if fields is None:
+                generation = self.local_cache.generation if self.local_cache is not None else None
+                pipe = self.redis_client.pipeline(transaction=False)
+                pipe.hgetall(cache_key)
+                pipe.ttl(cache_key)
+                raw, ttl = pipe.execute()
+                if not raw:
+                    return None
+                result = {k.decode(): v for k, v in raw.items() if not k.startswith(META_PREFIX.encode())}
+                if META_COLD.encode() in raw:
+                    cold = self._read_cold(cache_key)
+                    if cold is None:
+                        return None  # No replica holds the payload any more: a partial result is no hit
+                    result.update(cold)
+                decoded = {k: json.loads(v) for k, v in result.items()}
+                if generation is not None:
+                    stored_at, topic = raw.get(META_STORED_AT.encode()), raw.get(META_TOPIC.encode())
+                    self.local_cache.put(
+                        cache_key,
+                        copy.deepcopy(decoded),
+                        sum(len(k) + len(v) for k, v in result.items()),
+                        ttl,
+                        generation,
+                        stored_at=json.loads(stored_at) if stored_at is not None else None,
+                        topic=json.loads(topic) if topic is not None else None
+                    )
+                return decoded
+            
+            if not fields:
+                return {}
+            values = self.redis_client.hmget(cache_key, fields + [META_COLD])
+            found = {f: v for f, v in zip(fields, values) if v is not None}
+            cold_fields = [f for f in json.loads(values[-1]) if f in fields] if values[-1] is not None else []
+            if cold_fields:
+                cold = self._read_cold(cache_key, cold_fields)
+                if cold is None or any(f not in cold for f in cold_fields):
+                    return None  # As for a full read: a field no replica holds any more is no hit
+                found.update(cold)
+            return {f: json.loads(v) for f, v in found.items()}
+        
+        except redis.ResponseError:
+            # Entries written before field-level storage are a single JSON string
+            result_bytes = self.redis_client.get(cache_key)
+            if not result_bytes:
+                return None
+            result = json.loads(result_bytes.decode())
+            return result if fields is None else {f: result[f] for f in fields if f in result}
+        
+        except Exception as e:
+            logger.error(f"Cache field read error: {e}")
+            return None
+    
+    def list_cached_fields(self, cache_key: str) -> List[str]:
+        """
+        List the field names stored for a cached result
+        
+        With L1 on, this reads the whole entry into L1 (or lists it from there), so a
+        replay that then reads the entry field by field is served locally.
+        """
+        if not self.enabled:
+            return []
+        
+        if self.local_cache is not None:
+            local = self.local_cache.get(cache_key)
+            if local is not None:
+                return list(local.fields)
+            return list(self.read_cached_fields(cache_key) or {})
+        
+        try:
+            pipe = self.redis_client.pipeline(transaction=False)
+            pipe.hkeys(cache_key)
+            pipe.hget(cache_key, META_COLD)
+            names, cold = pipe.execute()
+            hot = [f.decode() for f in names if not f.startswith(META_PREFIX.encode())]
+            return hot + (json.loads(cold) if cold is not None else [])
+        except redis.ResponseError:
+            return list((self.read_cached_fields(cache_key) or {}).keys())
+        except Exception as e:
+            logger.error(f"Cache field listing error: {e}")
+            return []
+    
+    def get_cached_result(
+        self, 
+        topic: str, 
+        workflow_type: str
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Retrieve cached result for semantically similar topic
+        
+        Args:
+            topic: Research topic
+            workflow_type: Type of workflow (reflection, tool_research, multi_agent)
+            
+        Returns:
+            Cached result dict or None
+        """
+        cache_key = self.find_cached_entry(topic, workflow_type)
+        if not cache_key:
+            return None
+        result = self.read_cached_fields(cache_key)
+        if result:
+            self.record_hit(cache_key)
+        return result
+    
+    async def get_cached_result_async(self, topic: str, workflow_type: str) -> Optional[Dict[str, Any]]:
+        """
+        get_cached_result for the event loop: the lookup, cold-tier promotion (including a
+        wait for another replica) and the read run in a worker thread; the hit is recorded
+        on the loop, where a stale entry can schedule its refresh
+        """
+        cache_key, result, promoted = await asyncio.to_thread(self._read_hit, topic, workflow_type)
+        if result:
+            self.record_hit(cache_key, promoted=promoted)
+        return result
+    
+    def _read_hit(self, topic: str, workflow_type: str) -> Tuple[Optional[str], Optional[Dict[str, Any]], bool]:
+        cache_key = self.find_cached_entry(topic, workflow_type)
+        if not cache_key:
+            return None, None, False
+        promoted = self.ensure_hot(cache_key)
+        if promoted is None:
+            return cache_key, None, False
+        return cache_key, self.read_cached_fields(cache_key), promoted
+    
+    def record_hit(self, cache_key: str, promoted: bool = False) -> Dict[str, Any]:
+        """
+        Count a hit for eviction (hits, last access) and report freshness (see check_freshness)
+        
+        Args:
+            promoted: ensure_hot promoted the entry for this hit (counted as a cold-tier hit)
+        """
+        local = self._local_hit(cache_key)
+        if local is not None:
+            return self._freshness(cache_key, local.topic, local.stored_at)
+        self._touch(cache_key, promoted=promoted)
+        return self.check_freshness(cache_key)
+    
+    def ensure_hot(self, cache_key: str) -> Optional[bool]:
+        """
+        Bring an entry's demoted fields back into Redis before it is served field by field,
+        so a replay never announces a hit it cannot deliver
+        
+        Returns:
+            True if fields were promoted, False if there was nothing to promote (hot entry,
+            or held in L1), None if no replica holds the cold payload any more
+        """
+        if not self.enabled:
+            return False
+        if self.local_cache is not None and self.local_cache.get(cache_key) is not None:
+            return False
+        try:
+            if not self.redis_client.hexists(cache_key, META_COLD):
+                return False
+            if self.promote_entry(cache_key) or self._request_promotion(cache_key) is not None:
+                return True
+            return None
+        except redis.ResponseError:
+            return False  # Legacy single-string entry
+        except Exception as e:
+            logger.error(f"Cache promotion error: {e}")
+            return False  # The reads that follow report the entry as they find it
+    
+    def _local_hit(self, cache_key: str) -> Optional[LocalEntry]:
+        """Count a hit served from L1 (None if the hit was read from Redis)"""
+        local = self.local_cache.get(cache_key) if self.local_cache is not None else None
+        if local is None or not local.claimed:
+            if local is not None:
+                local.claimed = True  # This read filled L1; the next ones are served from it
+            return None
+        
+        self.tier_hits["l1"] += 1
+        local.pending_hits += 1
+        if local.pending_hits >= L1_HIT_FLUSH:
+            hits, local.pending_hits = local.pending_hits, 0
+            self._touch(cache_key, hits, served=False)
+        return local
+    
+    def _touch(self, cache_key: str, hits: int = 1, served: bool = True, promoted: bool = False):
+        if not self.enabled:
+            return
+        try:
+            pipe = self.redis_client.pipeline()
+            pipe.hincrby(cache_key, META_HITS, hits)
+            pipe.hset(cache_key, META_ACCESSED, json.dumps(time.time()))
+            pipe.ttl(cache_key)
+            pipe.hexists(cache_key, META_COLD)
+            _, _, ttl, cold = pipe.execute()
+            if ttl == -1:
+                # Every entry has a TTL: the entry expired in between and the hit recreated it
+                self.redis_client.delete(cache_key)
+                return
+            if served:
+                self.tier_hits["cold" if cold or promoted else "redis"] += 1
+            if cold and self.cold_store is not None:
+                self.promote_entry(cache_key)
+        except redis.ResponseError:
+            pass  # Legacy single-string entry: not tracked
+        except Exception as e:
+            logger.warning(f"Cache hit accounting error: {e}")
+    
+    def check_freshness(self, cache_key: str) -> Dict[str, Any]:
+        """
+        Age of a cached result; past CACHE_SOFT_TTL_SECONDS it is stale and a background
+        refresh is requested from the revalidator (the entry is still served meanwhile)
+        
+        Returns:
+            {"stale": bool, "age_seconds": int | None, "revalidating": bool}
+        """
+        freshness = {"stale": False, "age_seconds": None, "revalidating": False}
+        if not self.enabled:
+            return freshness
+        
+        try:
+            topic, stored_at = self.redis_client.hmget(cache_key, [META_TOPIC, META_STORED_AT])
+        except redis.ResponseError:
+            return freshness  # Legacy single-string entry: no age recorded
+        except Exception as e:
+            logger.error(f"Cache freshness check error: {e}")
+            return freshness
+        if stored_at is None:
+            return freshness
+        return self._freshness(cache_key, json.loads(topic) if topic is not None else None, json.loads(stored_at))
+    
+    def _freshness(self, cache_key: str, topic: Optional[str], stored_at: Optional[float]) -> Dict[str, Any]:
+        freshness = {"stale": False, "age_seconds": None, "revalidating": False}
+        if stored_at is None:
+            return freshness
+        
+        age = time.time() - stored_at
+        freshness["age_seconds"] = int(age)
+        if not settings.CACHE_SOFT_TTL_SECONDS or age < settings.CACHE_SOFT_TTL_SECONDS:
+            return freshness
+        
+        freshness["stale"] = True
+        workflow_type = cache_key.split(":")[1]
+        if self.revalidator is not None and topic is not None and workflow_type != "stage":
+            freshness["revalidating"] = bool(self.revalidator(cache_key, topic, workflow_type))
+        return freshness
+    
     def store_result(
         self,
         topic: str,
         workflow_type: str,
-        result: Dict[str, Any]
+        result: Dict[str, Any],
+        ttl: Optional[int] = None,
+        embed: bool = True
     ) -> bool:
         """
         Store workflow result with semantic embedding
@@ -146,43 +525,125 @@ class CacheService:
             topic: Research topic
             workflow_type: Type of workflow
             result: Workflow result to cache
+            ttl: Expiry in seconds (defaults to CACHE_TTL_SECONDS)
+            embed: Store the embedding sidecar (exact-match entries skip it)
             
         Returns:
             True if stored successfully
         """
-        if not self.enabled:
+        if not self.enabled or not result:
             return False
         
+        ttl = ttl or settings.CACHE_TTL_SECONDS
+        
         try:
-            # Generate embedding
-            embedding = self._generate_embedding(topic)
-            
             # Create cache key
             topic_hash = self._get_topic_hash(topic)
             cache_key = f"cache:{workflow_type}:{topic_hash}"
             embedding_key = f"{cache_key}:embedding"
             
-            # Store result
-            self.redis_client.setex(
-                cache_key,
-                settings.CACHE_TTL_SECONDS,
-                json.dumps(result)
-            )
+            # Store result as a hash (one JSON value per field) so fields can be read lazily;
+            # the pipeline is a MULTI/EXEC transaction, so a refresh replaces the entry atomically
+            now = time.time()
+            embedding_bytes = self._encode_embedding(self._generate_embedding(topic)) if embed else b""
+            fields = {k: json.dumps(v) for k, v in result.items()}
+            fields[META_TOPIC] = json.dumps(topic)
+            fields[META_STORED_AT] = json.dumps(now)
+            fields[META_ACCESSED] = json.dumps(now)
+            # A refreshed entry keeps its hit count (popularity is about the topic)
+            fields[META_HITS] = self._hits(cache_key)
+            size = sum(len(k) + len(v) for k, v in fields.items()) + len(embedding_bytes)
+            fields[META_BYTES] = json.dumps(size)
+            pipe = self.redis_client.pipeline()
+            pipe.delete(cache_key)
+            pipe.hset(cache_key, mapping=fields)
+            pipe.expire(cache_key, ttl)
             
             # Store embedding
-            self.redis_client.setex(
-                embedding_key,
-                settings.CACHE_TTL_SECONDS,
-                embedding.astype(np.float32).tobytes()
-            )
+            if embed:
+                pipe.setex(
+                    embedding_key,
+                    ttl,
+                    embedding_bytes
+                )
+            # Replicas drop their L1 copy of the entry this write replaces
+            pipe.publish(INVALIDATION_CHANNEL, json.dumps({"keys": [cache_key]}))
+            pipe.execute()
+            self._invalidate_local({"keys": [cache_key]})
+            
+            if self.cold_store is not None:
+                self.cold_store.delete(cache_key)  # Payload of the entry this write replaced
             
             logger.info(f"Cached result for '{topic}' ({workflow_type})")
+            self._account(size, cache_key)
             return True
             
         except Exception as e:
             logger.error(f"Cache storage error: {e}")
             return False
     
+    def get_stage_result(self, stage: str, key_text: str) -> Optional[Any]:
+        """
+        Retrieve a cached intermediate artifact (plan, research, reflection, html)
+        
+        Each stage lives in its own "cache:stage:<stage>:" namespace with its own
+        similarity threshold; a threshold of 1.0 means exact match on the key text,
+        which skips the embedding entirely (used for report-keyed stages).
+        
+        Args:
+            stage: Stage namespace
+            key_text: Text the artifact was derived from (topic, task or report)
+            
+        Returns:
+            Cached artifact or None
+        """
+        if not self.enabled or not key_text:
+            return None
+        
+        workflow_type = f"stage:{stage}"
+        threshold = settings.CACHE_STAGE_SIMILARITY.get(stage, settings.CACHE_SIMILARITY_THRESHOLD)
+        
+        if threshold >= 1.0:
+            cache_key = f"cache:{workflow_type}:{self._get_topic_hash(key_text)}"
+        else:
+            cache_key = self.find_cached_entry(key_text, workflow_type, threshold=threshold)
+            if not cache_key:
+                return None
+        
+        entry = self.read_cached_fields(cache_key)  # The whole entry is the value (fills L1)
+        if not entry or "value" not in entry:
+            logger.debug(f"Stage cache MISS [{stage}]")
+            return None
+        if self._local_hit(cache_key) is None:
+            self._touch(cache_key)
+        
+        logger.info(f"Stage cache HIT [{stage}]")
+        return entry["value"]
+    
+    def store_stage_result(self, stage: str, key_text: str, value: Any) -> bool:
+        """
+        Store an intermediate artifact under its stage namespace
+        
+        Args:
+            stage: Stage namespace
+            key_text: Text the artifact was derived from
+            value: JSON-serializable artifact
+            
+        Returns:
+            True if stored successfully
+        """
+        if not self.enabled or not key_text or value is None:
+            return False
+        
+        threshold = settings.CACHE_STAGE_SIMILARITY.get(stage, settings.CACHE_SIMILARITY_THRESHOLD)
+        return self.store_result(
+            key_text,
+            f"stage:{stage}",
+            {"value": value},
+            ttl=settings.CACHE_STAGE_TTL_SECONDS.get(stage, settings.CACHE_TTL_SECONDS),
+            embed=threshold < 1.0
+        )
+    
     def invalidate_cache(self, topic_hash: Optional[str] = None) -> int:
         """
         Invalidate cache entries
@@ -205,17 +666,391 @@ class CacheService:
                 pattern = "cache:*"
             
             keys = self.redis_client.keys(pattern)
+            message = {"suffix": topic_hash} if topic_hash else {"all": True}
+            # Deleted and announced in one transaction: a replica that drops its L1 copy on the
+            # message cannot re-read the entry from Redis
+            pipe = self.redis_client.pipeline()
             if keys:
-                deleted = self.redis_client.delete(*keys)
+                pipe.delete(*keys)
+            pipe.publish(INVALIDATION_CHANNEL, json.dumps(message))
+            results = pipe.execute()
+            self._invalidate_local(message)
+            if self.cold_store is not None:
+                self.cold_store.delete_matching(topic_hash)
+            
+            deleted = results[0] if keys else 0
+            if deleted:
                 logger.info(f"Invalidated {deleted} cache entries")
-                return deleted
+            return deleted
+            
+        except Exception as e:
+            logger.error(f"Cache invalidation error: {e}")
+            return 0
+    
+    def _hits(self, cache_key: str) -> str:
+        """Current hit count of an entry as a stored field value ("0" if new or untracked)"""
+        try:
+            return (self.redis_client.hget(cache_key, META_HITS) or b"0").decode()
+        except redis.ResponseError:
+            return "0"
+    
+    def _account(self, size: int, cache_key: str):
+        """Add a write to the footprint estimate and evict once it may exceed the budget"""
+        budget = settings.CACHE_MEMORY_BUDGET_MB * 1024 * 1024
+        if not budget:
+            return
+        if self._estimated_bytes is not None:
+            self._estimated_bytes += size
+            if self._estimated_bytes <= budget:
+                return
+        self.enforce_budget(protect=cache_key)
+    
+    def _flush_local_hits(self):
+        """Add hits served from L1 to the Redis counters (before anything ranks entries by them)"""
+        if self.local_cache is None:
+            return
+        for cache_key, hits in self.local_cache.drain_hits().items():
+            self._touch(cache_key, hits, served=False)
+    
+    def _scan_entries(self, delete_orphans: bool = False) -> List[Dict[str, Any]]:
+        """
+        Every cached entry with its size, hits and last access
+        
+        Args:
+            delete_orphans: Also delete half-evicted pairs (an embedding without its
+                result, or a similarity-matched result without its embedding)
+        """
+        self._flush_local_hits()
+        keys = {k.decode() for k in self.redis_client.keys("cache:*")}
+        embeddings = {k for k in keys if k.endswith(EMBEDDING_SUFFIX)}
+        names = sorted(keys - embeddings)
+        
+        if delete_orphans:
+            orphans = [k for k in embeddings if k[:-len(EMBEDDING_SUFFIX)] not in keys]
+            orphans += [k for k in names if not k.startswith("cache:stage:") and k + EMBEDDING_SUFFIX not in embeddings]
+            if orphans:
+                self.redis_client.delete(*orphans)
+                logger.info(f"Deleted {len(orphans)} orphaned cache keys")
+                names = [k for k in names if k not in orphans]
+        
+        pipe = self.redis_client.pipeline(transaction=False)
+        for name in names:
+            pipe.hmget(name, [META_BYTES, META_HITS, META_ACCESSED, META_COLD])
+        rows = pipe.execute(raise_on_error=False)
+        
+        entries = []
+        for name, row in zip(names, rows):
+            if isinstance(row, Exception):
+                # Legacy single-string entry
+                size = self.redis_client.strlen(name) + self.redis_client.strlen(name + EMBEDDING_SUFFIX)
+                hits = accessed = cold = None
+            else:
+                size, hits, accessed, cold = row
+                if size is None:
+                    # Written before size tracking: measure once and remember
+                    size = sum(len(k) + len(v) for k, v in self.redis_client.hgetall(name).items())
+                    size += self.redis_client.strlen(name + EMBEDDING_SUFFIX)
+                    self.redis_client.hset(name, META_BYTES, json.dumps(size))
+            parts = name.split(":")
+            entries.append({
+                "key": name,
+                "workflow": ":".join(parts[1:3]) if parts[1] == "stage" else parts[1],
+                "bytes": int(size),
+                "hits": int(hits) if hits is not None else 0,
+                "accessed": float(accessed) if accessed is not None else None,
+                "cold": cold is not None
+            })
+        return entries
+    
+    def enforce_budget(self, protect: Optional[str] = None) -> int:
+        """
+        Keep the cache within CACHE_MEMORY_BUDGET_MB
+        
+        Once the footprint exceeds the budget, entries are evicted down to
+        CACHE_EVICTION_TARGET of it, lowest (decayed hits + 1) / bytes first: rarely used,
+        large entries go before popular small ones. Hits halve in weight every
+        CACHE_LFU_HALF_LIFE_HOURS without access. An entry and its embedding are
+        deleted together in one command. With the cold tier, an entry's large fields
+        are demoted to disk first; only entries with nothing left to demote are evicted.
+        
+        Args:
+            protect: Key never evicted (the entry just written)
             
+        Returns:
+            Number of entries evicted
+        """
+        budget = settings.CACHE_MEMORY_BUDGET_MB * 1024 * 1024
+        if not self.enabled or not budget:
             return 0
+        
+        try:
+            entries = self._scan_entries(delete_orphans=True)
+            total = sum(e["bytes"] for e in entries)
+            self._estimated_bytes = total
+            if total <= budget:
+                return 0
+            
+            now = time.time()
+            half_life = settings.CACHE_LFU_HALF_LIFE_HOURS * 3600
+            def priority(entry):
+                idle = now - (entry["accessed"] or 0)
+                return (entry["hits"] * 0.5 ** (idle / half_life) + 1) / max(entry["bytes"], 1)
             
+            target = budget * settings.CACHE_EVICTION_TARGET
+            evicted, demoted, freed = 0, 0, 0
+            evicted_keys = []
+            for entry in sorted(entries, key=priority):
+                if total <= target:
+                    break
+                if entry["key"] == protect:
+                    continue
+                moved = self.demote_entry(entry["key"]) if self.cold_store is not None and not entry["cold"] else 0
+                if moved:
+                    demoted += 1
+                else:
+                    self.redis_client.delete(entry["key"], entry["key"] + EMBEDDING_SUFFIX)
+                    if self.cold_store is not None:
+                        self.cold_store.delete(entry["key"])
+                    evicted_keys.append(entry["key"])
+                    moved = entry["bytes"]
+                    evicted += 1
+                total -= moved
+                freed += moved
+            
+            self._estimated_bytes = total
+            self.evictions += evicted
+            if evicted_keys:
+                self._broadcast_invalidation({"keys": evicted_keys})
+            logger.info(f"Cache over budget: demoted {demoted}, evicted {evicted} entries ({freed} bytes)")
+            metrics_service.record_stage(
+                "cache_eviction", evicted=evicted, demoted=demoted, freed_bytes=freed, total_bytes=total
+            )
+            return evicted
+        
         except Exception as e:
-            logger.error(f"Cache invalidation error: {e}")
+            logger.error(f"Cache eviction error: {e}")
             return 0
     
+    def _read_cold(self, cache_key: str, fields: Optional[List[str]] = None) -> Optional[Dict[str, str]]:
+        """Demoted fields of an entry: from this replica's cold store, else from the replica holding them"""
+        if self.cold_store is not None:
+            stored = self.cold_store.get(cache_key, fields)
+            if stored is not None:
+                return stored
+        return self._request_promotion(cache_key, fields)
+    
+    def _request_promotion(self, cache_key: str, fields: Optional[List[str]] = None) -> Optional[Dict[str, bytes]]:
+        """
+        Ask the replica whose disk holds an entry's cold payload to promote it back to
+        Redis, and read the fields once it has (None if none did within
+        CACHE_COLD_REMOTE_WAIT_SECONDS)
+        """
+        wait = settings.CACHE_COLD_REMOTE_WAIT_SECONDS
+        if not wait:
+            return None
+        receivers = self.redis_client.publish(PROMOTION_CHANNEL, json.dumps({"key": cache_key}))
+        # This replica's own listener is subscribed too, and its disk was already checked
+        listening = self._listener is not None and self.cold_store is not None
+        if receivers <= (1 if listening else 0):
+            return None
+        
+        deadline = time.monotonic() + wait
+        while self.redis_client.hexists(cache_key, META_COLD):
+            if time.monotonic() >= deadline:
+                logger.warning(f"No replica promoted the cold payload of {cache_key}")
+                return None
+            time.sleep(0.02)
+        
+        raw = self.redis_client.hgetall(cache_key)
+        values = {k.decode(): v for k, v in raw.items() if not k.startswith(META_PREFIX.encode())}
+        if not values:
+            return None
+        return values if fields is None else {f: values[f] for f in fields if f in values}
+    
+    def demote_entry(self, cache_key: str) -> int:
+        """
+        Move an entry's large fields (>= CACHE_COLD_MIN_FIELD_BYTES) to the cold tier
+        
+        The Redis hash keeps the small fields, the bookkeeping and the list of demoted
+        fields; the change is a WATCH/MULTI transaction, so a concurrent refresh wins.
+        
+        Returns:
+            Bytes freed in Redis (0 if nothing was moved)
+        """
+        if self.cold_store is None:
+            return 0
+        
+        try:
+            with self.redis_client.pipeline() as pipe:
+                pipe.watch(cache_key)
+                raw = pipe.hgetall(cache_key)
+                ttl = pipe.ttl(cache_key)
+                if not raw or META_COLD.encode() in raw or ttl <= 0:
+                    return 0
+                large = {
+                    k.decode(): v.decode() for k, v in raw.items()
+                    if not k.startswith(META_PREFIX.encode()) and len(v) >= settings.CACHE_COLD_MIN_FIELD_BYTES
+                }
+                if not large:
+                    return 0
+                moved = sum(len(k) + len(v) for k, v in large.items())
+                size = int(raw.get(META_BYTES.encode(), 0) or 0)
+                
+                self.cold_store.put(cache_key, large, ttl)
+                pipe.multi()
+                pipe.hdel(cache_key, *large)
+                pipe.hset(cache_key, mapping={
+                    META_COLD: json.dumps(sorted(large)),
+                    META_BYTES: json.dumps(max(0, size - moved))
+                })
+                pipe.execute()
+        except redis.WatchError:
+            self.cold_store.delete(cache_key)  # Rewritten meanwhile: the new entry stays hot
+            return 0
+        except redis.ResponseError:
+            return 0  # Legacy single-string entry
+        
+        self.demotions += 1
+        return moved
+    
+    def promote_entry(self, cache_key: str) -> bool:
+        """Bring an entry's demoted fields back into Redis (on a hit)"""
+        if self.cold_store is None:
+            return False
+        
+        try:
+            with self.redis_client.pipeline() as pipe:
+                pipe.watch(cache_key)
+                cold, size = pipe.hmget(cache_key, [META_COLD, META_BYTES])
+                if cold is None:
+                    return False
+                stored = self.cold_store.get(cache_key)
+                if stored is None:
+                    return False  # Not on this disk (another replica promotes it on request)
+                moved = sum(len(k) + len(v) for k, v in stored.items())
+                pipe.multi()
+                pipe.hset(cache_key, mapping={**stored, META_BYTES: json.dumps(int(size or 0) + moved)})
+                pipe.hdel(cache_key, META_COLD)
+                pipe.execute()
+        except redis.WatchError:
+            return False
+        
+        self.cold_store.delete(cache_key)
+        self.promotions += 1
+        if self._estimated_bytes is not None:
+            self._estimated_bytes += moved
+        return True
+    
+    def demote_idle_entries(self) -> Dict[str, int]:
+        """
+        One tiering pass: demote entries idle for CACHE_COLD_IDLE_HOURS and drop cold
+        payloads whose Redis entry expired or was deleted
+        """
+        if not self.enabled or self.cold_store is None:
+            return {"demoted": 0, "purged": 0}
+        
+        start = time.monotonic()
+        idle_before = time.time() - settings.CACHE_COLD_IDLE_HOURS * 3600
+        demoted, freed = 0, 0
+        try:
+            for entry in self._scan_entries():
+                if entry["cold"] or (entry["accessed"] or 0) > idle_before:
+                    continue
+                moved = self.demote_entry(entry["key"])
+                if moved:
+                    demoted += 1
+                    freed += moved
+            
+            purged = self.cold_store.purge_expired()
+            cold_keys = self.cold_store.keys()
+            if cold_keys:
+                pipe = self.redis_client.pipeline(transaction=False)
+                for key in cold_keys:
+                    pipe.hexists(key, META_COLD)
+                gone = [key for key, cold in zip(cold_keys, pipe.execute()) if not cold]
+                purged += self.cold_store.delete(*gone)
+        except Exception as e:
+            logger.error(f"Cache tiering error: {e}")
+            return {"demoted": demoted, "purged": 0}
+        
+        if self._estimated_bytes is not None:
+            self._estimated_bytes -= freed
+        metrics_service.record_stage(
+            "cache_tiering",
+            demoted=demoted,
+            freed_bytes=freed,
+            purged=purged,
+            duration_ms=round((time.monotonic() - start) * 1000, 1)
+        )
+        return {"demoted": demoted, "purged": purged}
+    
+    async def run_tiering(self):
+        """Background demotion loop (started by the app when the cold tier is on)"""
+        while True:
+            await asyncio.sleep(settings.CACHE_COLD_INTERVAL_SECONDS)
+            await asyncio.to_thread(self.demote_idle_entries)
+    
+    def _invalidate_local(self, message: Dict[str, Any]):
+        if self.local_cache is None:
+            return
+        if "keys" in message:
+            self.local_cache.invalidate(message["keys"])
+        elif "suffix" in message:
+            self.local_cache.invalidate(suffix=message["suffix"])
+        else:
+            self.local_cache.invalidate()
+    
+    def _broadcast_invalidation(self, message: Dict[str, Any]):
+        """Drop L1 copies here and on every other replica"""
+        self._invalidate_local(message)
+        try:
+            self.redis_client.publish(INVALIDATION_CHANNEL, json.dumps(message))
+        except Exception as e:
+            logger.warning(f"L1 invalidation broadcast failed: {e}")
+    
+    def _on_invalidation(self, message: Dict[str, Any]):
+        try:
+            self._invalidate_local(json.loads(message["data"]))
+        except Exception as e:
+            logger.warning(f"Malformed L1 invalidation message: {e}")
+            self.local_cache.invalidate()
+    
+    def _on_promotion_request(self, message: Dict[str, Any]):
+        try:
+            cache_key = json.loads(message["data"])["key"]
+        except Exception as e:
+            logger.warning(f"Malformed cold promotion request: {e}")
+            return
+        self.promote_entry(cache_key)  # No-op unless the payload is on this replica's disk
+    
+    def _on_listener_error(self, error: Exception, pubsub, thread):
+        # Messages may have been missed while disconnected: start over from Redis
+        logger.warning(f"Cache listener error: {error}")
+        if self.local_cache is not None:
+            self.local_cache.invalidate()
+        time.sleep(1.0)
+    
+    def start_invalidation_listener(self):
+        """
+        Subscribe to L1 invalidations and cold-tier promotion requests from other
+        replicas (started by the app)
+        """
+        handlers = {}
+        if self.local_cache is not None:
+            handlers[INVALIDATION_CHANNEL] = self._on_invalidation
+        if self.cold_store is not None:
+            handlers[PROMOTION_CHANNEL] = self._on_promotion_request
+        if not self.enabled or not handlers or self._listener is not None:
+            return
+        pubsub = self.redis_client.pubsub(ignore_subscribe_messages=True)
+        pubsub.subscribe(**handlers)
+        self._listener = pubsub.run_in_thread(sleep_time=1.0, daemon=True, exception_handler=self._on_listener_error)
+    
+    def stop_invalidation_listener(self):
+        if self._listener is not None:
+            self._listener.stop()
+            self._listener = None
+    
     def get_cache_stats(self) -> Dict[str, Any]:
         """Get cache statistics"""
         if not self.enabled:
@@ -232,23 +1067,67 @@ class CacheService:
                 "multi_agent": 0
             }
             
+            stage_counts = {stage: 0 for stage in settings.CACHE_STAGE_TTL_SECONDS}
+            entries = 0
+            
             for key in keys:
                 key_str = key.decode()
+                if key_str.endswith(":embedding"):
+                    continue
+                entries += 1
+                if key_str.startswith("cache:stage:"):
+                    stage = key_str.split(":")[2]
+                    stage_counts[stage] = stage_counts.get(stage, 0) + 1
+                    continue
                 for wf_type in counts.keys():
                     if f":{wf_type}:" in key_str:
                         counts[wf_type] += 1
             
             return {
                 "enabled": True,
-                "total_entries": len(keys) // 2,  # Each entry has embedding
+                "total_entries": entries,
                 "by_workflow": counts,
+                "by_stage": stage_counts,
                 "redis_memory_mb": round(info.get("used_memory", 0) / 1024 / 1024, 2),
-                "ttl_days": settings.CACHE_TTL_SECONDS // 86400
+                "ttl_days": settings.CACHE_TTL_SECONDS // 86400,
+                "soft_ttl_days": round(settings.CACHE_SOFT_TTL_SECONDS / 86400, 2),
+                "hits_by_tier": dict(self.tier_hits),
+                "l1": self.local_cache.stats() if self.local_cache is not None else None,
+                "memory": self.get_memory_stats()
             }
             
         except Exception as e:
             logger.error(f"Error getting cache stats: {e}")
             return {"enabled": True, "error": str(e)}
+    
+    def get_memory_stats(self) -> Dict[str, Any]:
+        """Tracked footprint against the budget, bytes per workflow/stage and hit count distribution"""
+        entries = self._scan_entries()
+        bytes_by_workflow: Dict[str, int] = {}
+        for entry in entries:
+            bytes_by_workflow[entry["workflow"]] = bytes_by_workflow.get(entry["workflow"], 0) + entry["bytes"]
+        
+        hit_distribution = {}
+        for low, high in HIT_BUCKETS:
+            label = str(low) if low == high else (f"{low}+" if high is None else f"{low}-{high}")
+            hit_distribution[label] = sum(
+                1 for e in entries if e["hits"] >= low and (high is None or e["hits"] <= high)
+            )
+        
+        total = sum(bytes_by_workflow.values())
+        return {
+            "budget_mb": settings.CACHE_MEMORY_BUDGET_MB,
+            "tracked_mb": round(total / 1024 / 1024, 2),
+            "tracked_bytes": total,
+            "bytes_by_workflow": dict(sorted(bytes_by_workflow.items(), key=lambda kv: -kv[1])),
+            "hit_distribution": hit_distribution,
+            "evictions": self.evictions,
+            "cold_tier": None if self.cold_store is None else {
+                **self.cold_store.stats(),
+                "demotions": self.demotions,
+                "promotions": self.promotions
+            }
+        }
 
 
 # Global cache instance
@@ -0,0 +1,108 @@
+"""
+Cold tier for semantic cache payloads: a compressed SQLite file on local disk.
+
+Large result fields of entries nobody has asked for in a while are moved here
+from Redis (see CacheService.demote_entry); the Redis hash keeps the small fields,
+the bookkeeping and the embedding, so lookups are unchanged. Each row holds one
+entry's demoted fields as zlib-compressed JSON and expires with its Redis entry.
+"""
+from typing import Dict, Iterable, List, Optional
+import json
+import os
+import sqlite3
+import threading
+import time
+import zlib
+import logging
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    cache_key TEXT PRIMARY KEY,
+    payload BLOB NOT NULL,
+    raw_bytes INTEGER NOT NULL,
+    expires_at REAL NOT NULL,
+    demoted_at REAL NOT NULL
+)
+"""
+
+
+class ColdStore:
+    """Compressed entry payloads keyed by cache key (thread-safe, one connection)"""
+
+    def __init__(self, path: str, compression_level: int = 6):
+        self.path = path
+        self.compression_level = compression_level
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute(SCHEMA)
+
+    def put(self, cache_key: str, fields: Dict[str, str], ttl: float):
+        """Store an entry's serialized fields (field -> JSON string), replacing any previous row"""
+        raw = json.dumps(fields).encode()
+        payload = zlib.compress(raw, self.compression_level)
+        now = time.time()
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?, ?)",
+                (cache_key, payload, len(raw), now + ttl, now)
+            )
+
+    def get(self, cache_key: str, fields: Optional[Iterable[str]] = None) -> Optional[Dict[str, str]]:
+        """Serialized fields of an entry (all, or the requested ones that exist); None if absent or expired"""
+        with self._lock:
+            row = self._db.execute(
+                "SELECT payload, expires_at FROM entries WHERE cache_key = ?", (cache_key,)
+            ).fetchone()
+        if row is None or row[1] < time.time():
+            return None
+        stored = json.loads(zlib.decompress(row[0]))
+        if fields is None:
+            return stored
+        return {f: stored[f] for f in fields if f in stored}
+
+    def delete(self, *cache_keys: str) -> int:
+        if not cache_keys:
+            return 0
+        with self._lock:
+            cursor = self._db.executemany("DELETE FROM entries WHERE cache_key = ?", [(k,) for k in cache_keys])
+        return cursor.rowcount
+
+    def delete_matching(self, suffix: Optional[str] = None) -> int:
+        """Delete entries whose key ends with `suffix` (topic hash), or all entries"""
+        with self._lock:
+            if suffix is None:
+                cursor = self._db.execute("DELETE FROM entries")
+            else:
+                cursor = self._db.execute("DELETE FROM entries WHERE cache_key LIKE ?", (f"%:{suffix}",))
+        return cursor.rowcount
+
+    def keys(self) -> List[str]:
+        with self._lock:
+            return [row[0] for row in self._db.execute("SELECT cache_key FROM entries")]
+
+    def purge_expired(self) -> int:
+        with self._lock:
+            cursor = self._db.execute("DELETE FROM entries WHERE expires_at < ?", (time.time(),))
+        return cursor.rowcount
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            count, raw, stored = self._db.execute(
+                "SELECT COUNT(*), COALESCE(SUM(raw_bytes), 0), COALESCE(SUM(LENGTH(payload)), 0) FROM entries"
+            ).fetchone()
+        return {
+            "entries": count,
+            "raw_mb": round(raw / 1024 / 1024, 2),
+            "stored_mb": round(stored / 1024 / 1024, 2),
+            "compression_ratio": round(raw / stored, 2) if stored else None
+        }
+
+    def close(self):
+        with self._lock:
+            self._db.close()
@@ -0,0 +1,134 @@
+"""
+Hedged OpenAI requests for small calls on the critical path (agent routing, planning).
+
+When LLM_HEDGING is on, a call that has not answered by the p95 latency observed
+for its kind gets a duplicate; the first successful response wins and the other
+request is cancelled. Hedges draw on a budget that grows by LLM_HEDGE_BUDGET per
+call, so duplicates never exceed that share of requests. Until enough latencies
+are recorded no hedge is sent.
+"""
+from app.core.config import settings
+from app.services.metrics_service import metrics_service
+from app.services.resilience import dependencies
+from collections import deque
+from typing import Any, Callable, Deque, Dict, Optional
+import asyncio
+import time
+import logging
+
+logger = logging.getLogger(__name__)
+
+LATENCY_WINDOW = 200
+MAX_CREDIT = 5.0  # Hedges that can be saved up during quiet periods
+
+
+class HedgeStats:
+    """Latency window and hedge counters for one kind of call"""
+
+    def __init__(self):
+        self.latencies: Deque[float] = deque(maxlen=LATENCY_WINDOW)
+        self.calls = 0
+        self.hedges = 0
+        self.hedge_wins = 0
+
+    def threshold(self) -> Optional[float]:
+        """p95 latency (None until LLM_HEDGE_MIN_SAMPLES calls completed)"""
+        if len(self.latencies) < settings.LLM_HEDGE_MIN_SAMPLES:
+            return None
+        ordered = sorted(self.latencies)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * settings.LLM_HEDGE_PERCENTILE / 100))]
+
+    def snapshot(self) -> Dict[str, Any]:
+        threshold = self.threshold()
+        return {
+            "calls": self.calls,
+            "hedges": self.hedges,
+            "hedge_rate": round(self.hedges / self.calls, 3) if self.calls else 0.0,
+            "hedge_wins": self.hedge_wins,
+            "win_rate": round(self.hedge_wins / self.hedges, 3) if self.hedges else None,
+            "threshold_ms": None if threshold is None else round(threshold * 1000, 1)
+        }
+
+
+class HedgePolicy:
+    """p95-triggered request hedging with a shared extra-load budget"""
+
+    def __init__(self):
+        self.stats: Dict[str, HedgeStats] = {}
+        self._credit = 0.0
+
+    async def call(self, kind: str, fn: Callable, **kwargs) -> Any:
+        """
+        Run an OpenAI call through the dependency guard, hedging it if it is slow.
+
+        Args:
+            kind: Call kind whose latencies set the hedge threshold (e.g. "decide_agent")
+            fn: The client method (chat.completions.create)
+        """
+
+        if not settings.LLM_HEDGING:
+            return await dependencies["openai"].call(fn, **kwargs)
+
+        stats = self.stats.setdefault(kind, HedgeStats())
+        stats.calls += 1
+        self._credit = min(MAX_CREDIT, self._credit + settings.LLM_HEDGE_BUDGET)
+        threshold = stats.threshold()
+        start = time.monotonic()
+
+        winner = None
+        primary = asyncio.create_task(dependencies["openai"].call(fn, **kwargs))
+        tasks = [primary]
+        try:
+            done, _ = await asyncio.wait(tasks, timeout=threshold)
+            if not done and self._credit >= 1:
+                self._credit -= 1
+                stats.hedges += 1
+                tasks.append(asyncio.create_task(dependencies["openai"].call(fn, **kwargs)))
+
+            error = None
+            pending = set(tasks)
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        winner = task
+                        break
+                    error = error or task.exception()
+                if winner is not None:
+                    break
+            if winner is None:
+                raise error
+        finally:
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
+                elif task is not winner and not task.cancelled():
+                    task.exception()  # Mark a losing failure as retrieved
+
+        # Latency as seen from the first request (a lower bound for a primary that lost)
+        latency = time.monotonic() - start
+        stats.latencies.append(latency)
+        hedged = len(tasks) > 1
+        hedge_won = hedged and winner is tasks[1]
+        if hedge_won:
+            stats.hedge_wins += 1
+        metrics_service.record_stage(
+            "llm_hedge",
+            call=kind,
+            hedged=hedged,
+            latency_ms=round(latency * 1000, 1)
+        )
+        if hedged:
+            metrics_service.record_stage("llm_hedge_fired", call=kind, hedge_won=hedge_won)
+        return winner.result()
+
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        return {kind: stats.snapshot() for kind, stats in self.stats.items()}
+
+    def reset(self):
+        self.stats.clear()
+        self._credit = 0.0
+
+
+# Global instance
+hedging = HedgePolicy()
@@ -0,0 +1,161 @@
+"""
+In-process L1 for semantic cache entries.
+
+Keeps decoded results of recently read entries in front of Redis, so a repeat
+hit costs no round-trip, payload transfer or JSON decoding. Entries are bounded
+by their encoded size (LRU) and expire after CACHE_L1_TTL_SECONDS or the entry's
+Redis TTL, whichever comes first. Writes, invalidations and evictions are
+broadcast over Redis pub/sub (see CacheService.start_invalidation_listener), so
+every replica drops its copy; the TTL bounds staleness if a message is missed.
+
+Hits served here are counted on the entry and flushed to the Redis hit counter in
+batches (and when the entry leaves L1), so eviction priorities stay accurate.
+"""
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Iterable, Optional
+import threading
+import time
+
+ALIAS_LIMIT = 10000  # Topic -> entry shortcuts kept for exact repeats
+
+
+class LocalEntry:
+    """Decoded result of one cache entry and the bookkeeping served with it"""
+
+    __slots__ = ("fields", "size", "expires_at", "stored_at", "topic", "claimed", "pending_hits")
+
+    def __init__(self, fields: Dict[str, Any], size: int, expires_at: float, stored_at: Optional[float], topic: Optional[str]):
+        self.fields = fields
+        self.size = size
+        self.expires_at = expires_at
+        self.stored_at = stored_at
+        self.topic = topic
+        self.claimed = False  # The read that filled the entry came from Redis
+        self.pending_hits = 0  # Hits not yet added to the Redis counter
+
+
+class LocalCache:
+    """Byte-bounded LRU of decoded entries keyed by cache key (thread-safe)"""
+
+    def __init__(self, max_bytes: int, max_ttl: float, on_drop: Callable[[str, int], None] = None):
+        self.max_bytes = max_bytes
+        self.max_ttl = max_ttl
+        # Called as on_drop(cache_key, pending_hits) when an entry with unflushed hits ages out
+        self.on_drop = on_drop
+        self._entries: "OrderedDict[str, LocalEntry]" = OrderedDict()
+        self._aliases: "OrderedDict[str, str]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.bytes = 0
+        # Bumped by every invalidation: a read that started before one must not fill L1
+        self.generation = 0
+
+    def get(self, cache_key: str) -> Optional[LocalEntry]:
+        dropped = None
+        with self._lock:
+            entry = self._entries.get(cache_key)
+            if entry is None:
+                return None
+            if entry.expires_at <= time.monotonic():
+                dropped = self._remove(cache_key)
+                entry = None
+            else:
+                self._entries.move_to_end(cache_key)
+        self._dropped([dropped] if dropped else [])
+        return entry
+
+    def put(
+        self,
+        cache_key: str,
+        fields: Dict[str, Any],
+        size: int,
+        ttl: float,
+        generation: int,
+        stored_at: Optional[float] = None,
+        topic: Optional[str] = None
+    ) -> bool:
+        """
+        Keep a decoded entry read from Redis
+
+        Args:
+            size: Encoded size of the fields (what the entry is accounted as)
+            ttl: Remaining Redis TTL of the entry (caps the L1 lifetime)
+            generation: `generation` read before the Redis read started
+
+        Returns:
+            False if the entry does not fit or was invalidated meanwhile
+        """
+        ttl = min(self.max_ttl, ttl)
+        if size > self.max_bytes or ttl <= 0:
+            return False
+
+        dropped = []
+        with self._lock:
+            if generation != self.generation:
+                return False
+            if cache_key in self._entries:
+                self._remove(cache_key)
+            self._entries[cache_key] = LocalEntry(fields, size, time.monotonic() + ttl, stored_at, topic)
+            self.bytes += size
+            while self.bytes > self.max_bytes:
+                dropped.append(self._remove(next(iter(self._entries))))
+        self._dropped(dropped)
+        return True
+
+    def alias(self, alias: str, cache_key: str):
+        """Remember which entry a topic resolved to, so an exact repeat skips the similarity scan"""
+        with self._lock:
+            self._aliases[alias] = cache_key
+            self._aliases.move_to_end(alias)
+            while len(self._aliases) > ALIAS_LIMIT:
+                self._aliases.popitem(last=False)
+
+    def resolve(self, alias: str) -> Optional[str]:
+        """Cache key a topic resolved to, while that entry is held here"""
+        with self._lock:
+            cache_key = self._aliases.get(alias)
+            if cache_key is None or cache_key not in self._entries:
+                return None
+            return cache_key
+
+    def invalidate(self, cache_keys: Iterable[str] = None, suffix: Optional[str] = None) -> int:
+        """Drop the given entries, entries whose key ends with `:suffix`, or (neither given) everything"""
+        with self._lock:
+            self.generation += 1
+            if cache_keys is not None:
+                doomed = [k for k in cache_keys if k in self._entries]
+            elif suffix is not None:
+                doomed = [k for k in self._entries if k.endswith(f":{suffix}")]
+            else:
+                doomed = list(self._entries)
+            for cache_key in doomed:
+                self._remove(cache_key)
+            return len(doomed)
+
+    def drain_hits(self) -> Dict[str, int]:
+        """Take the unflushed hit counts of all entries"""
+        with self._lock:
+            pending = {k: e.pending_hits for k, e in self._entries.items() if e.pending_hits}
+            for cache_key in pending:
+                self._entries[cache_key].pending_hits = 0
+        return pending
+
+    def _remove(self, cache_key: str):
+        entry = self._entries.pop(cache_key)
+        self.bytes -= entry.size
+        return (cache_key, entry.pending_hits) if entry.pending_hits else None
+
+    def _dropped(self, dropped):
+        if self.on_drop is None:
+            return
+        for item in dropped:
+            if item:
+                self.on_drop(*item)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "mb": round(self.bytes / 1024 / 1024, 2),
+                "max_mb": round(self.max_bytes / 1024 / 1024, 2),
+                "ttl_seconds": self.max_ttl
+            }
@@ -1,12 +1,16 @@
 import logging
 import time
-from typing import Dict, Optional
+from collections import Counter, defaultdict, deque
+from typing import Dict, List, Optional
 from datetime import datetime
 import json
 from pathlib import Path
 
 logger = logging.getLogger(__name__)
 
+TOPIC_COUNTS_MAX = 5000  # Distinct (workflow, topic) pairs kept; the rarest are dropped beyond this
+TOPIC_SAVE_EVERY = 50  # Requests between writes of the topic counts file
+
 
 class MetricsService:
     """Track RAG agent metrics: latency, tokens, cache hits, costs"""
@@ -14,6 +18,11 @@ class MetricsService:
     def __init__(self):
         self.metrics_file = Path("metrics.json")
         self.session_metrics = []
+        self.stream_metrics = deque(maxlen=500)  # In-memory only: one entry per SSE stream
+        self.stage_metrics = defaultdict(lambda: deque(maxlen=500))  # In-memory per-stage measurements
+        self.topics_file = Path("topic_metrics.json")
+        self._topic_counts: Optional[Counter] = None  # (workflow_type, topic) -> requests, loaded on first use
+        self._unsaved_topics = 0
     
     def track_workflow(
         self,
@@ -107,6 +116,154 @@ class MetricsService:
             logger.error(f"Failed to generate summary: {e}")
             return {"error": str(e)}
     
+    def track_stream(
+        self,
+        workflow_type: str,
+        ttfb: Optional[float],
+        duration: float,
+        max_queue_depth: int,
+        coalesced_events: int,
+        keepalives: int
+    ) -> Dict:
+        """Track SSE delivery metrics for one stream (time-to-first-byte, queue depth)"""
+        
+        metric = {
+            "timestamp": datetime.utcnow().isoformat(),
+            "workflow_type": workflow_type,
+            "ttfb_ms": round(ttfb * 1000, 1) if ttfb is not None else None,
+            "duration_seconds": round(duration, 2),
+            "max_queue_depth": max_queue_depth,
+            "coalesced_events": coalesced_events,
+            "keepalives": keepalives
+        }
+        self.stream_metrics.append(metric)
+        return metric
+    
+    def get_stream_summary(self) -> Dict:
+        """Get aggregated SSE delivery metrics for this process"""
+        streams = list(self.stream_metrics)
+        if not streams:
+            return {"total_streams": 0}
+        
+        ttfbs = sorted(m["ttfb_ms"] for m in streams if m["ttfb_ms"] is not None)
+        depths = [m["max_queue_depth"] for m in streams]
+        
+        return {
+            "total_streams": len(streams),
+            "avg_ttfb_ms": round(sum(ttfbs) / len(ttfbs), 1) if ttfbs else None,
+            "p95_ttfb_ms": ttfbs[min(len(ttfbs) - 1, int(len(ttfbs) * 0.95))] if ttfbs else None,
+            "avg_max_queue_depth": round(sum(depths) / len(depths), 2),
+            "max_queue_depth": max(depths),
+            "coalesced_events": sum(m["coalesced_events"] for m in streams),
+            "keepalives_sent": sum(m["keepalives"] for m in streams),
+            "recent_streams": streams[-10:]
+        }
+    
+    def record_stage(self, stage: str, **fields) -> Dict:
+        """Record one in-memory measurement for a pipeline stage (latency, tokens, hit/miss)"""
+        
+        metric = {"timestamp": datetime.utcnow().isoformat(), **fields}
+        self.stage_metrics[stage].append(metric)
+        return metric
+    
+    def get_stage_summary(self) -> Dict:
+        """
+        Aggregate stage measurements for this process.
+        
+        Numeric fields are summarized as avg/total, boolean fields as a rate (%),
+        string fields as counts per value.
+        """
+        summary = {}
+        for stage, entries in self.stage_metrics.items():
+            entries = list(entries)
+            stage_summary = {"count": len(entries)}
+            fields = {k for m in entries for k in m if k != "timestamp"}
+            
+            for field in sorted(fields):
+                values = [m[field] for m in entries if m.get(field) is not None]
+                if not values:
+                    continue
+                if all(isinstance(v, bool) for v in values):
+                    stage_summary[f"{field}_rate"] = round(sum(values) / len(values) * 100, 1)
+                elif all(isinstance(v, (int, float)) for v in values):
+                    stage_summary[f"avg_{field}"] = round(sum(values) / len(values), 2)
+                    stage_summary[f"total_{field}"] = round(sum(values), 2)
+                else:
+                    stage_summary[f"{field}_counts"] = self._count_by_field(entries, field)
+            
+            summary[stage] = stage_summary
+        return summary
+    
+    def record_topic(self, workflow_type: str, topic: str):
+        """Count a request for a topic (the access log cache warming mines)"""
+        
+        counts = self._load_topic_counts()
+        counts[(workflow_type, topic.strip())] += 1
+        if len(counts) > TOPIC_COUNTS_MAX:
+            self._topic_counts = counts = Counter(dict(counts.most_common(TOPIC_COUNTS_MAX // 2)))
+        self._unsaved_topics += 1
+        if self._unsaved_topics >= TOPIC_SAVE_EVERY:
+            self.save_topic_counts()
+    
+    def popular_topics(self, workflow_type: str, limit: int, min_requests: int = 1) -> List[Dict]:
+        """
+        Most requested topics for a workflow, most frequent first.
+        
+        Merges the topic counts with workflow runs recorded in the metrics file
+        (topics truncated there at 100 characters are skipped).
+        """
+        
+        variants = Counter()  # (normalized, as written) -> requests
+        for (wf, topic), count in self._load_topic_counts().items():
+            if wf == workflow_type:
+                variants[(topic.lower(), topic)] += count
+        try:
+            if self.metrics_file.exists():
+                with open(self.metrics_file, 'r') as f:
+                    for m in json.load(f):
+                        topic = (m.get("topic") or "").strip()
+                        if m.get("workflow_type") == workflow_type and topic and len(topic) < 100:
+                            variants[(topic.lower(), topic)] += 1
+        except Exception as e:
+            logger.error(f"Failed to read metrics for popular topics: {e}")
+        
+        merged, spelling = Counter(), {}
+        for (key, topic), count in variants.most_common():
+            merged[key] += count
+            spelling.setdefault(key, topic)  # Most requested way of writing it
+        
+        return [
+            {"topic": spelling[key], "requests": count}
+            for key, count in merged.most_common()
+            if count >= min_requests
+        ][:limit]
+    
+    def save_topic_counts(self):
+        """Persist topic counts so they survive a restart"""
+        if self._topic_counts is None:
+            return
+        try:
+            with open(self.topics_file, 'w') as f:
+                json.dump(
+                    [{"workflow_type": wf, "topic": t, "requests": c} for (wf, t), c in self._topic_counts.items()],
+                    f
+                )
+            self._unsaved_topics = 0
+        except Exception as e:
+            logger.error(f"Failed to save topic counts: {e}")
+    
+    def _load_topic_counts(self) -> Counter:
+        if self._topic_counts is None:
+            self._topic_counts = Counter()
+            try:
+                if self.topics_file.exists():
+                    with open(self.topics_file, 'r') as f:
+                        for entry in json.load(f):
+                            self._topic_counts[(entry["workflow_type"], entry["topic"])] = entry["requests"]
+            except Exception as e:
+                logger.error(f"Failed to load topic counts: {e}")
+        return self._topic_counts
+    
     def _count_by_field(self, metrics: list, field: str) -> Dict:
         """Count occurrences by field value"""
         counts = {}
@@ -0,0 +1,240 @@
+"""
+Client-side OpenAI rate governor.
+
+Every chat completion is charged against two token buckets per model, requests per
+minute and tokens per minute, before it is sent. The token cost is estimated from
+the prompt size plus the completion budget (OpenAI counts max_tokens against TPM)
+and settled against the reported usage afterwards. Buckets live in Redis and are
+updated by Lua scripts, so all replicas draw from one budget; LocalBucketStore is
+the in-process stand-in (no Redis, tests). Callers for the same model queue in
+arrival order and sleep until the budget covers them instead of collecting 429s.
+"""
+from app.core import deadline
+from app.core.config import settings
+from app.core.deadline import DeadlineExceeded
+from app.services.metrics_service import metrics_service
+from typing import Any, Dict, Tuple
+import asyncio
+import json
+import threading
+import time
+import logging
+
+import redis
+
+logger = logging.getLogger(__name__)
+
+CHARS_PER_TOKEN = 4
+MESSAGE_OVERHEAD_TOKENS = 4
+BUCKET_KEY_PREFIX = "ratelimit:openai:"
+
+# KEYS[1] = bucket hash; ARGV = rpm, tpm, requests, tokens. Returns the wait in seconds (0 = granted).
+TAKE_SCRIPT = """
+local rpm = tonumber(ARGV[1])
+local tpm = tonumber(ARGV[2])
+local need_r = tonumber(ARGV[3])
+local need_t = tonumber(ARGV[4])
+local clock = redis.call('TIME')
+local now = tonumber(clock[1]) + tonumber(clock[2]) / 1000000
+local state = redis.call('HMGET', KEYS[1], 'r', 't', 'ts')
+local r = tonumber(state[1]) or rpm
+local t = tonumber(state[2]) or tpm
+local elapsed = math.max(0, now - (tonumber(state[3]) or now))
+r = math.min(rpm, r + elapsed * rpm / 60)
+t = math.min(tpm, t + elapsed * tpm / 60)
+local wait = 0
+if r < need_r then wait = math.max(wait, (need_r - r) * 60 / rpm) end
+if t < need_t then wait = math.max(wait, (need_t - t) * 60 / tpm) end
+if wait == 0 then
+  r = r - need_r
+  t = t - need_t
+end
+redis.call('HSET', KEYS[1], 'r', tostring(r), 't', tostring(t), 'ts', tostring(now))
+redis.call('EXPIRE', KEYS[1], 120)
+return tostring(wait)
+"""
+
+# KEYS[1] = bucket hash; ARGV = token delta (refund > 0, extra charge < 0), tpm
+SETTLE_SCRIPT = """
+local t = tonumber(redis.call('HGET', KEYS[1], 't'))
+if t then
+  redis.call('HSET', KEYS[1], 't', tostring(math.min(tonumber(ARGV[2]), t + tonumber(ARGV[1]))))
+end
+return 0
+"""
+
+
+def estimate_tokens(request: Dict[str, Any]) -> int:
+    """Prompt tokens (~4 chars each, plus per-message framing) + the completion budget"""
+
+    chars = 0
+    messages = request.get("messages") or []
+    for message in messages:
+        content = message.get("content") if isinstance(message, dict) else getattr(message, "content", None)
+        if isinstance(content, list):
+            content = " ".join(part.get("text", "") for part in content if isinstance(part, dict))
+        chars += len(content or "")
+        tool_calls = message.get("tool_calls") if isinstance(message, dict) else None
+        if tool_calls:
+            chars += len(json.dumps(tool_calls, default=str))
+    if request.get("tools"):
+        chars += len(json.dumps(request["tools"], default=str))
+    if request.get("response_format"):
+        chars += len(json.dumps(request["response_format"], default=str))
+
+    prompt = chars // CHARS_PER_TOKEN + MESSAGE_OVERHEAD_TOKENS * len(messages)
+    completion = request.get("max_tokens") or request.get("max_completion_tokens") or settings.OPENAI_COMPLETION_TOKEN_ESTIMATE
+    return prompt + completion
+
+
+class LocalBucketStore:
+    """In-process RPM/TPM buckets (single replica, tests)"""
+
+    def __init__(self):
+        self._buckets: Dict[str, Tuple[float, float, float]] = {}
+        self._lock = threading.Lock()
+
+    def take(self, model: str, rpm: int, tpm: int, tokens: int) -> float:
+        with self._lock:
+            now = time.monotonic()
+            r, t, ts = self._buckets.get(model, (rpm, tpm, now))
+            elapsed = max(0.0, now - ts)
+            r = min(rpm, r + elapsed * rpm / 60)
+            t = min(tpm, t + elapsed * tpm / 60)
+            wait = 0.0
+            if r < 1:
+                wait = max(wait, (1 - r) * 60 / rpm)
+            if t < tokens:
+                wait = max(wait, (tokens - t) * 60 / tpm)
+            if wait == 0:
+                r, t = r - 1, t - tokens
+            self._buckets[model] = (r, t, now)
+            return wait
+
+    def settle(self, model: str, tpm: int, delta: int):
+        with self._lock:
+            if model in self._buckets:
+                r, t, ts = self._buckets[model]
+                self._buckets[model] = (r, min(tpm, t + delta), ts)
+
+
+class RedisBucketStore:
+    """RPM/TPM buckets shared by all replicas (atomic Lua read-refill-take on the Redis clock)"""
+
+    def __init__(self, client):
+        self.client = client
+        self._take = client.register_script(TAKE_SCRIPT)
+        self._settle = client.register_script(SETTLE_SCRIPT)
+
+    def take(self, model: str, rpm: int, tpm: int, tokens: int) -> float:
+        return float(self._take(keys=[BUCKET_KEY_PREFIX + model], args=[rpm, tpm, 1, tokens]))
+
+    def settle(self, model: str, tpm: int, delta: int):
+        self._settle(keys=[BUCKET_KEY_PREFIX + model], args=[delta, tpm])
+
+
+class RateGrant:
+    """Budget taken for one request; settle() corrects the estimate with the reported usage"""
+
+    def __init__(self, governor: "RateGovernor", model: str, estimated: int):
+        self.governor = governor
+        self.model = model
+        self.estimated = estimated
+
+    def settle(self, response: Any):
+        usage = getattr(response, "usage", None)
+        actual = getattr(usage, "total_tokens", None)
+        if not isinstance(actual, int):
+            return  # Streams report usage at the end; keep the estimate
+        self.governor._settle(self.model, self.estimated - actual)
+
+    def refund(self):
+        """Give the whole estimate back (the request was not sent, or OpenAI did not accept it)"""
+        self.governor._settle(self.model, self.estimated)
+
+
+class RateGovernor:
+    """Per-model RPM/TPM budget in front of OpenAI chat completions"""
+
+    def __init__(self, store=None):
+        self._store = store
+        self._locks: Dict[str, asyncio.Lock] = {}
+        self._loop = None
+
+    @property
+    def store(self):
+        if self._store is None:
+            self._store = self._default_store()
+        return self._store
+
+    @staticmethod
+    def _default_store():
+        from app.services.cache_service import cache_service
+        if cache_service.enabled and cache_service.redis_client is not None:
+            return RedisBucketStore(cache_service.redis_client)
+        logger.info("Rate governor using in-process buckets (no Redis)")
+        return LocalBucketStore()
+
+    @staticmethod
+    def limits(model: str) -> Dict[str, int]:
+        return settings.OPENAI_RATE_LIMITS.get(model) or settings.OPENAI_RATE_LIMITS["default"]
+
+    def _lock(self, model: str) -> asyncio.Lock:
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            # Locks bind to one event loop (tests run one loop per test)
+            self._locks, self._loop = {}, loop
+        return self._locks.setdefault(model, asyncio.Lock())
+
+    async def acquire(self, request: Dict[str, Any]) -> RateGrant:
+        """
+        Wait until the model's budget covers the request.
+
+        Callers for one model wait in arrival order; the sleep never outlives the
+        run deadline (DeadlineExceeded instead).
+        """
+
+        model = str(request.get("model") or "default")
+        limits = self.limits(model)
+        rpm, tpm = limits["rpm"], limits["tpm"]
+        tokens = min(estimate_tokens(request), tpm)  # A request larger than the bucket would wait forever
+        start = time.monotonic()
+
+        async with self._lock(model):
+            while True:
+                wait = self._take(model, rpm, tpm, tokens)
+                if wait <= 0:
+                    break
+                left = deadline.remaining()
+                if left is not None and left <= wait:
+                    raise DeadlineExceeded("openai_rate_limit")
+                await asyncio.sleep(wait)
+
+        waited = time.monotonic() - start
+        metrics_service.record_stage(
+            "openai_governor",
+            model=model,
+            estimated_tokens=tokens,
+            wait_ms=round(waited * 1000, 1),
+            throttled=waited > 0.001
+        )
+        return RateGrant(self, model, tokens)
+
+    def _take(self, model: str, rpm: int, tpm: int, tokens: int) -> float:
+        try:
+            return self.store.take(model, rpm, tpm, tokens)
+        except redis.RedisError as e:
+            logger.warning(f"Rate governor lost Redis ({e}); falling back to in-process buckets")
+            self._store = LocalBucketStore()
+            return self._store.take(model, rpm, tpm, tokens)
+
+    def _settle(self, model: str, delta: int):
+        if delta == 0:
+            return
+        try:
+            self.store.settle(model, self.limits(model)["tpm"], delta)
+        except redis.RedisError as e:
+            logger.warning(f"Rate governor could not settle usage: {e}")
+
+# Global instance
+rate_governor = RateGovernor()
@@ -0,0 +1,373 @@
+"""
+Resilience layer for external dependencies (OpenAI, arXiv, Tavily, Wikipedia).
+
+Each dependency gets a circuit breaker (closed -> open after consecutive failures,
+half-open probe after a cool-down) and a bulkhead (bounded concurrency plus a
+bounded wait line; blocking tools also get their own thread pool so a hung source
+cannot exhaust the shared default executor). Rejected calls fail fast with
+DependencyUnavailable; tool calls turn that into an error result the model can
+route around. OpenAI calls are retried here rather than by the SDK (clients are
+built with max_retries=0), so every attempt passes the rate governor and breaker.
+"""
+from app.core import deadline
+from app.core.config import settings
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Optional
+import asyncio
+import contextvars
+import copy
+import functools
+import json
+import time
+import logging
+
+import openai
+
+logger = logging.getLogger(__name__)
+
+
+class DependencyUnavailable(Exception):
+    """A call was rejected without being attempted (circuit open or bulkhead full)"""
+
+    def __init__(self, dependency: str, reason: str, retry_after: float = 0.0):
+        self.dependency = dependency
+        self.reason = reason
+        self.retry_after = retry_after
+        super().__init__(f"{dependency} is temporarily unavailable ({reason})")
+
+
+class CircuitBreaker:
+    """Consecutive-failure circuit breaker with half-open probing"""
+
+    def __init__(self, failure_threshold: int, reset_timeout: float, half_open_max_calls: int = 1):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.half_open_max_calls = half_open_max_calls
+        self._state = "closed"
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probes = 0
+
+    @property
+    def state(self) -> str:
+        if self._state == "open" and time.monotonic() - self._opened_at >= self.reset_timeout:
+            self._state, self._probes = "half_open", 0
+        return self._state
+
+    def allow(self) -> bool:
+        state = self.state
+        if state == "closed":
+            return True
+        if state == "half_open" and self._probes < self.half_open_max_calls:
+            self._probes += 1
+            return True
+        return False
+
+    def record_success(self):
+        self._state, self._failures = "closed", 0
+
+    def record_failure(self):
+        self._failures += 1
+        if self._state == "half_open" or self._failures >= self.failure_threshold:
+            if self._state != "open":
+                logger.warning(f"Circuit opened after {self._failures} consecutive failures")
+            self._state, self._opened_at = "open", time.monotonic()
+
+    def record_neutral(self):
+        """Outcome says nothing about the dependency (cancelled, client error): free the probe slot"""
+        if self._state == "half_open":
+            self._probes = max(0, self._probes - 1)
+
+    def retry_after(self) -> float:
+        if self._state != "open":
+            return 0.0
+        return max(0.0, self.reset_timeout - (time.monotonic() - self._opened_at))
+
+
+class Bulkhead:
+    """Bounded concurrency with a bounded number of waiting callers"""
+
+    def __init__(self, max_concurrent: int, max_waiting: int):
+        self.max_concurrent = max(1, max_concurrent)
+        self.max_waiting = max(0, max_waiting)
+        self.active = 0
+        self.waiting = 0
+        self._semaphore = None
+        self._loop = None
+
+    def _get_semaphore(self) -> asyncio.Semaphore:
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            # Semaphores bind to one event loop (tests run one loop per test)
+            self._semaphore = asyncio.Semaphore(self.max_concurrent)
+            self._loop, self.active, self.waiting = loop, 0, 0
+        return self._semaphore
+
+    async def acquire(self) -> bool:
+        semaphore = self._get_semaphore()
+        if semaphore.locked() and self.waiting >= self.max_waiting:
+            return False
+        self.waiting += 1
+        try:
+            await semaphore.acquire()
+        finally:
+            self.waiting -= 1
+        self.active += 1
+        return True
+
+    def release(self):
+        self.active -= 1
+        self._semaphore.release()
+
+
+class Dependency:
+    """Breaker + bulkhead + counters for one external dependency"""
+
+    def __init__(
+        self,
+        name: str,
+        max_concurrent: int,
+        is_failure: Callable[[Optional[BaseException], Any], Optional[bool]],
+        threaded: bool = False,
+        governor=None,
+        retries: int = 0
+    ):
+        self.name = name
+        self.breaker = CircuitBreaker(settings.BREAKER_FAILURE_THRESHOLD, settings.BREAKER_RESET_SECONDS)
+        self.bulkhead = Bulkhead(max_concurrent, settings.BULKHEAD_QUEUE_SIZE)
+        self.is_failure = is_failure
+        self.executor = ThreadPoolExecutor(max_concurrent, thread_name_prefix=name) if threaded else None
+        self.governor = governor
+        self.retries = retries  # Extra attempts after a failure that counts against the dependency
+        self.calls = 0
+        self.failures = 0
+        self.rejections = {"circuit_open": 0, "bulkhead_full": 0}
+
+    async def call(self, fn: Callable, *args, **kwargs) -> Any:
+        """
+        Await an async callable through the rate governor (if any), breaker and bulkhead.
+
+        Failures that count against the dependency are retried up to `retries` times
+        with backoff (honouring Retry-After); each attempt takes budget and a slot again.
+        Budget of attempts that were rejected here or not accepted by OpenAI is refunded.
+        """
+
+        for attempt in range(self.retries + 1):
+            # An open circuit fails fast before any rate budget is taken
+            if self.breaker.state == "open":
+                raise self._circuit_open()
+            # Waiting for rate budget happens before taking a bulkhead slot
+            grant = await self.governor.acquire(kwargs) if self.governor else None
+            try:
+                await self._admit()
+            except DependencyUnavailable:
+                if grant is not None:
+                    grant.refund()
+                raise
+            try:
+                result = await fn(*args, **kwargs)
+            except BaseException as e:
+                self._record(e, None)
+                if grant is not None and _not_accepted(e):
+                    grant.refund()
+                delay = self._retry_delay(e, attempt)
+                if delay is None:
+                    raise
+            else:
+                self._record(None, result)
+                if grant is not None:
+                    grant.settle(result)
+                return result
+            finally:
+                self.bulkhead.release()
+
+            logger.info(f"{self.name} call failed; retry {attempt + 1}/{self.retries} in {delay:.2f}s")
+            await asyncio.sleep(delay)
+            if "timeout" in kwargs:
+                kwargs["timeout"] = deadline.llm_timeout()
+
+    def _retry_delay(self, error: BaseException, attempt: int) -> Optional[float]:
+        """Seconds to wait before retrying after `error`, or None to give up"""
+
+        if attempt >= self.retries or not self.is_failure(error, None):
+            return None
+        delay = settings.OPENAI_RETRY_BACKOFF_SECONDS * 2 ** attempt
+        response = getattr(error, "response", None)
+        try:
+            delay = max(delay, float(response.headers.get("retry-after")))
+        except (AttributeError, TypeError, ValueError):
+            pass
+        left = deadline.remaining()
+        if left is not None and left <= delay:
+            return None  # The retry could not finish in time
+        return delay
+
+    async def run_sync(self, fn: Callable, *args, **kwargs) -> Any:
+        """
+        Run a blocking callable in this dependency's thread pool.
+
+        The bulkhead slot is held until the thread finishes, even if the caller stops
+        waiting (threads cannot be cancelled), so hung calls count against the limit.
+        """
+
+        await self._admit()
+        loop = asyncio.get_running_loop()
+        context = contextvars.copy_context()  # Keep the run deadline inside the worker thread
+        future = self.executor.submit(context.run, functools.partial(fn, *args, **kwargs))
+        future.add_done_callback(lambda _: loop.call_soon_threadsafe(self.bulkhead.release))
+        try:
+            result = await asyncio.wrap_future(future)
+        except BaseException as e:
+            self._record(e, None)
+            raise
+        self._record(None, result)
+        return result
+
+    async def _admit(self):
+        if not await self.bulkhead.acquire():
+            self.rejections["bulkhead_full"] += 1
+            raise DependencyUnavailable(self.name, "bulkhead full")
+        if not self.breaker.allow():
+            self.bulkhead.release()
+            raise self._circuit_open()
+        self.calls += 1
+
+    def _circuit_open(self) -> DependencyUnavailable:
+        self.rejections["circuit_open"] += 1
+        return DependencyUnavailable(self.name, "circuit open", self.breaker.retry_after())
+
+    def _record(self, error: Optional[BaseException], result: Any):
+        failed = self.is_failure(error, result)
+        if failed is None:
+            self.breaker.record_neutral()
+        elif failed:
+            self.failures += 1
+            self.breaker.record_failure()
+        else:
+            self.breaker.record_success()
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "state": self.breaker.state,
+            "retry_after_seconds": round(self.breaker.retry_after(), 1),
+            "active": self.bulkhead.active,
+            "waiting": self.bulkhead.waiting,
+            "max_concurrent": self.bulkhead.max_concurrent,
+            "calls": self.calls,
+            "failures": self.failures,
+            "rejections": dict(self.rejections)
+        }
+
+
+def _openai_failure(error: Optional[BaseException], result: Any) -> Optional[bool]:
+    """Connection problems, timeouts, 5xx and 429 count against OpenAI; other errors are the caller's"""
+    if error is None:
+        return False
+    if isinstance(error, (openai.APIConnectionError, openai.InternalServerError, openai.RateLimitError)):
+        return True
+    return None
+
+
+def _not_accepted(error: BaseException) -> bool:
+    """OpenAI answered with an error or never got the request (a timed-out request may still have run)"""
+    if isinstance(error, openai.APITimeoutError):
+        return False
+    return isinstance(error, (openai.APIStatusError, openai.APIConnectionError))
+
+
+def _tool_failure(error: Optional[BaseException], result: Any) -> Optional[bool]:
+    """Search tools report errors as [{"error": ...}] instead of raising"""
+    if error is not None:
+        return None if isinstance(error, asyncio.CancelledError) else True
+    return bool(isinstance(result, list) and result and isinstance(result[0], dict) and result[0].get("error"))
+
+
+class DependencyRegistry:
+    """Process-wide dependencies, created on first use"""
+
+    def __init__(self):
+        self._dependencies: Dict[str, Dependency] = {}
+
+    def __getitem__(self, name: str) -> Dependency:
+        if name not in self._dependencies:
+            limit = settings.BULKHEAD_LIMITS.get(name, 4)
+            if name == "openai":
+                from app.services.rate_governor import rate_governor
+                governor = rate_governor if settings.OPENAI_RATE_GOVERNOR else None
+                self._dependencies[name] = Dependency(
+                    name, limit, _openai_failure, governor=governor, retries=settings.OPENAI_MAX_RETRIES
+                )
+            else:
+                self._dependencies[name] = Dependency(name, limit, _tool_failure, threaded=True)
+        return self._dependencies[name]
+
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        return {name: dep.snapshot() for name, dep in self._dependencies.items()}
+
+    def reset(self):
+        self._dependencies.clear()
+
+
+# Global instance
+dependencies = DependencyRegistry()
+
+_TOOL_DEPENDENCIES = {
+    "arxiv_search_tool": "arxiv",
+    "tavily_search_tool": "tavily",
+    "wikipedia_search_tool": "wikipedia",
+}
+
+
+# Tool results shared between the runs of a batch: (tool, args) -> task
+_shared_results: contextvars.ContextVar[Optional[Dict[tuple, asyncio.Task]]] = contextvars.ContextVar(
+    "shared_tool_results", default=None
+)
+
+
+@contextmanager
+def shared_tool_results():
+    """Let runs started inside the block (and their tasks) reuse each other's tool results"""
+    token = _shared_results.set({})
+    try:
+        yield
+    finally:
+        _shared_results.reset(token)
+
+
+async def call_tool(tool_func: Callable, **func_args) -> Any:
+    """
+    Run a search tool through its dependency guard.
+
+    A rejected call returns an error result immediately, so the model can use
+    another tool instead of waiting on a failing source. Inside shared_tool_results()
+    identical calls (same tool, same arguments) run once, including concurrent ones.
+    """
+
+    shared = _shared_results.get()
+    if shared is None:
+        return await _guarded_tool_call(tool_func, func_args)
+
+    key = (getattr(tool_func, "__name__", repr(tool_func)), json.dumps(func_args, sort_keys=True, default=str).lower())
+    task = shared.get(key)
+    if task is None:
+        task = shared[key] = asyncio.create_task(_guarded_tool_call(tool_func, func_args))
+    try:
+        # Shielded: one run giving up (cancel, deadline) must not cancel the call for the others
+        result = await asyncio.shield(task)
+    except Exception:
+        shared.pop(key, None)
+        raise
+    if _tool_failure(None, result):
+        shared.pop(key, None)  # Errors are not shared; the next caller retries
+    return copy.deepcopy(result)
+
+
+async def _guarded_tool_call(tool_func: Callable, func_args: Dict[str, Any]) -> Any:
+    name = _TOOL_DEPENDENCIES.get(getattr(tool_func, "__name__", ""))
+    if name is None:
+        return await asyncio.to_thread(tool_func, **func_args)
+    try:
+        return await dependencies[name].run_sync(tool_func, **func_args)
+    except DependencyUnavailable as e:
+        return [{"error": f"{e}; use another source"}]
@@ -1,4 +1,5 @@
 import arxiv
+from app.core import deadline
 from typing import List, Dict, Any
 import logging
 
@@ -17,6 +18,7 @@ def arxiv_search_tool(query: str, max_results: int = 5) -> List[Dict[str, Any]]:
         List of paper dictionaries
     """
     try:
+        deadline.check("arxiv")
         search = arxiv.Search(
             query=query,
             max_results=max_results,
@@ -25,6 +27,8 @@ def arxiv_search_tool(query: str, max_results: int = 5) -> List[Dict[str, Any]]:
         
         results = []
         for paper in search.results():
+            if deadline.expired():
+                break  # Return what was fetched before the deadline
             results.append({
                 "title": paper.title,
                 "authors": [author.name for author in paper.authors],
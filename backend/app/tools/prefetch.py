@@ -0,0 +1,110 @@
+"""Speculative tool prefetch: start the searches a research turn will most likely request."""
+from app.core.config import settings
+from app.core.deadline import DeadlineExceeded, run_stage
+from app.services.metrics_service import metrics_service
+from app.services.resilience import call_tool
+from typing import Any, Callable, Dict, List, Optional
+import asyncio
+import copy
+import re
+import logging
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+_TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+
+# Arguments a prefetched result can still satisfy; anything else must run for real
+_PREFETCH_MAX_RESULTS = 5
+
+
+def _tokens(text: str) -> set:
+    return set(_TOKEN_RE.findall((text or "").lower()))
+
+
+class ToolPrefetcher:
+    """
+    Run each search tool on the query while the model is still deciding which tools to call.
+
+    take() serves a tool call from the prefetched result when the call's query is
+    similar enough (token overlap, or embedding similarity when the cache's embedding
+    model is loaded); finish() cancels unused prefetches and records hit/waste metrics.
+    """
+
+    def __init__(self, tool_func_mapping: Dict[str, Callable], query: str, tool_names: List[str]):
+        self.query = query
+        self.tool_func_mapping = {
+            name: func for name, func in tool_func_mapping.items() if name in tool_names
+        }
+        self._tasks: Dict[str, asyncio.Task] = {}
+        self._served: set = set()
+
+    def start(self):
+        for name, func in self.tool_func_mapping.items():
+            self._tasks[name] = asyncio.create_task(call_tool(func, query=self.query))
+        logger.info(f"Prefetching {len(self._tasks)} tools for: {self.query[:50]}")
+
+    async def take(self, func_name: str, func_args: dict) -> Optional[Any]:
+        """Return the prefetched result for a matching tool call, or None to run it normally"""
+
+        task = self._tasks.get(func_name)
+        if task is None or func_name in self._served or not await self._matches(func_args):
+            return None
+
+        try:
+            result = await run_stage(asyncio.shield(task), func_name)
+        except DeadlineExceeded:
+            raise
+        except Exception as e:
+            logger.warning(f"Prefetched {func_name} failed: {e}")
+            return None
+        if isinstance(result, list) and result and isinstance(result[0], dict) and result[0].get("error"):
+            return None
+
+        self._served.add(func_name)
+        max_results = func_args.get("max_results")
+        result = copy.deepcopy(result)
+        return result[:max_results] if isinstance(max_results, int) and isinstance(result, list) else result
+
+    async def _matches(self, func_args: dict) -> bool:
+        extra = set(func_args) - {"query", "max_results"}
+        if extra and any(func_args[k] for k in extra):
+            return False
+        if func_args.get("max_results", _PREFETCH_MAX_RESULTS) > _PREFETCH_MAX_RESULTS:
+            return False
+
+        query = func_args.get("query") or ""
+        requested, prefetched = _tokens(query), _tokens(self.query)
+        if not requested or not prefetched:
+            return False
+        overlap = len(requested & prefetched) / len(requested | prefetched)
+        if overlap >= settings.TOOL_PREFETCH_TOKEN_OVERLAP or requested <= prefetched:
+            return True
+
+        from app.services.cache_service import cache_service
+        if cache_service.model is None:
+            return False
+        emb_requested, emb_prefetched = await asyncio.to_thread(
+            lambda: (cache_service._generate_embedding(query), cache_service._generate_embedding(self.query))
+        )
+        similarity = float(np.dot(emb_requested, emb_prefetched) / (
+            np.linalg.norm(emb_requested) * np.linalg.norm(emb_prefetched)
+        ))
+        return similarity >= settings.TOOL_PREFETCH_SIMILARITY
+
+    def finish(self, tool_calls: int = 0):
+        """Cancel unused prefetches and record this turn's hit rate and wasted calls"""
+
+        wasted = [name for name in self._tasks if name not in self._served]
+        for name in wasted:
+            self._tasks[name].cancel()
+
+        metrics_service.record_stage(
+            "tool_prefetch",
+            prefetched=len(self._tasks),
+            served=len(self._served),
+            wasted=len(wasted),
+            hit_rate=round(len(self._served) / len(self._tasks), 2) if self._tasks else None,
+            tool_calls=tool_calls
+        )
@@ -7,6 +7,7 @@ except ImportError:
             pass
         def search(self, *args, **kwargs):
             return {"results": []}
+from app.core import deadline
 from typing import List, Dict, Any
 import logging
 import os
@@ -31,6 +32,7 @@ def tavily_search_tool(
         List of search result dictionaries
     """
     try:
+        deadline.check("tavily")
         api_key = os.getenv("TAVILY_API_KEY")
         if not api_key:
             logger.warning("Tavily API key not found")
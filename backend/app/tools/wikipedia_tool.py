@@ -1,5 +1,5 @@
 import wikipedia
-import time
+from app.core import deadline
 from typing import List, Dict, Any
 import logging
 
@@ -14,7 +14,8 @@ def _retry(func, retries: int = 3, delay: float = 1.0):
         except Exception as e:
             err = str(e)
             if attempt < retries - 1 and any(k in err for k in ("SSL", "Connection", "EOF", "timeout")):
-                time.sleep(delay * (2 ** attempt))
+                # Never back off past the run deadline (raises DeadlineExceeded instead)
+                deadline.sleep(delay * (2 ** attempt), stage="wikipedia")
                 continue
             raise
 
@@ -31,11 +32,15 @@ def wikipedia_search_tool(query: str, max_results: int = 5) -> List[Dict[str, An
         List of article dictionaries
     """
     try:
+        deadline.check("wikipedia")
+        
         # Search for pages with retry on SSL/network errors
         search_results = _retry(lambda: wikipedia.search(query, results=max_results))
         
         results = []
         for title in search_results:
+            if deadline.expired():
+                break  # Return what was fetched before the deadline
             try:
                 page = _retry(lambda t=title: wikipedia.page(t, auto_suggest=False))
                 results.append({
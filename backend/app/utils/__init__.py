@@ -1,3 +1,17 @@
 from .source_filter import filter_relevant_sources, strip_inline_links, strip_source_annotations
+from .html_renderer import render_report_html, render_markdown_fragment, render_document, sanitize_html
+from .json_stream import IncrementalJSONObjectParser
+from .text_patch import apply_edits, PatchError
 
-__all__ = ["filter_relevant_sources", "strip_inline_links", "strip_source_annotations"]
+__all__ = [
+    "filter_relevant_sources",
+    "strip_inline_links",
+    "strip_source_annotations",
+    "render_report_html",
+    "render_markdown_fragment",
+    "render_document",
+    "sanitize_html",
+    "IncrementalJSONObjectParser",
+    "apply_edits",
+    "PatchError",
+]
@@ -0,0 +1,166 @@
+"""Deterministic Markdown -> HTML rendering for research reports (replaces the LLM conversion step)."""
+import html
+import re
+from html.parser import HTMLParser
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import markdown
+from jinja2 import Environment, FileSystemLoader, select_autoescape
+from markupsafe import Markup
+
+TEMPLATE_DIR = Path(__file__).resolve().parent.parent / "templates"
+
+_env = Environment(
+    loader=FileSystemLoader(str(TEMPLATE_DIR)),
+    autoescape=select_autoescape(["html"]),
+    trim_blocks=True,
+    lstrip_blocks=True
+)
+
+ALLOWED_TAGS = {
+    "h1", "h2", "h3", "h4", "h5", "h6", "p", "br", "hr", "div", "span",
+    "ul", "ol", "li", "dl", "dt", "dd", "blockquote", "pre", "code",
+    "strong", "em", "b", "i", "del", "sup", "sub", "abbr", "a",
+    "table", "thead", "tbody", "tr", "th", "td",
+}
+ALLOWED_ATTRS = {"id", "class", "title", "href", "align", "start"}
+VOID_TAGS = {"br", "hr"}
+DROP_CONTENT_TAGS = {"script", "style", "iframe", "object", "embed", "template"}
+SAFE_URL = re.compile(r'^(https?:|mailto:|#)', re.IGNORECASE)
+
+_URL_RE = re.compile(r'(?<![\w/"=])(https?://[^\s<>()\[\]"]+[^\s<>()\[\].,;:!?"\'])')
+_CITATION_RE = re.compile(r'\[(\d{1,3})\]')
+
+
+class _Sanitizer(HTMLParser):
+    """Allowlist re-serializer: drops unknown tags/attributes, unsafe URLs and script content,
+    and linkifies bare URLs and numeric [n] citations in text nodes."""
+
+    def __init__(self, source_count: int):
+        super().__init__(convert_charrefs=True)
+        self.source_count = source_count
+        self.out: List[str] = []
+        self.open_tags: List[str] = []
+        self.drop_depth = 0
+
+    def handle_starttag(self, tag, attrs):
+        if tag in DROP_CONTENT_TAGS:
+            self.drop_depth += 1
+            return
+        if self.drop_depth or tag not in ALLOWED_TAGS:
+            return
+
+        kept = []
+        for name, value in attrs:
+            if name not in ALLOWED_ATTRS or value is None:
+                continue
+            if name == "href" and not SAFE_URL.match(value.strip()):
+                continue
+            kept.append(f' {name}="{html.escape(value, quote=True)}"')
+
+        self.out.append(f"<{tag}{''.join(kept)}>")
+        if tag not in VOID_TAGS:
+            self.open_tags.append(tag)
+
+    def handle_startendtag(self, tag, attrs):
+        self.handle_starttag(tag, attrs)
+
+    def handle_endtag(self, tag):
+        if tag in DROP_CONTENT_TAGS:
+            self.drop_depth = max(0, self.drop_depth - 1)
+            return
+        if self.drop_depth or tag not in self.open_tags:
+            return
+        # Close any tags left open inside this one to keep the output well-formed
+        while self.open_tags:
+            open_tag = self.open_tags.pop()
+            self.out.append(f"</{open_tag}>")
+            if open_tag == tag:
+                break
+
+    def handle_data(self, data):
+        if self.drop_depth:
+            return
+        text = html.escape(data, quote=False)
+        if not {"a", "code", "pre"} & set(self.open_tags):
+            text = _URL_RE.sub(lambda m: f'<a href="{m.group(1)}">{m.group(1)}</a>', text)
+            if self.source_count:
+                text = _CITATION_RE.sub(self._link_citation, text)
+        self.out.append(text)
+
+    def _link_citation(self, match) -> str:
+        n = int(match.group(1))
+        if 1 <= n <= self.source_count:
+            return f'<a href="#ref-{n}">[{n}]</a>'
+        return match.group(0)
+
+    def result(self) -> str:
+        self.close()
+        return "".join(self.out) + "".join(f"</{t}>" for t in reversed(self.open_tags))
+
+
+def sanitize_html(fragment: str, source_count: int = 0) -> str:
+    """Sanitize an HTML fragment, linkifying bare URLs and [n] citations (1..source_count)."""
+    sanitizer = _Sanitizer(source_count)
+    sanitizer.feed(fragment)
+    return sanitizer.result()
+
+
+def render_markdown_fragment(report: str, source_count: int = 0) -> str:
+    """Render Markdown to a sanitized HTML fragment (no document wrapper)."""
+    body = markdown.markdown(report or "", extensions=["extra", "sane_lists"], output_format="html")
+    return sanitize_html(body, source_count=source_count)
+
+
+def render_document(
+    body_html: str,
+    sources: Optional[List[Dict[str, str]]] = None,
+    title: Optional[str] = None,
+    lang: str = "en"
+) -> str:
+    """
+    Wrap an HTML body in the academic report template.
+
+    The body is (re-)sanitized here, which also links [n] citations to the
+    numbered references; sanitizing already-sanitized fragments is idempotent.
+    """
+    sources = [
+        s for s in (sources or [])
+        if isinstance(s, dict) and SAFE_URL.match(s.get("url", "")) and not s["url"].startswith("#")
+    ]
+    body = sanitize_html(body_html or "", source_count=len(sources))
+
+    heading = re.search(r'<h1[^>]*>(.*?)</h1>', body, re.DOTALL)
+    heading_text = html.unescape(re.sub(r'<[^>]+>', '', heading.group(1))).strip() if heading else ""
+
+    return _env.get_template("report.html").render(
+        title=title or heading_text or "Research Report",
+        show_title=not heading_text,
+        lang=lang,
+        body=Markup(body),
+        sources=[{"title": s.get("title") or s["url"], "url": s["url"]} for s in sources],
+        references_heading="References"
+    )
+
+
+def render_report_html(
+    report: str,
+    sources: Optional[List[Dict[str, str]]] = None,
+    title: Optional[str] = None,
+    lang: str = "en"
+) -> str:
+    """
+    Render a Markdown report as a standalone academic HTML document.
+
+    Args:
+        report: Markdown report text
+        sources: Sources to list as numbered references ([n] citations link to them)
+        title: Document title (defaults to the report's first heading)
+        lang: Document language attribute
+
+    Returns:
+        Complete HTML document starting with <!DOCTYPE html>
+    """
+    body = markdown.markdown(report or "", extensions=["extra", "sane_lists"], output_format="html")
+    return render_document(body, sources, title=title, lang=lang)
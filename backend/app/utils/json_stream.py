@@ -0,0 +1,171 @@
+"""Incremental parser for streamed JSON objects (structured-output streaming)."""
+import json
+from typing import Any, Dict, List, Tuple
+
+_WHITESPACE = " \t\r\n"
+
+
+def _ends_with_high_surrogate(raw: str) -> bool:
+    """Whether raw string content ends with a "\\uD800"-"\\uDBFF" escape (not an escaped backslash before "u")"""
+    if len(raw) < 6 or raw[-5] != "u" or raw[-6] != "\\":
+        return False
+    backslashes = len(raw[:-5]) - len(raw[:-5].rstrip("\\"))
+    if backslashes % 2 == 0:
+        return False  # An escaped backslash followed by a literal "u"
+    digits = raw[-4:]
+    if not all(c in "0123456789abcdefABCDEF" for c in digits):
+        return False
+    return 0xD800 <= int(digits, 16) <= 0xDBFF
+
+
+class IncrementalJSONObjectParser:
+    """
+    Parse a top-level JSON object while it is still being generated.
+
+    feed() returns events as soon as they can be decided:
+      ("delta", key, text)     - decoded text appended to a string field
+      ("complete", key, value) - a field's value closed (any JSON type)
+
+    String values are streamed; other values are buffered until they close.
+    Escape sequences split across chunks (including surrogate pairs) are held
+    back until complete, so every delta is valid decoded text.
+    """
+
+    def __init__(self):
+        self.fields: Dict[str, Any] = {}
+        self.done = False
+        self._state = "start"
+        self._key = None
+        self._raw: List[str] = []      # Raw (still escaped) chars of the current string
+        self._emitted = 0              # Raw chars of the current value already emitted as deltas
+        self._escape = 0               # Chars left in the current escape sequence (-1 = just saw "\")
+        self._depth = 0                # Nesting depth of a buffered non-string value
+        self._in_nested_string = False
+        self._nested_escape = False
+
+    def feed(self, chunk: str) -> List[Tuple[str, str, Any]]:
+        events: List[Tuple[str, str, Any]] = []
+        for ch in chunk:
+            self._step(ch, events)
+        if self._state == "string_value":
+            self._emit_delta(events)
+        return events
+
+    # -- state machine -------------------------------------------------------
+
+    def _step(self, ch: str, events: list):
+        state = self._state
+
+        if state in ("key", "string_value"):
+            self._string_char(ch, events)
+        elif state == "raw_value":
+            self._raw_char(ch, events)
+        elif ch in _WHITESPACE or state == "done":
+            return
+        elif state == "start":
+            if ch == "{":
+                self._state = "key_or_end"
+        elif state in ("key_or_end", "key_next"):
+            if ch == '"':
+                self._state, self._raw = "key", []
+            elif ch == "}" and state == "key_or_end":
+                self._finish()
+        elif state == "colon":
+            if ch == ":":
+                self._state = "value"
+        elif state == "value":
+            self._raw, self._emitted = [], 0
+            if ch == '"':
+                self._state = "string_value"
+            else:
+                self._state = "raw_value"
+                self._depth = 1 if ch in "[{" else 0
+                self._raw.append(ch)
+        elif state == "comma_or_end":
+            if ch == ",":
+                self._state = "key_next"
+            elif ch == "}":
+                self._finish()
+
+    def _string_char(self, ch: str, events: list):
+        if self._escape:
+            self._raw.append(ch)
+            if self._escape == -1:
+                self._escape = 4 if ch == "u" else 0
+            else:
+                self._escape -= 1
+            return
+        if ch == "\\":
+            self._raw.append(ch)
+            self._escape = -1
+            return
+        if ch != '"':
+            self._raw.append(ch)
+            return
+
+        # Closing quote
+        raw = "".join(self._raw)
+        if self._state == "key":
+            self._key = json.loads(f'"{raw}"')
+            self._state = "colon"
+            return
+        self._emit_delta(events)
+        value = json.loads(f'"{raw}"')
+        self._complete(value, events)
+
+    def _raw_char(self, ch: str, events: list):
+        if self._in_nested_string:
+            self._raw.append(ch)
+            if self._nested_escape:
+                self._nested_escape = False
+            elif ch == "\\":
+                self._nested_escape = True
+            elif ch == '"':
+                self._in_nested_string = False
+            return
+
+        if self._depth == 0 and (ch in ",}" or ch in _WHITESPACE):
+            # Scalar (number / true / false / null) ends at the delimiter
+            self._complete(json.loads("".join(self._raw)), events)
+            if ch == ",":
+                self._state = "key_next"
+            elif ch == "}":
+                self._finish()
+            return
+
+        self._raw.append(ch)
+        if ch == '"':
+            self._in_nested_string = True
+        elif ch in "[{":
+            self._depth += 1
+        elif ch in "]}":
+            self._depth -= 1
+            if self._depth == 0:
+                self._complete(json.loads("".join(self._raw)), events)
+
+    # -- helpers ---------------------------------------------------------------
+
+    def _emit_delta(self, events: list):
+        """Emit the decodable part of the current string that has not been emitted yet"""
+        end = len(self._raw)
+        if self._escape:
+            # Inside an escape: hold back from its backslash
+            end = "".join(self._raw).rfind("\\")
+        pending = "".join(self._raw[self._emitted:end])
+        # Hold back a trailing high surrogate until its low half arrives
+        if _ends_with_high_surrogate(pending):
+            pending = pending[:-6]
+        if not pending:
+            return
+        events.append(("delta", self._key, json.loads(f'"{pending}"')))
+        self._emitted += len(pending)
+
+    def _complete(self, value: Any, events: list):
+        self.fields[self._key] = value
+        events.append(("complete", self._key, value))
+        self._state = "comma_or_end"
+        self._raw, self._emitted = [], 0
+
+    def _finish(self):
+        self._state = "done"
+        self.done = True
@@ -0,0 +1,67 @@
+"""Apply model-proposed targeted edits to a Markdown document."""
+import re
+from typing import Dict, List
+
+_HEADING_RE = re.compile(r'^(#{1,6})\s+(.*?)\s*#*\s*$', re.MULTILINE)
+
+
+class PatchError(ValueError):
+    """An edit could not be applied unambiguously"""
+
+
+def apply_edits(original: str, edits: List[Dict[str, str]]) -> str:
+    """
+    Apply edits in order and return the patched text.
+
+    Each edit is {"kind", "anchor", "replacement"}:
+      - kind "section": anchor is a heading (with or without the leading #s); the whole
+        section, up to the next heading of the same or higher level, is replaced
+      - kind "replace": anchor is a verbatim passage that must occur exactly once
+
+    Raises:
+        PatchError: if an anchor is missing, ambiguous or the result is empty
+    """
+    text = original
+    for edit in edits:
+        kind = edit.get("kind")
+        anchor = (edit.get("anchor") or "").strip()
+        replacement = edit.get("replacement") or ""
+        if not anchor:
+            raise PatchError("Edit without anchor")
+
+        if kind == "section":
+            start, end = _find_section(text, anchor)
+        elif kind == "replace":
+            count = text.count(anchor)
+            if count != 1:
+                raise PatchError(f"Passage matched {count} times: {anchor[:60]!r}")
+            start = text.index(anchor)
+            end = start + len(anchor)
+        else:
+            raise PatchError(f"Unknown edit kind: {kind!r}")
+
+        if kind == "section" and end < len(text) and not replacement.endswith("\n"):
+            replacement += "\n\n"
+        text = text[:start] + replacement + text[end:]
+
+    if not text.strip():
+        raise PatchError("Edits removed the whole document")
+    return text
+
+
+def _find_section(text: str, anchor: str):
+    """Return the (start, end) span of the section whose heading matches anchor"""
+    title = anchor.lstrip("#").strip()
+    headings = list(_HEADING_RE.finditer(text))
+    matches = [i for i, h in enumerate(headings) if h.group(2).strip() == title]
+    if len(matches) != 1:
+        raise PatchError(f"Section heading matched {len(matches)} times: {title[:60]!r}")
+
+    index = matches[0]
+    level = len(headings[index].group(1))
+    end = len(text)
+    for heading in headings[index + 1:]:
+        if len(heading.group(1)) <= level:
+            end = heading.start()
+            break
+    return headings[index].start(), end
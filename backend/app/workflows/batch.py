@@ -0,0 +1,298 @@
+"""
+Batch workflow runs (literature-review sprints: hundreds of topics at once).
+
+A batch is planned before anything runs:
+  - exact duplicates (case/whitespace-insensitive) and semantic duplicates (cache
+    embedding similarity >= CACHE_SIMILARITY_THRESHOLD) are folded into one run;
+  - topics the semantic cache already answers are served from it.
+The remaining runs share a concurrency budget: at most `concurrency` at a time
+for the batch, each also taking a slot from the process-wide admission controller
+(retrying after Retry-After when it is full), so interactive requests keep their
+share. Tool results are shared across the batch's runs (shared_tool_results).
+
+Progress and results are kept as an event log that any number of SSE readers can
+replay from the start and then follow live.
+
+Background batches (cache warming) take admission slots only when they are idle
+(see AdmissionController.acquire_idle), may skip the cache check to refresh
+entries, and do not keep results in memory (they live in the cache).
+"""
+from app.core.config import settings
+from app.core.deadline import deadline_scope
+from app.services.admission import AdmissionRejected, admission_controller
+from app.services.cache_service import cache_service
+from app.services.metrics_service import metrics_service
+from app.services.resilience import shared_tool_results
+from app.workflows.multi_agent import MultiAgentWorkflow
+from app.workflows.tool_research import ToolResearchWorkflow
+from collections import OrderedDict
+from typing import Any, AsyncGenerator, Dict, List, Optional
+import asyncio
+import re
+import time
+import uuid
+import logging
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+def _normalize(topic: str) -> str:
+    return re.sub(r'\s+', ' ', topic.strip().lower())
+
+
+class BatchRun:
+    """One batch: per-topic state, the event log, and the scheduler task"""
+
+    def __init__(
+        self,
+        topics: List[str],
+        workflow_type: str,
+        params: Dict[str, Any],
+        concurrency: int = None,
+        background: bool = False,
+        refresh: bool = False
+    ):
+        self.batch_id = str(uuid.uuid4())
+        self.workflow_type = workflow_type
+        self.params = params
+        self.background = background
+        self.refresh = refresh
+        self.concurrency = max(1, min(concurrency or settings.BATCH_CONCURRENCY, settings.BATCH_CONCURRENCY))
+        self.items: List[Dict[str, Any]] = [
+            {"index": i, "topic": topic, "status": "pending", "duplicate_of": None, "result": None, "error": None}
+            for i, topic in enumerate(topics)
+        ]
+        self.events: List[Dict[str, Any]] = []
+        self.done = False
+        self.created_at: Optional[float] = None
+        self._changed = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self):
+        self.created_at = time.time()
+        self._task = asyncio.create_task(self.run())
+
+    def cancel(self):
+        if self._task and not self._task.done():
+            self._task.cancel()
+
+    # -- event log -------------------------------------------------------------
+
+    def _emit(self, event: Dict[str, Any]):
+        self.events.append(event)
+        self._changed.set()
+        self._changed = asyncio.Event()
+
+    async def follow(self) -> AsyncGenerator[Dict[str, Any], None]:
+        """All events so far, then live ones until the batch completes"""
+        position = 0
+        while True:
+            changed = self._changed
+            while position < len(self.events):
+                yield self.events[position]
+                position += 1
+            if self.done:
+                return
+            await changed.wait()
+
+    def counts(self) -> Dict[str, int]:
+        counts: Dict[str, int] = {}
+        for item in self.items:
+            counts[item["status"]] = counts.get(item["status"], 0) + 1
+        return counts
+
+    def snapshot(self, include_results: bool = True) -> Dict[str, Any]:
+        return {
+            "batch_id": self.batch_id,
+            "workflow_type": self.workflow_type,
+            "status": "completed" if self.done else "running",
+            "background": self.background,
+            "total": len(self.items),
+            "counts": self.counts(),
+            "items": [
+                item if include_results else {k: v for k, v in item.items() if k != "result"}
+                for item in self.items
+            ]
+        }
+
+    # -- scheduling --------------------------------------------------------------
+
+    async def run(self):
+        start = time.monotonic()
+        try:
+            self._emit({"type": "start", "batch_id": self.batch_id, "total": len(self.items)})
+            canonical = await self._deduplicate()
+            pending = canonical if self.refresh else await self._serve_cached(canonical)
+            self._emit({"type": "planned", "runs": len(pending), "counts": self.counts()})
+
+            semaphore = asyncio.Semaphore(self.concurrency)
+            with shared_tool_results():
+                await asyncio.gather(*(self._run_topic(index, semaphore) for index in pending))
+        except asyncio.CancelledError:
+            for item in self.items:
+                if item["status"] in ("pending", "running"):
+                    item["status"] = "cancelled"
+            raise
+        finally:
+            self.done = True
+            counts = self.counts()
+            self._emit({"type": "complete", "counts": counts})
+            metrics_service.record_stage(
+                "batch",
+                workflow=self.workflow_type,
+                background=self.background,
+                topics=len(self.items),
+                runs=counts.get("completed", 0) + counts.get("partial", 0) + counts.get("failed", 0),
+                cached=counts.get("cached", 0),
+                duplicates=counts.get("duplicate", 0),
+                duration_ms=round((time.monotonic() - start) * 1000, 1)
+            )
+
+    async def _deduplicate(self) -> List[int]:
+        """Fold exact and semantic duplicates into their first occurrence; returns canonical indices"""
+
+        canonical: List[int] = []
+        by_text: Dict[str, int] = {}
+        for item in self.items:
+            key = _normalize(item["topic"])
+            if key in by_text:
+                self._mark_duplicate(item, by_text[key])
+            else:
+                by_text[key] = item["index"]
+                canonical.append(item["index"])
+
+        if cache_service.model is None or len(canonical) < 2:
+            return canonical
+
+        topics = [self.items[i]["topic"] for i in canonical]
+        embeddings = await asyncio.to_thread(cache_service.model.encode, topics, normalize_embeddings=True)
+        matrix = np.asarray(embeddings, dtype=np.float32)
+        similarity = matrix @ matrix.T
+        kept: List[int] = []
+        for position, index in enumerate(canonical):
+            match = next((k for k in kept if similarity[position, k] >= settings.CACHE_SIMILARITY_THRESHOLD), None)
+            if match is None:
+                kept.append(position)
+            else:
+                self._mark_duplicate(self.items[index], canonical[match])
+        return [canonical[k] for k in kept]
+
+    def _mark_duplicate(self, item: Dict[str, Any], original: int):
+        item["status"] = "duplicate"
+        item["duplicate_of"] = original
+
+    async def _serve_cached(self, canonical: List[int]) -> List[int]:
+        """Answer topics from the semantic cache; returns the indices that still need a run"""
+
+        pending = []
+        for index in canonical:
+            item = self.items[index]
+            cache_key = await asyncio.to_thread(cache_service.find_cached_entry, item["topic"], self.workflow_type)
+            cached = await asyncio.to_thread(cache_service.read_cached_fields, cache_key) if cache_key else None
+            if cached:
+                cache_service.record_hit(cache_key)  # Stale entries are served and refreshed
+                self._finish(index, "cached", cached)
+            else:
+                pending.append(index)
+        return pending
+
+    async def _run_topic(self, index: int, semaphore: asyncio.Semaphore):
+        item = self.items[index]
+        async with semaphore:
+            ticket = await self._admit()
+            item["status"] = "running"
+            self._emit({"type": "progress", "index": index, "topic": item["topic"], "status": "running"})
+            try:
+                with deadline_scope(settings.REQUEST_TIMEOUT):
+                    result = await self._workflow().execute(item["topic"], **self._execute_kwargs())
+            except Exception as e:
+                logger.error(f"Batch {self.batch_id} topic {index} failed: {e}")
+                item["error"] = str(e)
+                self._finish(index, "failed", None)
+                return
+            finally:
+                ticket.release()
+
+        status = result.pop("status", "completed")
+        if status == "completed":
+            await asyncio.to_thread(cache_service.store_result, item["topic"], self.workflow_type, result)
+        self._finish(index, status, result)
+
+    async def _admit(self):
+        """Admission slot shared with interactive requests; a batch waits instead of failing"""
+        if self.background:
+            return await admission_controller.acquire_idle(
+                f"batch_{self.workflow_type}", reserve=settings.CACHE_WARM_RESERVED_SLOTS
+            )
+        while True:
+            try:
+                return await admission_controller.acquire(f"batch_{self.workflow_type}")
+            except AdmissionRejected as e:
+                await asyncio.sleep(e.retry_after)
+
+    def _workflow(self):
+        if self.workflow_type == "tool_research":
+            return ToolResearchWorkflow(
+                model=self.params.get("model"),
+                tools=self.params.get("tools"),
+                max_results=self.params.get("max_results") or 5
+            )
+        return MultiAgentWorkflow(
+            model=self.params.get("model"),
+            max_steps=self.params.get("max_steps") or 4,
+            limit_steps=True
+        )
+
+    def _execute_kwargs(self) -> Dict[str, Any]:
+        if self.workflow_type == "tool_research":
+            return {"export_format": self.params.get("export_format") or "html"}
+        return {}
+
+    def _finish(self, index: int, status: str, result: Optional[Dict[str, Any]]):
+        """Record a topic's outcome and hand the same result to its duplicates"""
+
+        for item in self.items:
+            if item["index"] == index or (item["status"] == "duplicate" and item["duplicate_of"] == index):
+                if item["index"] == index:
+                    item["status"] = status
+                if not self.background:
+                    item["result"] = result
+                self._emit({
+                    "type": "result",
+                    "index": item["index"],
+                    "topic": item["topic"],
+                    "status": item["status"],
+                    "duplicate_of": item["duplicate_of"],
+                    "error": self.items[index]["error"],
+                    "result": None if self.background else result
+                })
+        self._emit({"type": "progress", "counts": self.counts()})
+
+
+class BatchRegistry:
+    """Recent batches kept in memory (oldest finished ones dropped beyond BATCH_RETAIN)"""
+
+    def __init__(self):
+        self._batches: "OrderedDict[str, BatchRun]" = OrderedDict()
+
+    def start(self, topics: List[str], workflow_type: str, params: Dict[str, Any], concurrency: int = None, **options) -> BatchRun:
+        batch = BatchRun(topics, workflow_type, params, concurrency, **options)
+        self._batches[batch.batch_id] = batch
+        for batch_id in [bid for bid, b in self._batches.items() if b.done][:max(0, len(self._batches) - settings.BATCH_RETAIN)]:
+            del self._batches[batch_id]
+        batch.start()
+        return batch
+
+    def get(self, batch_id: str) -> Optional[BatchRun]:
+        return self._batches.get(batch_id)
+
+    def reset(self):
+        for batch in self._batches.values():
+            batch.cancel()
+        self._batches.clear()
+
+
+# Global instance
+batch_runs = BatchRegistry()
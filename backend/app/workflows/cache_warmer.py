@@ -0,0 +1,157 @@
+"""
+Cache warming: run popular topics ahead of users after a Redis flush, a fresh
+deployment or a TTL wave.
+
+Topics come from a list (API body or a file through the CLI) or are mined from
+the request counts metrics_service keeps per workflow. A warm-up is a background
+batch (see app.workflows.batch): deduplicated, skipping topics already cached
+unless `refresh` is set, at most CACHE_WARM_CONCURRENCY runs at a time, and only on
+admission slots left idle by interactive requests. One warm-up runs at a time.
+
+CLI (against a running server):
+    python -m app.workflows.cache_warmer --from-metrics --limit 50
+    python -m app.workflows.cache_warmer --file topics.txt --workflow-type multi_agent
+"""
+from app.core.config import settings
+from app.services.cache_service import cache_service
+from app.services.metrics_service import metrics_service
+from app.workflows.batch import BatchRun, batch_runs
+from typing import Any, Dict, List, Optional
+import time
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class WarmupError(Exception):
+    """A warm-up could not be started (one already running, nothing to warm, cache off)"""
+
+
+class CacheWarmer:
+    """Starts and tracks cache warm-ups (one at a time)"""
+
+    def __init__(self):
+        self.batch: Optional[BatchRun] = None
+        self.source: Optional[str] = None
+
+    @property
+    def running(self) -> bool:
+        return self.batch is not None and not self.batch.done
+
+    def start(
+        self,
+        topics: Optional[List[str]] = None,
+        workflow_type: str = "tool_research",
+        limit: int = None,
+        refresh: bool = False,
+        concurrency: int = None,
+        params: Dict[str, Any] = None
+    ) -> BatchRun:
+        """
+        Start a warm-up in the background.
+
+        Args:
+            topics: Topics to warm, or None to mine the most requested ones
+            limit: Most requested topics to warm when mining (defaults to CACHE_WARM_TOP_TOPICS)
+            refresh: Re-run topics that are already cached (refresh before their TTL runs out)
+        """
+
+        if self.running:
+            raise WarmupError("A cache warm-up is already running")
+        if not cache_service.enabled:
+            raise WarmupError("Semantic cache is disabled; nothing to warm")
+
+        if topics:
+            source = "list"
+            topics = topics[:limit] if limit else topics
+        else:
+            source = "metrics"
+            popular = metrics_service.popular_topics(
+                workflow_type,
+                limit or settings.CACHE_WARM_TOP_TOPICS,
+                min_requests=settings.CACHE_WARM_MIN_REQUESTS
+            )
+            topics = [entry["topic"] for entry in popular]
+        if not topics:
+            raise WarmupError(f"No {workflow_type} topics to warm")
+
+        # Registered with the batches so its progress can be streamed like any batch
+        self.batch = batch_runs.start(
+            topics,
+            workflow_type,
+            params or {},
+            concurrency=min(concurrency or settings.CACHE_WARM_CONCURRENCY, settings.CACHE_WARM_CONCURRENCY),
+            background=True,
+            refresh=refresh
+        )
+        self.source = source
+        logger.info(f"Cache warm-up {self.batch.batch_id} started: {len(topics)} {workflow_type} topics from {source}")
+        return self.batch
+
+    def cancel(self) -> bool:
+        if not self.running:
+            return False
+        self.batch.cancel()
+        return True
+
+    def status(self) -> Dict[str, Any]:
+        if self.batch is None:
+            return {"status": "idle"}
+        snapshot = self.batch.snapshot(include_results=False)
+        return {
+            **snapshot,
+            "source": self.source,
+            "refresh": self.batch.refresh,
+            "started_at": self.batch.created_at,
+            "elapsed_seconds": round(time.time() - self.batch.created_at, 1)
+        }
+
+
+# Global instance
+cache_warmer = CacheWarmer()
+
+
+def main(argv: List[str] = None):
+    """Trigger a warm-up on a running server and follow its progress"""
+    import argparse
+    import json
+    import httpx
+
+    parser = argparse.ArgumentParser(description="Warm the semantic cache with popular topics")
+    parser.add_argument("--url", default=f"http://localhost:{settings.API_PORT}", help="Server base URL")
+    parser.add_argument("--file", help="Topic list, one per line (default: mine the most requested topics)")
+    parser.add_argument("--from-metrics", action="store_true", help="Warm the most requested topics")
+    parser.add_argument("--workflow-type", default="tool_research", choices=["tool_research", "multi_agent"])
+    parser.add_argument("--limit", type=int, help="Topics to warm at most")
+    parser.add_argument("--refresh", action="store_true", help="Re-run topics that are already cached")
+    parser.add_argument("--no-follow", action="store_true", help="Return once the warm-up has started")
+    args = parser.parse_args(argv)
+
+    body: Dict[str, Any] = {"workflow_type": args.workflow_type, "refresh": args.refresh}
+    if args.limit:
+        body["limit"] = args.limit
+    if args.file and not args.from_metrics:
+        with open(args.file, encoding="utf-8") as f:
+            body["topics"] = [line.strip() for line in f if line.strip() and not line.startswith("#")]
+
+    with httpx.Client(base_url=args.url, timeout=30) as client:
+        response = client.post("/api/v1/cache/warm", json=body)
+        if response.status_code >= 400:
+            raise SystemExit(f"Warm-up not started: {response.json().get('detail', response.text)}")
+        print(f"Warm-up {response.json()['batch_id']} started ({response.json()['total']} topics)")
+        if args.no_follow:
+            return
+
+        with client.stream("GET", f"/api/v1/workflows/batch/{response.json()['batch_id']}/stream", timeout=None) as stream:
+            for line in stream.iter_lines():
+                if not line.startswith("data: "):
+                    continue
+                event = json.loads(line[6:])
+                if event["type"] == "result":
+                    print(f"[{event['status']}] {event['topic']}" + (f" ({event['error']})" if event.get("error") else ""))
+                elif event["type"] == "complete":
+                    print(f"Done: {event['counts']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,251 @@
+"""
+Token-budgeted context for multi-agent steps.
+
+Prior step outputs are split into paragraph chunks and embedded once (with the
+semantic cache's embedding model; token overlap when it is not loaded). Each
+prompt gets the chunks most relevant to its task that fit the token budget, in
+their original order, so prompt size stays bounded whatever the number of steps.
+With CONTEXT_SUMMARIZE, outputs older than the last CONTEXT_RECENT_STEPS steps are
+replaced by a cheap-model summary (cached per output under the "summary" stage).
+"""
+from app.core.config import settings
+from app.core.deadline import llm_timeout
+from app.services.cache_service import cache_service
+from app.services.metrics_service import metrics_service
+from app.services.rate_governor import CHARS_PER_TOKEN
+from app.services.resilience import dependencies
+from typing import List, Optional
+import asyncio
+import re
+import logging
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+_TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+_SENTENCE_RE = re.compile(r'(?<=[.!?])\s+')
+
+STEP_HEADER_TOKENS = 12  # "Step N executed by agent:" plus separators
+GAP_MARKER = "[...]"
+
+SUMMARY_PROMPT = """Summarize the following work from a research team member in at most {words} words.
+Keep every concrete finding, figure, source and open question; drop repetition and filler.
+Write in the same language as the text.
+
+{text}"""
+
+
+def count_tokens(text: str) -> int:
+    return max(1, len(text) // CHARS_PER_TOKEN)
+
+
+def _words(text: str) -> set:
+    return set(_TOKEN_RE.findall(text.lower()))
+
+
+def split_chunks(text: str, max_tokens: int) -> List[str]:
+    """Paragraph chunks of at most max_tokens (small paragraphs merged, long ones split by sentence)"""
+
+    pieces = []
+    for paragraph in re.split(r'\n\s*\n', text.strip()):
+        paragraph = paragraph.strip()
+        if not paragraph:
+            continue
+        if count_tokens(paragraph) <= max_tokens:
+            pieces.append(paragraph)
+            continue
+        current = ""
+        for sentence in _SENTENCE_RE.split(paragraph):
+            if current and count_tokens(current + " " + sentence) > max_tokens:
+                pieces.append(current)
+                current = ""
+            # A single oversized sentence is cut hard
+            while count_tokens(sentence) > max_tokens:
+                cut = max_tokens * CHARS_PER_TOKEN
+                pieces.append(sentence[:cut])
+                sentence = sentence[cut:]
+            current = f"{current} {sentence}".strip()
+        if current:
+            pieces.append(current)
+
+    chunks, current = [], ""
+    for piece in pieces:
+        if current and count_tokens(current + "\n\n" + piece) > max_tokens:
+            chunks.append(current)
+            current = ""
+        current = f"{current}\n\n{piece}" if current else piece
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+class Chunk:
+    __slots__ = ("step", "agent", "position", "text", "tokens", "embedding")
+
+    def __init__(self, step: int, agent: str, position: int, text: str):
+        self.step = step
+        self.agent = agent
+        self.position = position
+        self.text = text
+        self.tokens = count_tokens(text)
+        self.embedding: Optional[np.ndarray] = None
+
+
+class ContextBuilder:
+    """Chunk index over a run's step outputs, queried per prompt under a token budget"""
+
+    def __init__(self, client=None):
+        self.client = client
+        self._reset(None)
+
+    def _reset(self, history: Optional[list]):
+        self._history = history
+        self.chunks: List[Chunk] = []
+        self._indexed = 0  # History items already chunked
+        self._summarized = 0  # History items already replaced by their summary
+
+    async def build(self, history: list, query: str, budget: int) -> str:
+        """
+        Context for a prompt about `query` from the run's history, within `budget` tokens.
+
+        History items added since the last call are chunked and embedded first.
+        """
+
+        if not history:
+            return "No previous steps."
+
+        if history is not self._history:
+            self._reset(history)  # A new run
+        await self._index(history)
+        selected = await self._select(query, budget)
+        text = self._render(selected)
+        metrics_service.record_stage(
+            "context_builder",
+            budget=budget,
+            tokens=count_tokens(text),
+            chunks_selected=len(selected),
+            chunks_total=len(self.chunks)
+        )
+        return text
+
+    async def _index(self, history: list):
+        new_chunks = []
+        for step in range(self._indexed, len(history)):
+            item = history[step]
+            if item.get("skipped"):
+                continue  # Convergence note, not work output
+            for position, text in enumerate(split_chunks(item["output"] or "", settings.CONTEXT_CHUNK_TOKENS)):
+                new_chunks.append(Chunk(step, item["agent"], position, text))
+        self._indexed = len(history)
+        await self._embed(new_chunks)
+        self.chunks.extend(new_chunks)
+
+        if settings.CONTEXT_SUMMARIZE and self.client is not None:
+            for step in range(self._summarized, max(0, len(history) - settings.CONTEXT_RECENT_STEPS)):
+                await self._summarize_step(step, history[step])
+            self._summarized = max(self._summarized, len(history) - settings.CONTEXT_RECENT_STEPS)
+
+    async def _embed(self, chunks: List[Chunk]):
+        """One batched encode for the new chunks (skipped without the cache's model)"""
+        if not chunks or cache_service.model is None:
+            return
+        embeddings = await asyncio.to_thread(
+            cache_service.model.encode, [c.text for c in chunks], normalize_embeddings=True
+        )
+        for chunk, embedding in zip(chunks, embeddings):
+            chunk.embedding = np.asarray(embedding, dtype=np.float32)
+
+    async def _summarize_step(self, step: int, item: dict):
+        """Replace a long older step's chunks with one summary chunk"""
+
+        output = item["output"] or ""
+        words = settings.CONTEXT_SUMMARY_TOKENS * 3 // 4
+        if count_tokens(output) <= settings.CONTEXT_SUMMARY_TOKENS:
+            return
+
+        summary = cache_service.get_stage_result("summary", output)
+        if summary is None:
+            try:
+                response = await dependencies["openai"].call(
+                    self.client.chat.completions.create,
+                    model=settings.CONTEXT_SUMMARY_MODEL.replace("openai:", ""),
+                    timeout=llm_timeout(),
+                    messages=[{"role": "user", "content": SUMMARY_PROMPT.format(words=words, text=output)}],
+                    temperature=0,
+                    max_tokens=settings.CONTEXT_SUMMARY_TOKENS,
+                )
+                summary = (response.choices[0].message.content or "").strip()
+            except Exception as e:
+                logger.warning(f"Context summary failed for step {step + 1}: {e}")
+                return
+            if not summary:
+                return
+            cache_service.store_stage_result("summary", output, summary)
+
+        chunk = Chunk(step, item["agent"], 0, summary)
+        await self._embed([chunk])
+        self.chunks = [c for c in self.chunks if c.step != step]
+        self.chunks.append(chunk)
+
+    async def _select(self, query: str, budget: int) -> List[Chunk]:
+        """Highest-scoring chunks that fit the budget (a step's first chunk also pays for its header)"""
+
+        if not self.chunks:
+            return []
+        scores = await self._scores(query)
+        latest = max(c.step for c in self.chunks)
+        ranked = sorted(
+            zip(self.chunks, scores),
+            # Slight preference for recent steps breaks ties between similar chunks
+            key=lambda pair: pair[1] + 0.05 * (pair[0].step == latest),
+            reverse=True
+        )
+
+        selected, used, steps = [], 0, set()
+        for chunk, _ in ranked:
+            cost = chunk.tokens + (STEP_HEADER_TOKENS if chunk.step not in steps else 0)
+            if used + cost > budget:
+                continue
+            selected.append(chunk)
+            steps.add(chunk.step)
+            used += cost
+        return selected
+
+    async def _scores(self, query: str) -> List[float]:
+        if cache_service.model is not None and all(c.embedding is not None for c in self.chunks):
+            query_embedding = await asyncio.to_thread(cache_service.model.encode, query, normalize_embeddings=True)
+            matrix = np.stack([c.embedding for c in self.chunks])
+            return (matrix @ np.asarray(query_embedding, dtype=np.float32)).tolist()
+
+        query_words = _words(query)
+        scores = []
+        for chunk in self.chunks:
+            chunk_words = _words(chunk.text)
+            union = query_words | chunk_words
+            scores.append(len(query_words & chunk_words) / len(union) if union else 0.0)
+        return scores
+
+    def _render(self, selected: List[Chunk]) -> str:
+        """Selected chunks in original order, grouped by step, with gaps marked"""
+
+        if not selected:
+            return "No previous steps."
+        last_position = {}
+        for chunk in self.chunks:
+            last_position[chunk.step] = max(last_position.get(chunk.step, 0), chunk.position)
+        parts = []
+        by_step = {}
+        for chunk in sorted(selected, key=lambda c: (c.step, c.position)):
+            by_step.setdefault(chunk.step, []).append(chunk)
+        for step, chunks in by_step.items():
+            body, expected = [], 0
+            for chunk in chunks:
+                if chunk.position != expected:
+                    body.append(GAP_MARKER)
+                body.append(chunk.text)
+                expected = chunk.position + 1
+            if expected <= last_position[step]:
+                body.append(GAP_MARKER)
+            parts.append(f"Step {step + 1} executed by {chunks[0].agent}:\n" + "\n\n".join(body))
+        return "\n\n".join(parts)
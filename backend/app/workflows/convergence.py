@@ -0,0 +1,89 @@
+"""
+Convergence detection for multi-agent refinement steps.
+
+Writer/editor steps refine the same document; once a pass barely changes it,
+further passes are unlikely to be worth their LLM calls. The detector compares each
+refinement output with the previous one (word-level difflib ratio over the full
+texts) and reports convergence when the similarity reaches CONVERGENCE_THRESHOLD;
+the orchestrator then skips the remaining refinement steps.
+
+Embeddings are not used here: the cache's model truncates its input (256 word
+pieces), so drafts differing only past their opening would look identical.
+"""
+from app.core.config import settings
+from app.services.metrics_service import metrics_service
+from app.workflows.plan_optimizer import guess_agent
+from difflib import SequenceMatcher
+from typing import Optional
+import asyncio
+import logging
+
+logger = logging.getLogger(__name__)
+
+REFINEMENT_AGENTS = ("writer_agent", "editor_agent")
+
+
+def _similarity(previous: str, current: str) -> float:
+    if previous == current:
+        return 1.0
+    # Words rather than characters: as precise for edits, and much cheaper on long drafts
+    return SequenceMatcher(None, previous.split(), current.split(), autojunk=False).ratio()
+
+
+class ConvergenceDetector:
+    """Tracks successive refinement outputs of one run"""
+
+    def __init__(self):
+        self.reason: Optional[str] = None
+        self.similarity: Optional[float] = None
+        self.skipped = 0
+        self._previous: Optional[str] = None
+
+    @property
+    def converged(self) -> bool:
+        return self.reason is not None
+
+    async def observe(self, agent_name: str, output: str) -> bool:
+        """Record a step output; True once refinement has converged"""
+
+        if self.converged or not settings.CONVERGENCE_DETECTION:
+            return self.converged
+        if agent_name not in REFINEMENT_AGENTS or not output:
+            return False
+
+        previous, self._previous = self._previous, output
+        if previous is None:
+            return False
+        similarity = await asyncio.to_thread(_similarity, previous, output)
+        if similarity >= settings.CONVERGENCE_THRESHOLD:
+            self.similarity = similarity
+            self.reason = (
+                f"Converged: {agent_name} output {similarity:.1%} similar to the previous draft "
+                f"(threshold {settings.CONVERGENCE_THRESHOLD:.0%}); remaining refinement steps skipped"
+            )
+            logger.info(self.reason)
+        return self.converged
+
+    def skips(self, step: str, agent_name: str = None) -> bool:
+        """Whether a step is refinement to skip (by its routed agent, or guessed from its wording before routing)"""
+
+        return self.converged and (agent_name or guess_agent(step)) in REFINEMENT_AGENTS
+
+    def skip(self, step: str) -> dict:
+        """History entry for a refinement step skipped after convergence"""
+
+        self.skipped += 1
+        return {
+            "step": step,
+            "agent": "orchestrator",
+            "output": self.reason,
+            "skipped": True
+        }
+
+    def finish(self):
+        if self.converged:
+            metrics_service.record_stage(
+                "convergence",
+                similarity=round(self.similarity, 4),
+                skipped_steps=self.skipped
+            )
@@ -1,12 +1,23 @@
 from app.agents import PlannerAgent, ResearchAgent, WriterAgent, EditorAgent
 from app.core.config import settings
+from app.core.deadline import DeadlineExceeded, llm_timeout, remaining, run_stage
+from app.services.resilience import dependencies
+from app.services.hedging import hedging
 from app.utils import filter_relevant_sources
+from app.services.cache_service import cache_service
+from app.services.metrics_service import metrics_service
+from app.tools.prefetch import ToolPrefetcher
+from app.workflows.context_builder import ContextBuilder
+from app.workflows.plan_optimizer import optimize_plan
+from app.workflows.convergence import ConvergenceDetector
 from app.tools.arxiv_tool import arxiv_tool_def, arxiv_search_tool
 from app.tools.tavily_tool import tavily_tool_def, tavily_search_tool
 from app.tools.wikipedia_tool import wikipedia_tool_def, wikipedia_search_tool
 from openai import AsyncOpenAI
+import asyncio
 import json
 import re
+import time
 import logging
 
 RESEARCH_TOOLS = [arxiv_tool_def, tavily_tool_def, wikipedia_tool_def]
@@ -31,7 +42,7 @@ class MultiAgentWorkflow:
         self.model = model or settings.DEFAULT_RESEARCH_MODEL
         self.max_steps = max_steps
         self.limit_steps = limit_steps
-        self.client = AsyncOpenAI()
+        self.client = AsyncOpenAI(max_retries=0)  # Retried by dependencies["openai"]
         
         # Agent registry
         self.agents = {
@@ -39,36 +50,61 @@ class MultiAgentWorkflow:
             "writer_agent": WriterAgent(model=self.model),
             "editor_agent": EditorAgent(model=self.model)
         }
+        
+        # Step outputs indexed for token-budgeted prompt context
+        self.context = ContextBuilder(self.client)
+        
+        # Speculative work started before it is needed (see speculate())
+        self._plan_task = None
+        self._speculation_started = None
+        self._prefetch = None
     
     async def execute(self, topic: str) -> dict:
         """Execute the multi-agent workflow"""
         
         logger.info(f"Starting multi-agent workflow for: {topic}")
         
-        # Step 1: Planning
-        planner = PlannerAgent()
+        # Step 1: Planning (overlapped with a generic tool pass when speculating)
         logger.info("Step 1: Creating plan...")
-        plan_steps = await planner.execute(topic)
+        if settings.SPECULATIVE_PLANNING:
+            self.speculate(topic)
+        plan_steps = await run_stage(self._planned(topic), "plan")
         
         # Limit steps if configured
         if self.limit_steps:
             plan_steps = plan_steps[:min(len(plan_steps), self.max_steps)]
+        plan_steps = await self._optimize(plan_steps)
         
         logger.info(f"Plan created with {len(plan_steps)} steps")
         
-        # Step 2: Execute plan
+        # Step 2: Execute plan (keeping part of the remaining time for the synthesis)
         history = []
+        partial_stage = None
+        reserve = self._synthesis_reserve()
+        convergence = ConvergenceDetector()
         
         for i, step in enumerate(plan_steps):
             logger.info(f"Executing step {i+1}/{len(plan_steps)}: {step}")
             
-            # Decide which agent to use
-            agent_decision = await self._decide_agent(step)
+            # Refinement has stopped changing the draft: skip further writer/editor passes
+            if convergence.skips(step):
+                history.append(convergence.skip(step))
+                continue
+            
+            try:
+                # Decide which agent to use
+                agent_decision = await run_stage(self._decide_agent(step), f"step_{i+1}", reserve=reserve)
+            except DeadlineExceeded as e:
+                partial_stage = e.stage
+                break
             agent_name = agent_decision["agent"]
             task = agent_decision["task"]
+            if convergence.skips(step, agent_name):
+                history.append(convergence.skip(step))
+                continue
             
-            # Build context from previous steps
-            context = self._build_context(history)
+            # Build context from previous steps (the parts most relevant to this task)
+            context = await self._build_context(history, task)
             enriched_task = f"""You are {agent_name}.
 
 Here is the context of what has been done so far:
@@ -78,23 +114,25 @@ Your next task is:
 {task}
 """
             
-            # Execute with selected agent (research_agent gets tools for source collection)
-            if agent_name == "research_agent":
-                output = await self.agents[agent_name].execute(
-                    enriched_task,
-                    tools=RESEARCH_TOOLS,
-                    tool_func_mapping=RESEARCH_TOOL_MAPPING
+            try:
+                output = await run_stage(
+                    self._execute_step(agent_name, task, enriched_task, draft=self._latest_draft(history)),
+                    f"step_{i+1}",
+                    reserve=reserve
                 )
-            elif agent_name in self.agents:
-                output = await self.agents[agent_name].execute(enriched_task)
-            else:
-                output = f"Unknown agent: {agent_name}"
+            except DeadlineExceeded as e:
+                partial_stage = e.stage
+                break
             
             history.append({
                 "step": step,
                 "agent": agent_name,
                 "output": output
             })
+            await convergence.observe(agent_name, output)
+        
+        convergence.finish()
+        self._release_prefetch()
         
         # Step 3: Final synthesis - Let WriterAgent produce polished final version
         logger.info("Final step: Synthesizing final report from all agent outputs...")
@@ -104,7 +142,7 @@ Your next task is:
 Based on all the work done by the team below, produce a comprehensive, well-structured final report on the topic: "{topic}"
 
 Team work history:
-{self._build_context(history)}
+{await self._build_context(history, topic, settings.CONTEXT_SYNTHESIS_TOKEN_BUDGET)}
 
 **Your task:**
 - Synthesize all research findings into a coherent narrative
@@ -115,7 +153,16 @@ Team work history:
 
 **IMPORTANT:** Return ONLY the final polished report text, NOT meta-commentary or explanations about what you did."""
 
-        final_report = await self.agents["writer_agent"].execute(synthesis_task)
+        try:
+            final_report = await run_stage(self.agents["writer_agent"].execute(synthesis_task), "synthesis")
+        except DeadlineExceeded as e:
+            partial_stage = partial_stage or e.stage
+            final_report = self._partial_report(history)
+        timed_out_tools = self.agents["research_agent"].timed_out_tools
+        partial_stage = partial_stage or (timed_out_tools[0] if timed_out_tools else None)
+        if partial_stage:
+            logger.warning(f"Deadline exceeded during {partial_stage}; returning partial result")
+            metrics_service.record_stage("deadline", workflow="multi_agent", timed_out_stage=partial_stage)
         
         # Add synthesis step to history
         history.append({
@@ -139,9 +186,142 @@ Team work history:
             "plan": plan_steps,
             "history": history,
             "final_report": final_report,
-            "sources": sources[:10]  # Limit to 10 sources cited in final output
+            "sources": sources[:10],  # Limit to 10 sources cited in final output
+            "status": "partial" if partial_stage else "completed"
         }
     
+    async def _plan(self, topic: str) -> list:
+        """Planning stage, reusing a cached plan for a similar topic"""
+        
+        cached = cache_service.get_stage_result("plan", topic)
+        if cached:
+            return list(cached)
+        
+        plan_steps = await PlannerAgent().execute(topic)
+        cache_service.store_stage_result("plan", topic, plan_steps)
+        return plan_steps
+    
+    async def _optimize(self, plan_steps: list) -> list:
+        """Drop duplicate and redundant steps, fuse same-agent runs (see plan_optimizer)"""
+        
+        if not settings.PLAN_OPTIMIZER:
+            return plan_steps
+        optimized, _ = await optimize_plan(plan_steps)
+        return optimized
+    
+    def speculate(self, topic: str):
+        """
+        Start planning, plus a generic search pass on the topic, before they are awaited.
+        
+        Called while the semantic cache lookup is in flight (cancel_speculation() on a hit);
+        the plan is picked up by _planned() and the search results by the first research step.
+        """
+        
+        if self._plan_task is not None:
+            return
+        self._speculation_started = time.monotonic()
+        self._plan_task = asyncio.create_task(self._timed_plan(topic))
+        self._prefetch = ToolPrefetcher(RESEARCH_TOOL_MAPPING, topic, list(RESEARCH_TOOL_MAPPING))
+        self._prefetch.start()
+    
+    def cancel_speculation(self):
+        """Drop speculative work (the cache answered the request)"""
+        
+        self._release_prefetch()
+        if self._plan_task is None:
+            return
+        self._plan_task.cancel()
+        self._plan_task = None
+        metrics_service.record_stage("speculative_planning", cancelled=True)
+    
+    async def _timed_plan(self, topic: str):
+        start = time.monotonic()
+        plan_steps = await self._plan(topic)
+        return plan_steps, (time.monotonic() - start) * 1000
+    
+    async def _planned(self, topic: str) -> list:
+        """Return the plan, awaiting the speculative planner if one was started"""
+        
+        if self._plan_task is None:
+            return await self._plan(topic)
+        
+        wait_start = time.monotonic()
+        plan_steps, plan_ms = await self._plan_task
+        wait_ms = (time.monotonic() - wait_start) * 1000
+        self._plan_task = None
+        
+        # Critical path without overlap = lookup + plan; with overlap = lookup + wait
+        metrics_service.record_stage(
+            "speculative_planning",
+            cancelled=False,
+            plan_ms=round(plan_ms, 1),
+            plan_wait_ms=round(wait_ms, 1),
+            saved_ms=round(plan_ms - wait_ms, 1)
+        )
+        return plan_steps
+    
+    def _synthesis_reserve(self) -> float:
+        """Seconds of the remaining run time kept back for the final synthesis"""
+        
+        return (remaining() or 0.0) * settings.DEADLINE_SYNTHESIS_RESERVE
+    
+    def _partial_report(self, history: list) -> str:
+        """Best available report when the synthesis ran out of time: the latest written output"""
+        
+        return self._latest_draft(history) or "\n\n".join(item["output"] for item in history if item["output"])
+    
+    def _latest_draft(self, history: list) -> str:
+        """Latest writer/editor output, if any"""
+        
+        for item in reversed(history):
+            if item["agent"] in ("writer_agent", "editor_agent") and item["output"]:
+                return item["output"]
+        return None
+    
+    def _release_prefetch(self):
+        """Cancel a speculative search pass that no research step consumed"""
+        
+        if self._prefetch is not None:
+            self._prefetch.finish()
+            self._prefetch = None
+    
+    async def _execute_step(self, agent_name: str, task: str, enriched_task: str, draft: str = None) -> str:
+        """Run one plan step with the selected agent (`draft`: latest written output, edited in patch mode)"""
+        
+        # research_agent gets tools for source collection; its findings are cached per task
+        if agent_name == "research_agent":
+            agent = self.agents[agent_name]
+            cached = cache_service.get_stage_result("research", task)
+            if cached:
+                agent.collected_sources = list(cached.get("sources", []))
+                return cached["report"]
+            
+            # The first research step is served from the speculative topic search, if any
+            prefetch, self._prefetch = self._prefetch, None
+            timeouts = len(agent.timed_out_tools)
+            output = await agent.execute(
+                enriched_task,
+                tools=RESEARCH_TOOLS,
+                tool_func_mapping=RESEARCH_TOOL_MAPPING,
+                prefetch_query=task,
+                prefetch=prefetch
+            )
+            if output and len(agent.timed_out_tools) == timeouts:
+                cache_service.store_stage_result("research", task, {
+                    "report": output,
+                    "sources": agent.collected_sources
+                })
+            return output
+        
+        # In patch mode the editor returns targeted edits to the latest draft instead of a rewrite
+        if agent_name == "editor_agent" and draft and settings.REVISION_MODE == "patch":
+            return await self.agents[agent_name].revise(draft, task)
+        
+        if agent_name in self.agents:
+            return await self.agents[agent_name].execute(enriched_task)
+        
+        return f"Unknown agent: {agent_name}"
+    
     async def _decide_agent(self, step: str) -> dict:
         """Decide which agent should handle a step"""
         
@@ -160,8 +340,11 @@ Instruction: "{step}"
 """
         
         try:
-            response = await self.client.chat.completions.create(
+            response = await hedging.call(
+                "decide_agent",
+                self.client.chat.completions.create,
                 model=self.model,
+                timeout=llm_timeout(),
                 messages=[{"role": "user", "content": agent_decision_prompt}],
                 temperature=0,
             )
@@ -172,23 +355,16 @@ Instruction: "{step}"
             
             return agent_info
             
+        except DeadlineExceeded:
+            raise  # Out of time (llm_timeout, rate governor): end the loop as a partial result
         except Exception as e:
             logger.error(f"Agent decision error: {e}")
             return {"agent": "writer_agent", "task": step}
     
-    def _build_context(self, history: list) -> str:
-        """Build context from execution history"""
-        
-        if not history:
-            return "No previous steps."
-        
-        context_parts = []
-        for i, item in enumerate(history):
-            context_parts.append(
-                f"Step {i+1} executed by {item['agent']}:\n{item['output'][:300]}..."
-            )
+    async def _build_context(self, history: list, query: str, budget: int = None) -> str:
+        """Build context from execution history: the chunks most relevant to `query`, within a token budget"""
         
-        return "\n\n".join(context_parts)
+        return await self.context.build(history, query, budget or settings.CONTEXT_TOKEN_BUDGET)
     
     def _clean_json_block(self, raw: str) -> str:
         """Clean JSON blocks that may be wrapped in markdown"""
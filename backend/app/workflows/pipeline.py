@@ -0,0 +1,88 @@
+"""Pipelined stage execution: render report sections while later sections are still being generated."""
+from typing import Awaitable, Callable, List, Optional, Tuple
+import asyncio
+import re
+import logging
+
+logger = logging.getLogger(__name__)
+
+_HEADING_RE = re.compile(r'^#{1,2}\s')
+_FENCE_RE = re.compile(r'^\s*(```|~~~)')
+
+
+class MarkdownSectionSplitter:
+    """
+    Incrementally split streamed Markdown at section boundaries.
+
+    A section ends where the next level-1/level-2 heading starts. Headings inside
+    fenced code blocks are ignored, and a line is only inspected once complete.
+    """
+
+    def __init__(self):
+        self._buffer = ""
+        self._current: List[str] = []
+        self._in_fence = False
+
+    def feed(self, delta: str) -> List[str]:
+        """Add streamed text; return the sections completed by it"""
+        self._buffer += delta
+        completed = []
+
+        while "\n" in self._buffer:
+            line, self._buffer = self._buffer.split("\n", 1)
+            if _FENCE_RE.match(line):
+                self._in_fence = not self._in_fence
+            elif not self._in_fence and _HEADING_RE.match(line) and "".join(self._current).strip():
+                completed.append("".join(self._current))
+                self._current = []
+            self._current.append(line + "\n")
+
+        return completed
+
+    def flush(self) -> Optional[str]:
+        """Return the final (unterminated) section, if any"""
+        remainder = "".join(self._current) + self._buffer
+        self._current, self._buffer = [], ""
+        return remainder if remainder.strip() else None
+
+
+class SectionPipeline:
+    """
+    Start rendering each finished section while the next one is still streaming.
+
+    render_section is an async callable (Markdown section -> HTML fragment); one task
+    is started per section, and assemble() waits for all of them in order.
+    """
+
+    def __init__(self, render_section: Callable[[str], Awaitable[str]]):
+        self.render_section = render_section
+        self.splitter = MarkdownSectionSplitter()
+        self.sections: List[str] = []
+        self._tasks: List[asyncio.Task] = []
+
+    def feed(self, delta: str) -> List[Tuple[int, str]]:
+        """Feed streamed text; returns (index, section) for newly completed sections (rendering already started)"""
+        return [self._start(section) for section in self.splitter.feed(delta)]
+
+    def finish(self) -> List[Tuple[int, str]]:
+        """Close the stream; returns the last (index, section) if one was pending"""
+        last = self.splitter.flush()
+        return [self._start(last)] if last is not None else []
+
+    def _start(self, section: str) -> Tuple[int, str]:
+        self.sections.append(section)
+        self._tasks.append(asyncio.create_task(self.render_section(section)))
+        return len(self.sections) - 1, section
+
+    @property
+    def text(self) -> str:
+        return "".join(self.sections)
+
+    async def assemble(self) -> str:
+        """Wait for every section render and join the fragments in document order"""
+        fragments = await asyncio.gather(*self._tasks)
+        return "\n".join(fragments)
+
+    def cancel(self):
+        for task in self._tasks:
+            task.cancel()
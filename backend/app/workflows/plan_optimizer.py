@@ -0,0 +1,137 @@
+"""
+Plan optimization between planning and execution.
+
+Planner output often repeats itself ("search for X" variants, several writer steps
+in a row) and always ends with "generate a Markdown document", which the final
+synthesis writes anyway. Every step costs at least two LLM calls (agent routing +
+the agent), so the plan is tightened before it runs:
+
+  1. near-duplicate steps are dropped (embedding similarity with the cache's model,
+     word overlap when it is not loaded);
+  2. consecutive steps for the same agent are fused into one instruction;
+  3. a trailing writer step is dropped (the synthesis writes the report).
+
+Agents are guessed from the step wording; steps that match no agent are never
+fused or dropped.
+"""
+from app.core.config import settings
+from app.services.cache_service import cache_service
+from app.services.metrics_service import metrics_service
+from typing import Dict, List, Optional, Tuple
+import asyncio
+import re
+import logging
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+_TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+
+# Minimum LLM calls a step costs: the routing decision plus one agent call
+CALLS_PER_STEP = 2
+
+AGENT_KEYWORDS = {
+    "research_agent": (
+        "search", "find", "look up", "gather", "collect", "investigate", "research", "retrieve",
+        "identify", "explore", "recherch", "cherch", "trouver", "identifier"
+    ),
+    "writer_agent": (
+        "write", "draft", "compose", "generate", "markdown", "summarize", "summarise", "outline",
+        "rédig", "écri", "résum", "génér"
+    ),
+    "editor_agent": (
+        "edit", "revise", "review", "proofread", "refine", "polish", "reflect", "critique", "improve",
+        "révis", "relire", "relis", "corrig", "amélior"
+    ),
+}
+
+
+def guess_agent(step: str) -> Optional[str]:
+    """Agent whose keyword appears first in the step (None if no keyword matches)"""
+
+    text = step.lower()
+    best, best_position = None, len(text) + 1
+    for agent, keywords in AGENT_KEYWORDS.items():
+        for keyword in keywords:
+            match = re.search(r'\b' + re.escape(keyword), text)
+            if match and match.start() < best_position:
+                best, best_position = agent, match.start()
+    return best
+
+
+def _words(text: str) -> set:
+    return set(_TOKEN_RE.findall(text.lower()))
+
+
+async def _similarity_matrix(steps: List[str]) -> np.ndarray:
+    """Pairwise step similarity: embedding cosine, or word overlap (Jaccard) without the model"""
+
+    if cache_service.model is not None:
+        embeddings = await asyncio.to_thread(cache_service.model.encode, steps, normalize_embeddings=True)
+        matrix = np.asarray(embeddings, dtype=np.float32)
+        return matrix @ matrix.T
+
+    words = [_words(step) for step in steps]
+    size = len(steps)
+    matrix = np.eye(size, dtype=np.float32)
+    for i in range(size):
+        for j in range(i + 1, size):
+            union = words[i] | words[j]
+            matrix[i, j] = matrix[j, i] = len(words[i] & words[j]) / len(union) if union else 0.0
+    return matrix
+
+
+def _fuse(steps: List[str]) -> str:
+    return "Complete these tasks together:\n" + "\n".join(f"- {step}" for step in steps)
+
+
+async def optimize_plan(steps: List[str]) -> Tuple[List[str], Dict[str, int]]:
+    """
+    Tighten a plan before execution.
+
+    Returns:
+        (optimized steps, report with steps removed per rule and LLM calls saved)
+    """
+
+    report = {"duplicates": 0, "fused": 0, "trailing_writer": 0}
+    if len(steps) < 2:
+        return list(steps), {**report, "llm_calls_saved": 0}
+
+    # 1. Near-duplicates of an earlier step
+    threshold = settings.PLAN_DEDUP_SIMILARITY if cache_service.model is not None else settings.PLAN_DEDUP_TOKEN_OVERLAP
+    similarity = await _similarity_matrix(steps)
+    kept: List[int] = []
+    for i in range(len(steps)):
+        if any(similarity[i, j] >= threshold for j in kept):
+            report["duplicates"] += 1
+            continue
+        kept.append(i)
+    remaining = [steps[i] for i in kept]
+
+    # 2. Consecutive steps for the same agent become one call
+    groups: List[Tuple[Optional[str], List[str]]] = []
+    for step in remaining:
+        agent = guess_agent(step)
+        if groups and agent is not None and groups[-1][0] == agent and len(groups[-1][1]) < settings.PLAN_FUSE_MAX_STEPS:
+            groups[-1][1].append(step)
+            report["fused"] += 1
+        else:
+            groups.append((agent, [step]))
+    optimized = [group[0] if len(group) == 1 else _fuse(group) for _, group in groups]
+
+    # 3. The final synthesis already writes the report
+    if len(groups) > 1 and groups[-1][0] == "writer_agent":
+        optimized.pop()
+        report["trailing_writer"] = len(groups[-1][1])
+
+    removed = len(steps) - len(optimized)
+    report["llm_calls_saved"] = removed * CALLS_PER_STEP
+    if removed:
+        logger.info(
+            f"Plan optimized: {len(steps)} -> {len(optimized)} steps "
+            f"({report['duplicates']} duplicate, {report['fused']} fused, "
+            f"{report['trailing_writer']} trailing writer), ~{report['llm_calls_saved']} LLM calls saved"
+        )
+    metrics_service.record_stage("plan_optimizer", steps_in=len(steps), steps_out=len(optimized), **report)
+    return optimized, report
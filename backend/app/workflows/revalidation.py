@@ -0,0 +1,112 @@
+"""
+Stale-while-revalidate for semantic cache entries.
+
+Entries older than CACHE_SOFT_TTL_SECONDS are still served, but the hit asks the
+revalidator to refresh them: the cached topic is re-run as a one-topic background
+batch (idle admission slots only, see app.workflows.batch) and store_result replaces
+the entry in one transaction when the run completes. Partial or failed runs leave
+the stale entry in place until the next hit tries again.
+
+Refreshes are deduplicated per entry within the process and, through a Redis lock,
+across replicas.
+"""
+from app.core.config import settings
+from app.services.cache_service import cache_service
+from app.services.metrics_service import metrics_service
+from app.workflows.batch import BatchRun
+from typing import Any, Dict
+import asyncio
+import contextvars
+import time
+import logging
+
+logger = logging.getLogger(__name__)
+
+LOCK_PREFIX = "lock:refresh:"
+
+
+class Revalidator:
+    """Background refreshes of stale cache entries, one per entry at a time"""
+
+    def __init__(self):
+        self._inflight: Dict[str, asyncio.Task] = {}
+        self.started = 0
+        self.deduplicated = 0
+
+    def schedule(self, cache_key: str, topic: str, workflow_type: str) -> bool:
+        """
+        Refresh an entry in the background unless a refresh is already running.
+
+        Returns:
+            True when a refresh is in flight for the entry (started here or elsewhere)
+        """
+
+        task = self._inflight.get(cache_key)
+        if task is not None and not task.done():
+            self.deduplicated += 1
+            return True
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return False  # Off the event loop (worker thread): the next hit schedules it
+        if not self._lock(cache_key):
+            self.deduplicated += 1
+            return True  # Another replica is refreshing it
+
+        self.started += 1
+        # Fresh context: the hit's request deadline (and other request state) must not bound the refresh
+        self._inflight[cache_key] = loop.create_task(
+            self._refresh(cache_key, topic, workflow_type), context=contextvars.Context()
+        )
+        return True
+
+    def _lock(self, cache_key: str) -> bool:
+        """Cross-replica refresh lock (expires after a run's time budget if its holder dies)"""
+        try:
+            return bool(cache_service.redis_client.set(
+                LOCK_PREFIX + cache_key, 1, nx=True, ex=int(settings.REQUEST_TIMEOUT) + 60
+            ))
+        except Exception as e:
+            logger.warning(f"Refresh lock unavailable ({e}); deduplicating in this process only")
+            return True
+
+    async def _refresh(self, cache_key: str, topic: str, workflow_type: str):
+        start = time.monotonic()
+        status = "failed"
+        try:
+            batch = BatchRun([topic], workflow_type, {}, concurrency=1, background=True, refresh=True)
+            await batch.run()
+            status = batch.items[0]["status"]
+            logger.info(f"Revalidated stale cache entry {cache_key}: {status}")
+        except asyncio.CancelledError:
+            status = "cancelled"
+            raise
+        except Exception as e:
+            logger.error(f"Revalidation of {cache_key} failed: {e}")
+        finally:
+            self._inflight.pop(cache_key, None)
+            try:
+                cache_service.redis_client.delete(LOCK_PREFIX + cache_key)
+            except Exception:
+                pass  # The lock expires on its own
+            metrics_service.record_stage(
+                "cache_revalidate",
+                workflow=workflow_type,
+                status=status,
+                duration_ms=round((time.monotonic() - start) * 1000, 1)
+            )
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "in_flight": sum(1 for task in self._inflight.values() if not task.done()),
+            "started": self.started,
+            "deduplicated": self.deduplicated
+        }
+
+    def cancel_all(self):
+        for task in self._inflight.values():
+            task.cancel()
+
+
+# Global instance
+revalidator = Revalidator()
@@ -3,14 +3,45 @@ from app.tools.arxiv_tool import arxiv_search_tool, arxiv_tool_def
 from app.tools.tavily_tool import tavily_search_tool, tavily_tool_def
 from app.tools.wikipedia_tool import wikipedia_search_tool, wikipedia_tool_def
 from app.core.config import settings
-from app.utils import filter_relevant_sources
+from app.core import deadline
+from app.core.deadline import DeadlineExceeded, llm_timeout, run_stage
+from app.services.resilience import dependencies
+from app.utils import (
+    filter_relevant_sources,
+    render_report_html,
+    render_markdown_fragment,
+    IncrementalJSONObjectParser,
+)
+from app.services.cache_service import cache_service
+from app.services.metrics_service import metrics_service
 from openai import AsyncOpenAI
 import json
 import re
+import time
 import logging
+from typing import Any, AsyncGenerator, Tuple
 
 logger = logging.getLogger(__name__)
 
+# Structured output for the single reflect+rewrite call; "reflection" is generated
+# first so it can be shown while the revised report is still streaming
+REFLECT_REVISE_FORMAT = {
+    "type": "json_schema",
+    "json_schema": {
+        "name": "reflect_and_revise",
+        "strict": True,
+        "schema": {
+            "type": "object",
+            "properties": {
+                "reflection": {"type": "string"},
+                "revised_report": {"type": "string"}
+            },
+            "required": ["reflection", "revised_report"],
+            "additionalProperties": False
+        }
+    }
+}
+
 
 class ToolResearchWorkflow:
     """Tool-enhanced research workflow (Q3): Search -> Reflect -> Export"""
@@ -23,7 +54,7 @@ class ToolResearchWorkflow:
     ):
         self.model = model or settings.DEFAULT_RESEARCH_MODEL
         self.max_results = max_results
-        self.client = AsyncOpenAI()
+        self.client = AsyncOpenAI(max_retries=0)  # Retried by dependencies["openai"]
         
         # Map tool names to definitions for OpenAI API
         self.tool_def_mapping = {
@@ -53,26 +84,31 @@ class ToolResearchWorkflow:
         # Step 1: Research with tools
         research_agent = ResearchAgent(model=self.model)
         logger.info("Step 1: Conducting research with tools...")
-        research_report = await research_agent.execute(
-            topic, 
-            tools=self.tools, 
-            tool_func_mapping=self.tool_func_mapping
+        research_report = await run_stage(
+            self._research(
+                research_agent,
+                topic,
+                tools=self.tools,
+                tool_func_mapping=self.tool_func_mapping
+            ),
+            "research"
         )
         
-        # Step 2: Reflection and rewrite
-        logger.info("Step 2: Reflecting on research...")
-        reflection_result = await self._reflect_and_rewrite(research_report)
-        
-        # Step 3: Convert to desired format
-        logger.info(f"Step 3: Converting to {export_format}...")
-        if export_format == "html":
-            html_output = await self._convert_to_html(
-                reflection_result.get("revised_report", research_report)
-            )
-        else:
-            html_output = None
+        # A tool cut off by the deadline leaves the research incomplete
+        partial_stage = research_agent.timed_out_tools[0] if research_agent.timed_out_tools else None
         
-        logger.info("Tool research workflow completed")
+        # Step 2: Reflection and rewrite (out of time: return the research as a partial result)
+        logger.info("Step 2: Reflecting on research...")
+        reflection_result = cache_service.get_stage_result("reflection", research_report)
+        if not (reflection_result and reflection_result.get("reflection") and reflection_result.get("revised_report")):
+            try:
+                reflection_result = await run_stage(self._reflect_and_rewrite(research_report), "reflection")
+                if reflection_result.get("reflection"):
+                    cache_service.store_stage_result("reflection", research_report, reflection_result)
+            except DeadlineExceeded as e:
+                logger.warning(f"{e}; returning partial result")
+                partial_stage = e.stage
+                reflection_result = {"reflection": None, "revised_report": research_report}
         
         # Collect sources: primary from tool call results, regex fallback for in-text links
         sources = list(research_agent.collected_sources)  # From actual tool calls
@@ -84,49 +120,207 @@ class ToolResearchWorkflow:
                 seen_urls.add(url)
         sources = filter_relevant_sources(sources, final_output)
         
+        # Step 3: Convert to desired format
+        logger.info(f"Step 3: Converting to {export_format}...")
+        if export_format == "html":
+            report = reflection_result.get("revised_report", research_report)
+            try:
+                html_output = await run_stage(self._render_html(report, sources=sources[:10]), "formatting")
+            except DeadlineExceeded as e:
+                partial_stage = partial_stage or e.stage
+                html_output = self._fallback_html(report)
+        else:
+            html_output = None
+        
+        if partial_stage:
+            metrics_service.record_stage("deadline", workflow="tool_research", timed_out_stage=partial_stage)
+        logger.info("Tool research workflow completed")
+        
         return {
             "research_report": research_report,
             "reflection": reflection_result.get("reflection"),
             "revised_report": reflection_result.get("revised_report"),
             "html_output": html_output,
-            "sources": sources[:10]  # Limit to 10 sources cited in final output
+            "sources": sources[:10],  # Limit to 10 sources cited in final output
+            "status": "partial" if partial_stage else "completed"
         }
     
-    async def _reflect_and_rewrite(self, report: str) -> dict:
-        """Reflect on and rewrite the report"""
+    async def _research(self, research_agent, topic: str, tools: list, tool_func_mapping: dict) -> str:
+        """Run the research stage, reusing a cached report (and its sources) for a similar topic"""
         
-        user_prompt = f"""Analyze and improve the following research report.
-
-Report:
-{report}
-
-Provide your response as valid JSON with exactly two keys:
-1. "reflection": A structured analysis covering strengths, limitations, suggestions, and opportunities for improvement
-2. "revised_report": An improved version incorporating the reflection feedback, with enhanced clarity and academic tone
-
-Output ONLY valid JSON in this exact format with no additional text:
-{{"reflection": "your reflection here", "revised_report": "your revised report here"}}"""
+        # Only full-toolset runs share the stage cache; a restricted toolset yields different sources
+        shareable = len(tools) == len(self.tool_def_mapping)
+        
+        cached = cache_service.get_stage_result("research", topic) if shareable else None
+        if cached:
+            research_agent.collected_sources = list(cached.get("sources", []))
+            return cached["report"]
+        
+        report = await research_agent.execute(topic, tools=tools, tool_func_mapping=tool_func_mapping)
+        if shareable and report and not research_agent.timed_out_tools:
+            cache_service.store_stage_result("research", topic, {
+                "report": report,
+                "sources": research_agent.collected_sources
+            })
+        return report
+    
+    async def _render_html(self, report: str, sources: list = None) -> str:
+        """
+        HTML formatting stage.
+        
+        Renders locally (Markdown -> sanitized HTML -> Jinja2 template, sources as numbered
+        references) unless HTML_RENDER_MODE is "llm"; the LLM conversion is also the
+        fallback if local rendering fails. LLM output is cached on the exact report text.
+        """
+        
+        if settings.HTML_RENDER_MODE != "llm":
+            start = time.perf_counter()
+            try:
+                html_output = render_report_html(report, sources)
+                metrics_service.record_stage(
+                    "html_render",
+                    mode="local",
+                    duration_ms=round((time.perf_counter() - start) * 1000, 2),
+                    total_tokens=0
+                )
+                return html_output
+            except Exception as e:
+                logger.error(f"Local HTML rendering failed, falling back to LLM conversion: {e}")
+        
+        cached = cache_service.get_stage_result("html", report)
+        if cached:
+            return cached
+        
+        html_output = await self._convert_to_html(report)
+        if html_output and html_output != self._fallback_html(report):
+            cache_service.store_stage_result("html", report, html_output)
+        return html_output
+    
+    async def _render_section(self, section: str) -> str:
+        """Render one Markdown section to an HTML fragment (pipelined mode)"""
+        
+        if settings.HTML_RENDER_MODE != "llm":
+            return render_markdown_fragment(section)
         
         try:
-            response = await self.client.chat.completions.create(
+            response = await dependencies["openai"].call(
+                self.client.chat.completions.create,
                 model=self.model,
+                timeout=llm_timeout(),
                 messages=[
-                    {"role": "system", "content": "You are an academic reviewer and editor."},
-                    {"role": "user", "content": user_prompt}
+                    {"role": "system", "content": "You convert Markdown report sections into clean HTML fragments."},
+                    {"role": "user", "content": f"""Convert this report section into an HTML fragment.
+Return ONLY the fragment (no <html>, <head> or <body>, no code blocks), using <h1>-<h3>, <p>, lists and <a href> links.
+
+Section:
+{section}"""}
                 ],
                 temperature=0.3
             )
-            
+            fragment = response.choices[0].message.content.strip()
+            fragment = re.sub(r"^```(?:html)?\n?|\n?```$", "", fragment)
+            return fragment
+        except Exception as e:
+            logger.error(f"Section HTML conversion error: {e}")
+            return render_markdown_fragment(section)
+    
+    async def _reflect_and_rewrite(self, report: str) -> dict:
+        """Reflect on and rewrite the report in one structured-output call"""
+        
+        try:
+            start = time.perf_counter()
+            response = await dependencies["openai"].call(
+                self.client.chat.completions.create,
+                model=self.model,
+                timeout=llm_timeout(),
+                messages=self._reflect_and_rewrite_messages(report),
+                temperature=0.3,
+                response_format=REFLECT_REVISE_FORMAT
+            )
             llm_output = response.choices[0].message.content.strip()
-            data = json.loads(llm_output)
-            
-            return {
-                "reflection": str(data.get("reflection", "")).strip(),
-                "revised_report": str(data.get("revised_report", "")).strip()
-            }
+            self._record_reflect_revise(start, getattr(response, "usage", None), streamed=False)
         except Exception as e:
+            if deadline.expired():
+                raise DeadlineExceeded("reflection") from e
             logger.error(f"Reflection error: {e}")
             return {"reflection": None, "revised_report": report}
+        
+        try:
+            data = json.loads(llm_output)
+        except json.JSONDecodeError:
+            # Truncated output (e.g. max tokens): keep whatever fields closed
+            parser = IncrementalJSONObjectParser()
+            parser.feed(llm_output)
+            data = parser.fields
+            if "revised_report" not in data:
+                logger.warning("Reflection output was truncated before the revised report; keeping the original report")
+        
+        reflection = str(data.get("reflection") or "").strip() or None
+        revised = str(data.get("revised_report") or "").strip()
+        return {"reflection": reflection, "revised_report": revised or report}
+    
+    async def _reflect_and_rewrite_stream(self, report: str) -> AsyncGenerator[Tuple[str, str, Any], None]:
+        """
+        Streaming variant of _reflect_and_rewrite.
+        
+        Yields IncrementalJSONObjectParser events: ("complete", "reflection", text) as
+        soon as the reflection closes, then ("delta", "revised_report", text) pieces
+        and finally ("complete", "revised_report", text).
+        """
+        
+        start = time.perf_counter()
+        usage = None
+        parser = IncrementalJSONObjectParser()
+        response = await dependencies["openai"].call(
+            self.client.chat.completions.create,
+            model=self.model,
+            timeout=llm_timeout(),
+            messages=self._reflect_and_rewrite_messages(report),
+            temperature=0.3,
+            response_format=REFLECT_REVISE_FORMAT,
+            stream=True,
+            stream_options={"include_usage": True}
+        )
+        
+        async for chunk in response:
+            if getattr(chunk, "usage", None):
+                usage = chunk.usage
+            if chunk.choices and chunk.choices[0].delta.content:
+                for event in parser.feed(chunk.choices[0].delta.content):
+                    yield event
+        
+        self._record_reflect_revise(start, usage, streamed=True)
+    
+    def _reflect_and_rewrite_messages(self, report: str) -> list:
+        """Prompt shared by the blocking and streaming reflect+rewrite calls"""
+        
+        user_prompt = f"""Analyze and improve the following research report.
+
+Report:
+{report}
+
+Respond with two fields:
+1. "reflection": A structured analysis covering strengths, limitations, suggestions, and opportunities for improvement
+2. "revised_report": An improved version in Markdown incorporating the reflection feedback, with enhanced clarity and academic tone
+
+Write both in the SAME LANGUAGE as the report."""
+        
+        return [
+            {"role": "system", "content": "You are an academic reviewer and editor."},
+            {"role": "user", "content": user_prompt}
+        ]
+    
+    def _record_reflect_revise(self, start: float, usage, streamed: bool):
+        fields = {
+            "mode": "combined",
+            "streamed": streamed,
+            "duration_ms": round((time.perf_counter() - start) * 1000, 1)
+        }
+        for name in ("prompt_tokens", "completion_tokens"):
+            value = getattr(usage, name, None)
+            if isinstance(value, int):
+                fields[name] = value
+        metrics_service.record_stage("reflect_revise", **fields)
     
     async def _convert_to_html(self, report: str) -> str:
         """Convert report to HTML"""
@@ -149,8 +343,11 @@ Requirements:
 Output the complete HTML document starting with <!DOCTYPE html>."""
         
         try:
-            response = await self.client.chat.completions.create(
+            start = time.perf_counter()
+            response = await dependencies["openai"].call(
+                self.client.chat.completions.create,
                 model=self.model,
+                timeout=llm_timeout(),
                 messages=[
                     {"role": "system", "content": "You convert plaintext reports into full clean HTML documents."},
                     {"role": "user", "content": user_prompt}
@@ -158,7 +355,18 @@ Output the complete HTML document starting with <!DOCTYPE html>."""
                 temperature=0.5
             )
             
+            total_tokens = getattr(getattr(response, "usage", None), "total_tokens", None)
+            metrics_service.record_stage(
+                "html_render",
+                mode="llm",
+                duration_ms=round((time.perf_counter() - start) * 1000, 2),
+                total_tokens=total_tokens if isinstance(total_tokens, int) else None
+            )
             return response.choices[0].message.content.strip()
         except Exception as e:
             logger.error(f"HTML conversion error: {e}")
-            return f"<html><body><pre>{report}</pre></body></html>"
+            return self._fallback_html(report)
+    
+    def _fallback_html(self, report: str) -> str:
+        """Minimal HTML used when conversion fails (never cached)"""
+        return f"<html><body><pre>{report}</pre></body></html>"
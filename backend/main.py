@@ -1,16 +1,22 @@
-from fastapi import FastAPI, WebSocket, WebSocketDisconnect
+from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse
 from contextlib import asynccontextmanager
+import asyncio
 import sys
 from dotenv import load_dotenv
 
-from app.api.routes import workflows, health, cache, metrics
+from app.api.routes import workflows, health, cache, metrics, websocket
 from app.core.config import settings
 from app.core.startup_checks import check_requirements
 from app.core.logging_config import setup_json_logging, StructuredLogger
 from app.core.app_insights import setup_app_insights
 from app.middleware import RateLimiter, LoggingMiddleware
+from app.services.cache_service import cache_service
+from app.services.metrics_service import metrics_service
+from app.workflows.batch import batch_runs
+from app.workflows.cache_warmer import WarmupError, cache_warmer
+from app.workflows.revalidation import revalidator
 
 # Load environment variables
 load_dotenv()
@@ -35,7 +41,23 @@ if not check_requirements():
 async def lifespan(app: FastAPI):
     """Application lifespan handler"""
     logger.info(f"Starting {settings.APP_NAME} v{settings.APP_VERSION}")
+    # Stale cache hits (past CACHE_SOFT_TTL_SECONDS) are refreshed in the background
+    cache_service.revalidator = revalidator.schedule
+    tiering = asyncio.create_task(cache_service.run_tiering()) if cache_service.cold_store else None
+    cache_service.start_invalidation_listener()
+    if settings.CACHE_WARM_ON_STARTUP:
+        try:
+            cache_warmer.start()
+        except WarmupError as e:
+            logger.info(f"Startup cache warm-up skipped: {e}")
     yield
+    cache_warmer.cancel()
+    batch_runs.reset()  # Background batches would otherwise outlive the loop mid-run
+    revalidator.cancel_all()
+    if tiering is not None:
+        tiering.cancel()
+    cache_service.stop_invalidation_listener()
+    metrics_service.save_topic_counts()
     logger.info("Shutting down application")
 
 
@@ -71,6 +93,7 @@ app.include_router(health.router, prefix="/api/v1", tags=["health"])
 app.include_router(workflows.router, prefix="/api/v1/workflows", tags=["workflows"])
 app.include_router(cache.router, prefix="/api/v1/cache", tags=["cache"])
 app.include_router(metrics.router, prefix="/api/v1/metrics", tags=["metrics"])
+app.include_router(websocket.router, tags=["websocket"])
 
 
 @app.get("/")
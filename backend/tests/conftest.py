@@ -103,3 +103,22 @@ def mock_openai_client(request):
     # Stop all patches
     for p in patches:
         p.stop()
+
+
+@pytest.fixture
+def cache_service():
+    """CacheService backed by an in-memory fake Redis and a deterministic embedding"""
+    import hashlib
+    import numpy as np
+    fakeredis = pytest.importorskip("fakeredis")
+    from app.services.cache_service import CacheService
+    
+    def fake_embedding(text: str) -> np.ndarray:
+        seed = int(hashlib.sha256(text.lower().strip().encode()).hexdigest()[:8], 16)
+        return np.random.default_rng(seed).standard_normal(384).astype(np.float32)
+    
+    service = CacheService()
+    service.enabled = True
+    service.redis_client = fakeredis.FakeRedis()
+    service._generate_embedding = fake_embedding
+    return service
@@ -0,0 +1,92 @@
+import asyncio
+import pytest
+from app.services.admission import AdmissionController, AdmissionRejected
+
+
+class TestAdmissionController:
+    """Test suite for the workflow admission controller"""
+
+    @pytest.mark.asyncio
+    async def test_queue_full_rejects_with_retry_after(self):
+        """Runs beyond the limit wait; beyond the queue they are rejected immediately"""
+        controller = AdmissionController(max_concurrent=1, queue_size=1, queue_timeout=5)
+        first = await controller.acquire()
+        waiter = asyncio.create_task(controller.acquire())
+        await asyncio.sleep(0)
+        assert controller.waiting == 1
+
+        with pytest.raises(AdmissionRejected) as exc:
+            await controller.acquire()
+        assert exc.value.reason == "queue_full"
+        assert exc.value.retry_after >= 1
+
+        first.release()
+        second = await waiter
+        assert controller.active == 1 and controller.waiting == 0
+        second.release()
+        second.release()  # Idempotent
+        assert controller.active == 0
+
+    @pytest.mark.asyncio
+    async def test_queue_timeout(self):
+        """A queued run gives up after the queue timeout without leaking a slot"""
+        controller = AdmissionController(max_concurrent=1, queue_size=4, queue_timeout=0.05)
+        held = await controller.acquire()
+
+        with pytest.raises(AdmissionRejected) as exc:
+            await controller.acquire()
+        assert exc.value.reason == "queue_timeout"
+        assert controller.waiting == 0
+
+        held.release()
+        assert controller.active == 0
+        assert controller.snapshot()["rejections"] == {"queue_full": 0, "queue_timeout": 1}
+
+    @pytest.mark.asyncio
+    async def test_waiters_admitted_in_order(self):
+        """Freed slots go to waiters first-come first-served"""
+        controller = AdmissionController(max_concurrent=1, queue_size=4, queue_timeout=5)
+        held = await controller.acquire()
+        order = []
+
+        async def run(name):
+            ticket = await controller.acquire()
+            order.append(name)
+            ticket.release()
+
+        tasks = [asyncio.create_task(run(name)) for name in ("a", "b", "c")]
+        await asyncio.sleep(0)
+        held.release()
+        await asyncio.gather(*tasks)
+        assert order == ["a", "b", "c"]
+
+    def test_adaptive_limit_aimd(self):
+        """Fast runs grow the limit additively; a slow run cuts it multiplicatively"""
+        controller = AdmissionController(
+            max_concurrent=4, queue_size=4, queue_timeout=5,
+            adaptive=True, target_latency=10.0, min_limit=2, max_limit=8
+        )
+        for _ in range(8):
+            controller._observe(1.0)
+        assert controller.limit == 5
+
+        controller._observe(30.0)
+        assert controller.limit == 4
+        controller._observe(30.0)  # Within the same target interval: no second cut
+        assert controller.limit == 4
+
+    @pytest.mark.asyncio
+    async def test_idle_acquire_leaves_reserved_slots(self):
+        """Background work only takes a slot when `reserve` others stay free and nobody waits"""
+        controller = AdmissionController(max_concurrent=3, queue_size=4, queue_timeout=5)
+        held = await controller.acquire()
+        background = asyncio.create_task(controller.acquire_idle(reserve=2, poll=0.01))
+        await asyncio.sleep(0.05)
+        assert not background.done()
+
+        held.release()
+        ticket = await asyncio.wait_for(background, timeout=1)
+        assert controller.active == 1
+        ticket.release()
+        assert controller.active == 0
+
@@ -1,3 +1,5 @@
+import asyncio
+import json
 import pytest
 from unittest.mock import Mock, AsyncMock, patch
 from app.agents.draft_agent import DraftAgent
@@ -23,6 +25,8 @@ class TestDraftAgent:
         
         assert isinstance(result, str)
         assert len(result) > 0
+        # SDK retries are off: the OpenAI dependency guard retries through the rate governor
+        mock_openai_client.assert_called_once_with(max_retries=0)
     
     @pytest.mark.asyncio
     async def test_execute_with_empty_topic(self, mock_openai_client):
@@ -89,6 +93,50 @@ class TestResearchAgent:
         assert len(result) > 0
 
 
+    @pytest.mark.asyncio
+    async def test_prefetched_tool_results_serve_similar_calls(self, mock_openai_client):
+        """Prefetched searches should serve similar tool calls; dissimilar ones run normally"""
+        from app.services.metrics_service import metrics_service
+        
+        calls = []
+        
+        def search(query, max_results=5):
+            calls.append(query)
+            return [{"title": query, "url": f"https://example.org/{len(calls)}"}]
+        
+        def tool_call(name, query, call_id):
+            function = Mock(arguments=json.dumps({"query": query}))
+            function.name = name
+            return Mock(id=call_id, function=function)
+        
+        async def completions(**kwargs):
+            await asyncio.sleep(0.05)  # Prefetched searches run during the first round-trip
+            return responses.pop(0)
+        
+        tools = [{"type": "function", "function": {"name": n}} for n in ("arxiv_search_tool", "wikipedia_search_tool")]
+        first = Mock(choices=[Mock(message=Mock(content=None, tool_calls=[
+            tool_call("arxiv_search_tool", "quantum computing applications", "1"),
+            tool_call("wikipedia_search_tool", "history of cryptography", "2"),
+        ]))])
+        final = Mock(choices=[Mock(message=Mock(content="Findings", tool_calls=None))])
+        
+        agent = ResearchAgent(model="gpt-4o-mini")
+        responses = [first, final]
+        agent.client.chat.completions.create = completions
+        with patch('app.core.config.settings.TOOL_PREFETCH', True):
+            result = await agent.execute(
+                "Quantum computing applications",
+                tools=tools,
+                tool_func_mapping={"arxiv_search_tool": search, "wikipedia_search_tool": search}
+            )
+        
+        assert result == "Findings"
+        # Two prefetches plus one real call for the dissimilar wikipedia query
+        assert sorted(calls) == sorted(["Quantum computing applications"] * 2 + ["history of cryptography"])
+        metric = metrics_service.stage_metrics["tool_prefetch"][-1]
+        assert (metric["served"], metric["wasted"]) == (1, 1)
+
+
 class TestWriterAgent:
     """Test suite for WriterAgent"""
     
@@ -117,6 +165,56 @@ class TestEditorAgent:
         assert isinstance(result, str)
 
 
+class TestPatchRevision:
+    """Test suite for patch-based revision (targeted edits with full-rewrite fallback)"""
+    
+    DRAFT = "# Title\n\nIntro.\n\n## Methods\n\nOld methods.\n\n## Results\n\nResults text.\n"
+    
+    def test_apply_edits_replaces_section_and_passage(self):
+        """Section edits should replace up to the next same-level heading; passages must be unique"""
+        from app.utils import apply_edits, PatchError
+        
+        edits = [
+            {"kind": "section", "anchor": "## Methods", "replacement": "## Methods\n\nNew methods.\n\n"},
+            {"kind": "replace", "anchor": "Results text.", "replacement": "Better results."}
+        ]
+        assert apply_edits(self.DRAFT, edits) == (
+            "# Title\n\nIntro.\n\n## Methods\n\nNew methods.\n\n## Results\n\nBetter results.\n"
+        )
+        with pytest.raises(PatchError):
+            apply_edits(self.DRAFT, [{"kind": "replace", "anchor": "##", "replacement": "x"}])
+    
+    @pytest.mark.asyncio
+    async def test_patch_mode_applies_edits_locally(self, mock_openai_client):
+        """Patch mode should request edits with a JSON schema and apply them to the draft"""
+        from app.services.metrics_service import metrics_service
+        
+        mock_openai_client._test_response.choices[0].message.content = (
+            '{"edits": [{"kind": "replace", "anchor": "Old methods.", "replacement": "New methods."}]}'
+        )
+        agent = RevisionAgent(model="gpt-4o-mini", revision_mode="patch")
+        result = await agent.execute(self.DRAFT, "Improve methods")
+        
+        assert result == self.DRAFT.replace("Old methods.", "New methods.")
+        kwargs = agent.client.chat.completions.create.call_args.kwargs
+        assert kwargs["response_format"]["json_schema"]["name"] == "document_edits"
+        assert metrics_service.stage_metrics["revision_patch"][-1]["edits"] == 1
+    
+    @pytest.mark.asyncio
+    async def test_patch_mode_falls_back_to_full_rewrite(self, mock_openai_client):
+        """Edits that do not apply should trigger a full rewrite"""
+        mock_openai_client._test_response.choices[0].message.content = (
+            '{"edits": [{"kind": "section", "anchor": "Missing", "replacement": "x"}]}'
+        )
+        agent = EditorAgent(model="gpt-4o-mini", revision_mode="patch")
+        result = await agent.revise(self.DRAFT, "Tighten the prose")
+        
+        # Fallback returns the (mocked) full rewrite, made with a second, unconstrained call
+        assert agent.client.chat.completions.create.call_count == 2
+        assert "response_format" not in agent.client.chat.completions.create.call_args.kwargs
+        assert result == mock_openai_client._test_response.choices[0].message.content
+
+
 class TestPlannerAgent:
     """Test suite for PlannerAgent"""
     
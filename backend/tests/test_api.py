@@ -35,6 +35,18 @@ class TestHealthEndpoint:
         
         assert "status" in data
         assert data["status"] == "healthy"
+    
+    @pytest.mark.asyncio
+    async def test_dependency_health_lists_breaker_state(self, client):
+        """Dependency health should expose breaker state and rejection counts"""
+        from app.services.resilience import dependencies
+        dependencies["arxiv"]
+        
+        response = await client.get("/api/v1/health/dependencies")
+        arxiv = response.json()["dependencies"]["arxiv"]
+        
+        assert arxiv["state"] == "closed"
+        assert arxiv["rejections"] == {"circuit_open": 0, "bulkhead_full": 0}
 
 
 class TestRateLimiting:
@@ -81,6 +93,17 @@ class TestCacheEndpoints:
         # Stats should be a dict (may be empty if no cache)
         assert isinstance(data, dict)
 
+    @pytest.mark.asyncio
+    async def test_cache_warm_status_and_conflict(self, client):
+        """Warm-up status is readable; a warm-up that cannot start answers 409"""
+        response = await client.get("/api/v1/cache/warm")
+        assert response.status_code == 200
+        assert "status" in response.json()
+
+        with patch('app.workflows.cache_warmer.cache_service.enabled', False):
+            response = await client.post("/api/v1/cache/warm", json={"topics": ["Fusion"]})
+        assert response.status_code == 409
+
 
 class TestMetricsEndpoints:
     """Test suite for metrics endpoints"""
@@ -122,3 +145,123 @@ class TestErrorHandling:
         assert response.status_code == 404
     
 
+
+
+class TestWebSocketEndpoint:
+    """Test suite for the multiplexed WebSocket transport"""
+    
+    @staticmethod
+    def _fake_stream(workflow_type, topic, params):
+        async def stream():
+            yield 'data: {"type": "start", "workflow_type": "%s", "topic": "%s"}\n\n' % (workflow_type, topic)
+            yield 'data: {"type": "complete"}\n\n'
+        return stream()
+    
+    def test_runs_are_tagged_with_run_id(self):
+        """Events from concurrent runs should carry their run_id"""
+        from starlette.testclient import TestClient
+        
+        with patch('app.api.routes.websocket.create_workflow_stream', side_effect=self._fake_stream):
+            with TestClient(app).websocket_connect("/ws") as ws:
+                ws.send_json({"action": "subscribe", "run_id": "a", "workflow_type": "tool_research", "topic": "Topic A"})
+                ws.send_json({"action": "subscribe", "run_id": "b", "workflow_type": "multi_agent", "topic": "Topic B"})
+                
+                completed = set()
+                while completed != {"a", "b"}:
+                    message = ws.receive_json()
+                    assert message["run_id"] in ("a", "b")
+                    if message["type"] == "complete":
+                        completed.add(message["run_id"])
+    
+    def test_invalid_subscribe_returns_error(self):
+        """Empty topics and unknown workflows should be rejected per run"""
+        from starlette.testclient import TestClient
+        
+        with TestClient(app).websocket_connect("/ws") as ws:
+            ws.send_json({"action": "subscribe", "run_id": "x", "workflow_type": "tool_research", "topic": "  "})
+            message = ws.receive_json()
+            assert message == {"type": "error", "run_id": "x", "message": "Topic cannot be empty"}
+            
+            ws.send_json({"action": "cancel", "run_id": "missing"})
+            assert ws.receive_json()["type"] == "error"
+
+
+class TestAdmissionControl:
+    """Test suite for admission control on the workflow routes"""
+    
+    @pytest.fixture(autouse=True)
+    def saturated(self):
+        """Admission controller with every slot taken and no queue"""
+        from app.services.admission import AdmissionController
+        controller = AdmissionController(max_concurrent=1, queue_size=0, queue_timeout=1)
+        controller.active = 1
+        with patch('app.api.routes.workflows.admission_controller', controller), \
+             patch('app.api.routes.streaming.admission_controller', controller):
+            yield controller
+    
+    @pytest.mark.asyncio
+    async def test_post_returns_503_when_full(self, client):
+        """A run that cannot be admitted should get 503 with Retry-After"""
+        response = await client.post("/api/v1/workflows/multi-agent", json={"topic": "Quantum computing"})
+        
+        assert response.status_code == 503
+        assert int(response.headers["Retry-After"]) >= 1
+        assert response.json()["reason"] == "queue_full"
+    
+    @pytest.mark.asyncio
+    async def test_stream_returns_503_when_full(self, client):
+        """Streaming routes admit before the response starts, so they can still answer 503"""
+        response = await client.get("/api/v1/workflows/tool-research/stream", params={"topic": "Quantum computing"})
+        
+        assert response.status_code == 503
+        assert "Retry-After" in response.headers
+    
+    @pytest.mark.asyncio
+    async def test_cache_hit_bypasses_admission(self, client, saturated):
+        """Cached results are served even when no run slot is free"""
+        cached = {"plan": ["step"], "history": [], "final_report": "Cached report"}
+        with patch('app.api.routes.workflows.cache_service.get_cached_result_async', new_callable=AsyncMock, return_value=cached):
+            response = await client.post("/api/v1/workflows/multi-agent", json={"topic": "Quantum computing"})
+        
+        assert response.status_code == 200
+        assert response.json()["final_report"] == "Cached report"
+        assert saturated.rejections["queue_full"] == 0
+
+
+class TestBatchEndpoint:
+    """Test suite for the batch workflow routes"""
+    
+    @pytest.mark.asyncio
+    async def test_start_and_stream(self, client):
+        """POST /batch returns 202 with an id; its stream replays progress up to completion"""
+        import json
+        
+        async def execute(self, topic, export_format="html"):
+            return {"research_report": f"Report on {topic}", "sources": [], "status": "completed"}
+        
+        with patch('app.workflows.batch.ToolResearchWorkflow.execute', execute):
+            response = await client.post("/api/v1/workflows/batch", json={"topics": ["Fusion", "fusion", "Qubits"]})
+            assert response.status_code == 202
+            assert response.json()["total"] == 3
+            batch_id = response.json()["batch_id"]
+            
+            async with client.stream("GET", f"/api/v1/workflows/batch/{batch_id}/stream") as stream:
+                events = [json.loads(line[6:]) async for line in stream.aiter_lines() if line.startswith("data: ")]
+            status = (await client.get(f"/api/v1/workflows/batch/{batch_id}")).json()
+        
+        assert events[0]["type"] == "start"
+        assert events[-1]["type"] == "complete"
+        assert status["status"] == "completed"
+        assert status["counts"] == {"completed": 2, "duplicate": 1}
+    
+    @pytest.mark.asyncio
+    async def test_unknown_batch_returns_404(self, client):
+        """Unknown batch ids should return 404"""
+        response = await client.get("/api/v1/workflows/batch/missing")
+        assert response.status_code == 404
+    
+    @pytest.mark.asyncio
+    async def test_blank_topic_is_rejected(self, client):
+        """Every topic is validated like a single-topic request"""
+        response = await client.post("/api/v1/workflows/batch", json={"topics": ["Fusion", "   "]})
+        assert response.status_code == 422
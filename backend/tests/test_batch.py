@@ -0,0 +1,177 @@
+import asyncio
+import pytest
+from unittest.mock import patch
+from app.services.admission import AdmissionController
+from app.services.resilience import call_tool, dependencies, shared_tool_results
+from app.workflows.batch import BatchRegistry, BatchRun
+
+
+@pytest.fixture(autouse=True)
+def roomy_admission():
+    """A fresh admission controller so batch runs never wait on other tests' slots"""
+    controller = AdmissionController(max_concurrent=8, queue_size=8, queue_timeout=1)
+    with patch('app.workflows.batch.admission_controller', controller):
+        yield controller
+
+
+def fake_execute(calls, in_flight, delay=0.01):
+    """ToolResearchWorkflow.execute stand-in that records topics and peak concurrency"""
+    async def execute(self, topic, export_format="html"):
+        calls.append(topic)
+        in_flight["now"] += 1
+        in_flight["peak"] = max(in_flight["peak"], in_flight["now"])
+        await asyncio.sleep(delay)
+        in_flight["now"] -= 1
+        if topic == "broken":
+            raise RuntimeError("tool exploded")
+        return {"research_report": f"Report on {topic}", "sources": [], "status": "completed"}
+    return execute
+
+
+async def run_batch(topics, concurrency=2, **params):
+    batch = BatchRun(topics, "tool_research", params, concurrency)
+    await batch.run()
+    return batch
+
+
+class TestBatchRun:
+    """Test suite for batch workflow runs"""
+
+    @pytest.mark.asyncio
+    async def test_exact_duplicates_run_once(self):
+        """Case/whitespace variants of a topic share one run and its result"""
+        calls, in_flight = [], {"now": 0, "peak": 0}
+        with patch('app.workflows.batch.ToolResearchWorkflow.execute', fake_execute(calls, in_flight)):
+            batch = await run_batch(["Quantum computing", "  quantum   COMPUTING ", "Fusion energy"])
+
+        assert sorted(calls) == ["Fusion energy", "Quantum computing"]
+        duplicate = batch.items[1]
+        assert duplicate["status"] == "duplicate" and duplicate["duplicate_of"] == 0
+        assert duplicate["result"]["research_report"] == "Report on Quantum computing"
+        assert batch.counts() == {"completed": 2, "duplicate": 1}
+
+    @pytest.mark.asyncio
+    async def test_concurrency_is_bounded(self):
+        """No more than `concurrency` topics run at once"""
+        calls, in_flight = [], {"now": 0, "peak": 0}
+        with patch('app.workflows.batch.ToolResearchWorkflow.execute', fake_execute(calls, in_flight)):
+            await run_batch([f"Topic {i}" for i in range(8)], concurrency=2)
+
+        assert len(calls) == 8
+        assert in_flight["peak"] == 2
+
+    @pytest.mark.asyncio
+    async def test_failure_is_isolated(self):
+        """One failing topic is reported without stopping the others"""
+        calls, in_flight = [], {"now": 0, "peak": 0}
+        with patch('app.workflows.batch.ToolResearchWorkflow.execute', fake_execute(calls, in_flight)):
+            batch = await run_batch(["broken", "Fusion energy"])
+
+        assert batch.items[0]["status"] == "failed"
+        assert "tool exploded" in batch.items[0]["error"]
+        assert batch.items[1]["status"] == "completed"
+
+    @pytest.mark.asyncio
+    async def test_cached_topics_are_not_run(self, cache_service):
+        """Topics the semantic cache answers are served from it"""
+        cache_service.store_result("Quantum computing", "tool_research", {"research_report": "Cached"})
+        calls, in_flight = [], {"now": 0, "peak": 0}
+        with patch('app.workflows.batch.cache_service', cache_service), \
+             patch('app.workflows.batch.ToolResearchWorkflow.execute', fake_execute(calls, in_flight)):
+            batch = await run_batch(["Quantum computing", "Fusion energy"])
+
+        assert calls == ["Fusion energy"]
+        assert batch.items[0]["status"] == "cached"
+        assert batch.items[0]["result"]["research_report"] == "Cached"
+
+    @pytest.mark.asyncio
+    async def test_followers_replay_and_follow_live(self):
+        """A reader joining late gets every event from the start, ending with completion"""
+        calls, in_flight = [], {"now": 0, "peak": 0}
+        with patch('app.workflows.batch.ToolResearchWorkflow.execute', fake_execute(calls, in_flight, delay=0.05)):
+            batch = BatchRun(["A", "B"], "tool_research", {}, 1)
+            batch.start()
+            await asyncio.sleep(0.02)
+            events = [event async for event in batch.follow()]
+
+        assert events[0]["type"] == "start"
+        assert events[-1] == {"type": "complete", "counts": {"completed": 2}}
+        assert {e["topic"] for e in events if e["type"] == "result"} == {"A", "B"}
+
+
+    @pytest.mark.asyncio
+    async def test_reset_cancels_running_batches(self):
+        """Shutdown (registry reset) cancels batches still running instead of leaving them on the loop"""
+        calls, in_flight = [], {"now": 0, "peak": 0}
+        registry = BatchRegistry()
+        with patch('app.workflows.batch.ToolResearchWorkflow.execute', fake_execute(calls, in_flight, delay=10)):
+            batch = registry.start(["Quantum computing", "Fusion energy"], "tool_research", {})
+            while in_flight["now"] < 2:
+                await asyncio.sleep(0.01)
+            registry.reset()
+            with pytest.raises(asyncio.CancelledError):
+                await asyncio.wait_for(batch._task, 1)
+
+        assert batch.counts() == {"cancelled": 2}
+        assert registry.get(batch.batch_id) is None
+
+
+class TestSharedToolResults:
+    """Test suite for tool results shared across a batch"""
+
+    @pytest.fixture(autouse=True)
+    def fresh_dependencies(self):
+        dependencies.reset()
+        yield
+        dependencies.reset()
+
+    @pytest.mark.asyncio
+    async def test_concurrent_identical_calls_run_once(self):
+        """Inside shared_tool_results() the same search is executed once"""
+        calls = []
+
+        def arxiv_search_tool(query, max_results=5):
+            calls.append(query)
+            return [{"title": query}]
+
+        with shared_tool_results():
+            first, second = await asyncio.gather(
+                call_tool(arxiv_search_tool, query="Qubits", max_results=3),
+                call_tool(arxiv_search_tool, query="qubits", max_results=3)
+            )
+
+        assert calls == ["Qubits"]
+        assert first == second == [{"title": "Qubits"}]
+        first[0]["title"] = "changed"
+        assert second[0]["title"] == "Qubits"
+
+    @pytest.mark.asyncio
+    async def test_errors_are_not_shared(self):
+        """An error result is retried by the next caller"""
+        calls = []
+
+        def wikipedia_search_tool(query):
+            calls.append(query)
+            return [{"error": "down"}] if len(calls) == 1 else [{"title": query}]
+
+        with shared_tool_results():
+            await call_tool(wikipedia_search_tool, query="Fusion")
+            result = await call_tool(wikipedia_search_tool, query="Fusion")
+
+        assert len(calls) == 2
+        assert result == [{"title": "Fusion"}]
+
+    @pytest.mark.asyncio
+    async def test_no_sharing_outside_a_batch(self):
+        """Regular requests keep calling the tool every time"""
+        calls = []
+
+        def tavily_search_tool(query):
+            calls.append(query)
+            return [{"title": query}]
+
+        await call_tool(tavily_search_tool, query="Fusion")
+        await call_tool(tavily_search_tool, query="Fusion")
+
+        assert len(calls) == 2
+
@@ -0,0 +1,533 @@
+import asyncio
+import json
+import time
+import numpy as np
+import pytest
+from unittest.mock import patch
+from app.core.config import settings
+from app.services.admission import AdmissionController
+from app.services.cache_service import META_ACCESSED, META_STORED_AT
+from app.services.cold_store import ColdStore
+from app.services.local_cache import LocalCache
+from app.workflows.revalidation import Revalidator
+
+
+class TestCacheService:
+    """Test suite for semantic cache storage"""
+    
+    def test_store_and_get_roundtrip(self, cache_service):
+        """Stored results should come back whole for the same topic"""
+        result = {"plan": ["Step 1"], "final_report": "Report", "sources": []}
+        assert cache_service.store_result("Quantum computing", "multi_agent", result)
+        
+        assert cache_service.get_cached_result("Quantum computing", "multi_agent") == result
+        assert cache_service.get_cached_result("Quantum computing", "tool_research") is None
+        assert cache_service.get_cached_result("Unrelated topic", "multi_agent") is None
+    
+    def test_fields_read_lazily(self, cache_service):
+        """Individual fields should be readable without loading the whole entry"""
+        cache_service.store_result("Topic", "tool_research", {"revised_report": "R", "html_output": "<p>R</p>"})
+        cache_key = cache_service.find_cached_entry("Topic", "tool_research")
+        
+        assert sorted(cache_service.list_cached_fields(cache_key)) == ["html_output", "revised_report"]
+        assert cache_service.read_cached_fields(cache_key, ["revised_report", "missing"]) == {"revised_report": "R"}
+    
+    def test_legacy_string_entries_still_readable(self, cache_service):
+        """Entries stored as a single JSON string should still be served"""
+        cache_service.store_result("Topic", "tool_research", {"revised_report": "new"})
+        cache_key = cache_service.find_cached_entry("Topic", "tool_research")
+        cache_service.redis_client.delete(cache_key)
+        cache_service.redis_client.set(cache_key, json.dumps({"revised_report": "old", "sources": []}))
+        
+        assert cache_service.get_cached_result("Topic", "tool_research") == {"revised_report": "old", "sources": []}
+        assert cache_service.read_cached_fields(cache_key, ["sources"]) == {"sources": []}
+        assert sorted(cache_service.list_cached_fields(cache_key)) == ["revised_report", "sources"]
+
+
+class TestStaleWhileRevalidate:
+    """Test suite for soft-TTL revalidation of cached results"""
+    
+    def age_entry(self, cache_service, topic, workflow_type, seconds):
+        cache_key = cache_service.find_cached_entry(topic, workflow_type)
+        cache_service.redis_client.hset(cache_key, META_STORED_AT, json.dumps(time.time() - seconds))
+        return cache_key
+    
+    def test_bookkeeping_fields_are_hidden(self, cache_service):
+        """Topic and timestamp stored with a result never show up in it"""
+        cache_service.store_result("Topic", "tool_research", {"revised_report": "R"})
+        cache_key = cache_service.find_cached_entry("Topic", "tool_research")
+        
+        assert cache_service.read_cached_fields(cache_key) == {"revised_report": "R"}
+        assert cache_service.list_cached_fields(cache_key) == ["revised_report"]
+        assert cache_service.check_freshness(cache_key)["stale"] is False
+    
+    def test_stale_hit_is_served_and_revalidated(self, cache_service):
+        """Past the soft TTL the entry is still returned and a refresh of its topic is requested"""
+        requested = []
+        cache_service.revalidator = lambda key, topic, workflow_type: requested.append((topic, workflow_type)) or True
+        cache_service.store_result("Quantum computing", "multi_agent", {"final_report": "Old"})
+        self.age_entry(cache_service, "Quantum computing", "multi_agent", 8 * 86400)
+        
+        assert cache_service.get_cached_result("quantum computing", "multi_agent") == {"final_report": "Old"}
+        assert requested == [("Quantum computing", "multi_agent")]
+    
+    @pytest.mark.asyncio
+    async def test_refresh_runs_once_and_replaces_entry(self, cache_service):
+        """Concurrent stale hits start one background run, whose result replaces the entry"""
+        runs = []
+        
+        async def execute(self, topic, export_format="html"):
+            runs.append(topic)
+            await asyncio.sleep(0.01)
+            return {"research_report": "New", "sources": [], "status": "completed"}
+        
+        revalidator = Revalidator()
+        cache_service.revalidator = revalidator.schedule
+        cache_service.store_result("Fusion", "tool_research", {"research_report": "Old"})
+        cache_key = self.age_entry(cache_service, "Fusion", "tool_research", 8 * 86400)
+        
+        with patch('app.workflows.revalidation.cache_service', cache_service), \
+             patch('app.workflows.batch.cache_service', cache_service), \
+             patch('app.workflows.batch.admission_controller', AdmissionController(4, 4, 1)), \
+             patch('app.workflows.batch.ToolResearchWorkflow.execute', execute):
+            first = cache_service.check_freshness(cache_key)
+            second = cache_service.check_freshness(cache_key)
+            await asyncio.gather(*revalidator._inflight.values())
+        
+        assert first["stale"] and first["revalidating"] and second["revalidating"]
+        assert runs == ["Fusion"]
+        assert revalidator.snapshot() == {"in_flight": 0, "started": 1, "deduplicated": 1}
+        assert cache_service.read_cached_fields(cache_key) == {"research_report": "New", "sources": []}
+        assert cache_service.check_freshness(cache_key)["stale"] is False
+    
+    @pytest.mark.asyncio
+    async def test_refresh_does_not_inherit_the_request_deadline(self, cache_service):
+        """A refresh scheduled by a hit inside a request gets a full run budget, not the request's remainder"""
+        from app.core.deadline import deadline_scope, remaining
+        seen = []
+        
+        async def execute(self, topic, export_format="html"):
+            seen.append(remaining())
+            return {"research_report": "New", "sources": [], "status": "completed"}
+        
+        revalidator = Revalidator()
+        cache_service.revalidator = revalidator.schedule
+        cache_service.store_result("Fusion", "tool_research", {"research_report": "Old"})
+        cache_key = self.age_entry(cache_service, "Fusion", "tool_research", 8 * 86400)
+        
+        with patch('app.workflows.revalidation.cache_service', cache_service), \
+             patch('app.workflows.batch.cache_service', cache_service), \
+             patch('app.workflows.batch.admission_controller', AdmissionController(4, 4, 1)), \
+             patch('app.workflows.batch.ToolResearchWorkflow.execute', execute), \
+             patch('app.core.config.settings.REQUEST_TIMEOUT', 300):
+            with deadline_scope(2):
+                assert cache_service.check_freshness(cache_key)["revalidating"]
+            await asyncio.gather(*revalidator._inflight.values())
+        
+        assert seen and seen[0] > 250
+
+
+class TestMemoryBudget:
+    """Test suite for budgeted, frequency-aware eviction"""
+    
+    def test_hits_and_bytes_are_tracked(self, cache_service):
+        """Hits, sizes and their distribution are reported by workflow"""
+        cache_service.store_result("Fusion", "tool_research", {"research_report": "x" * 1000})
+        cache_service.store_result("Qubits", "multi_agent", {"final_report": "y"})
+        cache_service.get_cached_result("Fusion", "tool_research")
+        cache_service.get_cached_result("Fusion", "tool_research")
+        
+        memory = cache_service.get_memory_stats()
+        
+        assert memory["hit_distribution"]["2-4"] == 1 and memory["hit_distribution"]["0"] == 1
+        assert memory["bytes_by_workflow"]["tool_research"] > 1000 + 388  # Result + int8 embedding
+        assert memory["bytes_by_workflow"]["tool_research"] > memory["bytes_by_workflow"]["multi_agent"]
+        assert cache_service.get_cached_result("Fusion", "tool_research") == {"research_report": "x" * 1000}
+    
+    def test_refresh_keeps_hit_count(self, cache_service):
+        """Replacing an entry keeps its popularity"""
+        cache_service.store_result("Fusion", "tool_research", {"research_report": "old"})
+        cache_service.get_cached_result("Fusion", "tool_research")
+        cache_service.store_result("Fusion", "tool_research", {"research_report": "new"})
+        
+        assert cache_service.get_memory_stats()["hit_distribution"]["1"] == 1
+    
+    def test_over_budget_evicts_cold_large_entries_with_their_embedding(self, cache_service):
+        """Past the budget, unused large entries go first; popular ones and the new write stay"""
+        with patch('app.core.config.settings.CACHE_MEMORY_BUDGET_MB', 0.01):  # ~10 KB
+            cache_service.store_result("Popular", "tool_research", {"research_report": "p" * 3000})
+            for _ in range(5):
+                cache_service.get_cached_result("Popular", "tool_research")
+            cache_service.store_result("Cold", "tool_research", {"research_report": "c" * 3000})
+            cold_key = cache_service.find_cached_entry("Cold", "tool_research")
+            cache_service.store_result("Newest", "tool_research", {"research_report": "n" * 4000})
+        
+        assert cache_service.redis_client.exists(cold_key, cold_key + ":embedding") == 0
+        assert cache_service.get_cached_result("Popular", "tool_research") is not None
+        assert cache_service.get_cached_result("Newest", "tool_research") is not None
+        assert cache_service.evictions == 1
+    
+    def test_orphaned_halves_are_cleaned_up(self, cache_service):
+        """An embedding without its result (or the reverse) is deleted by the budget pass"""
+        cache_service.store_result("Fusion", "tool_research", {"research_report": "r"})
+        cache_service.store_result("Qubits", "tool_research", {"research_report": "r"})
+        fusion = cache_service.find_cached_entry("Fusion", "tool_research")
+        qubits = cache_service.find_cached_entry("Qubits", "tool_research")
+        cache_service.redis_client.delete(fusion)
+        cache_service.redis_client.delete(qubits + ":embedding")
+        
+        with patch('app.core.config.settings.CACHE_MEMORY_BUDGET_MB', 100):
+            assert cache_service.enforce_budget() == 0
+        
+        assert cache_service.redis_client.keys("cache:*") == []
+
+
+class TestColdTier:
+    """Test suite for demoting idle entries to the on-disk cold tier"""
+    
+    @pytest.fixture
+    def cold(self, cache_service, tmp_path):
+        cache_service.cold_store = ColdStore(str(tmp_path / "cold.sqlite3"))
+        yield cache_service.cold_store
+        cache_service.cold_store.close()
+    
+    def test_demoted_entry_reads_transparently_and_promotes_on_hit(self, cache_service, cold):
+        """Large fields move to disk; reads merge them back and a hit restores them to Redis"""
+        result = {"research_report": "r" * 5000, "sources": [{"title": "A"}]}
+        cache_service.store_result("Fusion", "tool_research", result)
+        key = cache_service.find_cached_entry("Fusion", "tool_research")
+        
+        assert cache_service.demote_entry(key) > 5000
+        assert cache_service.redis_client.hexists(key, "research_report") == 0
+        assert cache_service.read_cached_fields(key) == result
+        assert cache_service.read_cached_fields(key, ["research_report"]) == {"research_report": "r" * 5000}
+        assert sorted(cache_service.list_cached_fields(key)) == ["research_report", "sources"]
+        assert cold.stats()["entries"] == 1 and cold.stats()["compression_ratio"] > 10
+        
+        assert cache_service.get_cached_result("Fusion", "tool_research") == result
+        assert cache_service.redis_client.hexists(key, "research_report") == 1
+        assert cold.keys() == [] and cache_service.promotions == 1
+    
+    def test_other_replicas_get_demoted_entries_promoted(self, cache_service, tmp_path):
+        """A replica without the payload on its disk asks the holder to promote it and serves a full hit"""
+        import fakeredis
+        from app.services.cache_service import CacheService
+        
+        server = fakeredis.FakeServer()
+        replicas = []
+        for name in ("holder", "reader"):
+            replica = CacheService()
+            replica.enabled = True
+            replica.redis_client = fakeredis.FakeRedis(server=server)
+            replica._generate_embedding = cache_service._generate_embedding
+            replica.cold_store = ColdStore(str(tmp_path / f"{name}.sqlite3"))
+            replica.start_invalidation_listener()
+            replicas.append(replica)
+        holder, reader = replicas
+        result = {"research_report": "r" * 5000, "sources": []}
+        try:
+            holder.store_result("Fusion", "tool_research", result)
+            key = holder.find_cached_entry("Fusion", "tool_research")
+            assert holder.demote_entry(key) > 5000
+            
+            assert reader.get_cached_result("Fusion", "tool_research") == result
+            assert holder.promotions == 1 and holder.cold_store.keys() == []
+            assert reader.redis_client.hexists(key, "research_report") == 1
+        finally:
+            for replica in replicas:
+                replica.stop_invalidation_listener()
+                replica.cold_store.close()
+    
+    def test_lost_cold_payload_is_a_miss(self, cache_service, cold):
+        """Field reads, like full reads, are no hit when a demoted field is on no replica's disk"""
+        cache_service.local_cache = None
+        cache_service.store_result("Fusion", "tool_research", {"research_report": "r" * 5000, "sources": []})
+        key = cache_service.find_cached_entry("Fusion", "tool_research")
+        assert cache_service.demote_entry(key) > 5000
+        cold.delete(key)
+        
+        assert cache_service.read_cached_fields(key) is None
+        assert cache_service.read_cached_fields(key, ["research_report"]) is None
+        assert cache_service.read_cached_fields(key, ["sources"]) == {"sources": []}
+        assert cache_service.ensure_hot(key) is None
+    
+    def test_lone_replica_does_not_wait_for_promotion(self, cache_service, cold):
+        """With no other replica listening, a lost payload is a miss at once instead of after the remote wait"""
+        cache_service.store_result("Fusion", "tool_research", {"research_report": "r" * 5000})
+        key = cache_service.find_cached_entry("Fusion", "tool_research")
+        assert cache_service.demote_entry(key) > 5000
+        cold.delete(key)
+        cache_service.start_invalidation_listener()
+        try:
+            start = time.monotonic()
+            with patch('app.core.config.settings.CACHE_COLD_REMOTE_WAIT_SECONDS', 2.0):
+                assert cache_service.get_cached_result("Fusion", "tool_research") is None
+            assert time.monotonic() - start < 1.0
+        finally:
+            cache_service.stop_invalidation_listener()
+    
+    @pytest.mark.asyncio
+    async def test_async_hit_reads_cold_tier_off_the_loop(self, cache_service, cold):
+        """Route-side lookups promote and read demoted entries in a worker thread"""
+        import threading
+        cache_service.store_result("Fusion", "tool_research", {"research_report": "r" * 5000})
+        key = cache_service.find_cached_entry("Fusion", "tool_research")
+        assert cache_service.demote_entry(key) > 5000
+        threads = []
+        read_cold = cold.get
+        
+        def get(*args, **kwargs):
+            threads.append(threading.current_thread())
+            return read_cold(*args, **kwargs)
+        
+        with patch.object(cold, 'get', side_effect=get):
+            result = await cache_service.get_cached_result_async("Fusion", "tool_research")
+        
+        assert result == {"research_report": "r" * 5000}
+        assert threads and threading.main_thread() not in threads
+        assert cache_service.promotions == 1 and cache_service.tier_hits["cold"] == 1
+    
+    def test_idle_pass_demotes_only_idle_entries(self, cache_service, cold):
+        """The background pass demotes entries without recent hits and drops orphaned payloads"""
+        cache_service.store_result("Idle", "tool_research", {"research_report": "i" * 5000})
+        cache_service.store_result("Busy", "tool_research", {"research_report": "b" * 5000})
+        idle = cache_service.find_cached_entry("Idle", "tool_research")
+        cache_service.redis_client.hset(idle, META_ACCESSED, json.dumps(time.time() - 2 * 86400))
+        cold.put("cache:tool_research:gone", {"research_report": '"x"'}, ttl=3600)
+        
+        assert cache_service.demote_idle_entries() == {"demoted": 1, "purged": 1}
+        assert cold.keys() == [idle]
+    
+    def test_invalidation_and_rewrite_remove_cold_payloads(self, cache_service, cold):
+        """Deleting or replacing an entry drops its cold payload too"""
+        cache_service.store_result("Fusion", "tool_research", {"research_report": "r" * 5000})
+        cache_service.store_result("Qubits", "tool_research", {"research_report": "q" * 5000})
+        fusion = cache_service.find_cached_entry("Fusion", "tool_research")
+        qubits = cache_service.find_cached_entry("Qubits", "tool_research")
+        cache_service.demote_entry(fusion)
+        cache_service.demote_entry(qubits)
+        
+        cache_service.store_result("Fusion", "tool_research", {"research_report": "new"})
+        assert cold.keys() == [qubits]
+        
+        cache_service.invalidate_cache()
+        assert cold.keys() == []
+    
+    def test_over_budget_demotes_before_evicting(self, cache_service, cold):
+        """With the cold tier, budget pressure moves payloads to disk instead of dropping entries"""
+        with patch('app.core.config.settings.CACHE_MEMORY_BUDGET_MB', 0.012):
+            cache_service.store_result("Old", "tool_research", {"research_report": "o" * 4000})
+            cache_service.store_result("Newer", "tool_research", {"research_report": "n" * 4000})
+            cache_service.store_result("Newest", "tool_research", {"research_report": "x" * 4000})
+        
+        assert cache_service.evictions == 0 and cache_service.demotions >= 1
+        for topic in ("Old", "Newer", "Newest"):
+            assert cache_service.get_cached_result(topic, "tool_research") is not None
+
+
+class TestLocalCache:
+    """Test suite for the in-process L1 in front of Redis"""
+    
+    def test_repeat_hits_are_served_locally(self, cache_service):
+        """After one Redis read, exact repeats skip the embedding and Redis; hits are counted per tier"""
+        cache_service.store_result("Fusion", "tool_research", {"research_report": "r", "sources": [{"title": "A"}]})
+        first = cache_service.get_cached_result("Fusion", "tool_research")
+        
+        with patch.object(cache_service, '_generate_embedding', side_effect=AssertionError("embedded")), \
+             patch.object(cache_service.redis_client, 'hgetall', side_effect=AssertionError("Redis read")):
+            second = cache_service.get_cached_result("Fusion", "tool_research")
+        second["sources"].append("mutated")
+        
+        assert second["research_report"] == first["research_report"] == "r"
+        assert cache_service.get_cached_result("Fusion", "tool_research")["sources"] == [{"title": "A"}]
+        assert cache_service.tier_hits == {"l1": 2, "redis": 1, "cold": 0}
+        assert cache_service.get_memory_stats()["hit_distribution"]["2-4"] == 1  # L1 hits flushed to Redis
+    
+    def test_deleted_entry_is_not_reread_into_l1(self, cache_service):
+        """The invalidation is announced only once the entry is gone from Redis"""
+        cache_service.store_result("Fusion", "tool_research", {"research_report": "r"})
+        key = cache_service.find_cached_entry("Fusion", "tool_research")
+        cache_service.read_cached_fields(key)
+        invalidate_local = cache_service._invalidate_local
+        rereads = []
+        
+        def invalidate_then_reread(message):
+            # A replica handling the message and immediately serving the topic again
+            invalidate_local(message)
+            rereads.append(cache_service.read_cached_fields(key))
+        
+        with patch.object(cache_service, '_invalidate_local', side_effect=invalidate_then_reread):
+            cache_service.invalidate_cache()
+        
+        assert rereads == [None]
+        assert cache_service.local_cache.stats()["entries"] == 0
+    
+    def test_lifetime_capped_by_redis_ttl(self, cache_service):
+        """An L1 copy never outlives its Redis entry"""
+        cache_service.store_result("Fusion", "tool_research", {"research_report": "r"}, ttl=2)
+        key = cache_service.find_cached_entry("Fusion", "tool_research")
+        cache_service.read_cached_fields(key)
+        
+        assert cache_service.local_cache.get(key).expires_at <= time.monotonic() + 2
+    
+    def test_invalidation_reaches_other_replicas(self, cache_service):
+        """A write or DELETE on one replica drops the L1 copy on the others over pub/sub"""
+        import fakeredis
+        from app.services.cache_service import CacheService
+        
+        server = fakeredis.FakeServer()
+        replicas = []
+        for _ in range(2):
+            replica = CacheService()
+            replica.enabled = True
+            replica.redis_client = fakeredis.FakeRedis(server=server)
+            replica._generate_embedding = cache_service._generate_embedding
+            replica.start_invalidation_listener()
+            replicas.append(replica)
+        writer, reader = replicas
+        try:
+            writer.store_result("Fusion", "tool_research", {"research_report": "old"})
+            assert reader.get_cached_result("Fusion", "tool_research") == {"research_report": "old"}
+            
+            writer.store_result("Fusion", "tool_research", {"research_report": "new"})
+            deadline = time.monotonic() + 5
+            while reader.local_cache.stats()["entries"] and time.monotonic() < deadline:
+                time.sleep(0.05)
+            assert reader.get_cached_result("Fusion", "tool_research") == {"research_report": "new"}
+            
+            writer.invalidate_cache()
+            while reader.local_cache.stats()["entries"] and time.monotonic() < deadline:
+                time.sleep(0.05)
+            assert reader.get_cached_result("Fusion", "tool_research") is None
+        finally:
+            for replica in replicas:
+                replica.stop_invalidation_listener()
+    
+    def test_lru_by_bytes_and_stale_reads_are_not_kept(self):
+        """The byte bound drops least recently used entries (flushing their hits); reads racing an invalidation are not kept"""
+        dropped = []
+        local = LocalCache(max_bytes=100, max_ttl=60, on_drop=lambda key, hits: dropped.append((key, hits)))
+        local.put("a", {"v": 1}, 60, ttl=60, generation=0)
+        local.get("a").pending_hits = 3
+        local.put("b", {"v": 2}, 60, ttl=60, generation=0)
+        
+        assert local.get("a") is None and local.bytes == 60
+        assert dropped == [("a", 3)]
+        
+        generation = local.generation
+        local.invalidate(["b"])
+        assert local.put("b", {"v": 2}, 60, ttl=60, generation=generation) is False
+
+
+class TestQuantizedEmbeddings:
+    """Test suite for quantized embedding storage and scoring"""
+    
+    @staticmethod
+    def near_threshold_pairs(count: int, low: float = 0.93, high: float = 0.97):
+        """Cached topic -> query pairs whose exact cosine similarity straddles 0.95"""
+        rng = np.random.default_rng(7)
+        vectors, pairs = {}, []
+        for i, target in enumerate(np.linspace(low, high, count)):
+            base = rng.standard_normal(384).astype(np.float32)
+            base /= np.linalg.norm(base)
+            noise = rng.standard_normal(384).astype(np.float32)
+            noise -= noise.dot(base) * base
+            noise /= np.linalg.norm(noise)
+            vectors[f"cached {i}"] = base
+            vectors[f"query {i}"] = (target * base + np.sqrt(1 - target ** 2) * noise).astype(np.float32)
+            pairs.append((f"cached {i}", f"query {i}", float(vectors[f"query {i}"].dot(base))))
+        return vectors, pairs
+    
+    @pytest.mark.parametrize("dtype,size", [("float32", 1536), ("float16", 768), ("int8", 388)])
+    def test_stored_size(self, cache_service, dtype, size):
+        """int8 stores a quarter of float32 plus its scale; float16 half"""
+        with patch('app.core.config.settings.CACHE_EMBEDDING_DTYPE', dtype):
+            cache_service.store_result("Fusion", "tool_research", {"research_report": "r"})
+        key = cache_service.find_cached_entry("Fusion", "tool_research")
+        
+        assert cache_service.redis_client.strlen(key + ":embedding") == size
+    
+    def test_entries_of_every_layout_are_scored_together(self, cache_service):
+        """Switching the dtype keeps older entries matchable"""
+        for dtype, topic in [("float32", "Fusion"), ("float16", "Qubits"), ("int8", "Graphene")]:
+            with patch('app.core.config.settings.CACHE_EMBEDDING_DTYPE', dtype):
+                cache_service.store_result(topic, "tool_research", {"research_report": topic})
+        
+        for topic in ("Fusion", "Qubits", "Graphene"):
+            cache_service.local_cache.invalidate()
+            assert cache_service.get_cached_result(topic, "tool_research") == {"research_report": topic}
+    
+    @pytest.mark.parametrize("dtype", ["float16", "int8"])
+    def test_decisions_match_float32_at_the_threshold(self, cache_service, dtype):
+        """Across pairs straddling 0.95, quantized scores stay within the margin and re-ranking makes every decision exact"""
+        vectors, pairs = self.near_threshold_pairs(60)
+        cache_service._generate_embedding = lambda text: vectors[text]
+        with patch('app.core.config.settings.CACHE_EMBEDDING_DTYPE', dtype):
+            for cached, _, _ in pairs:
+                cache_service.store_result(cached, "tool_research", {"research_report": cached})
+        
+        keys = [f"cache:tool_research:{cache_service._get_topic_hash(cached)}" for cached, _, _ in pairs]
+        blobs = cache_service.redis_client.mget([k + ":embedding" for k in keys])
+        matrix = cache_service._decode_embeddings(blobs, 384)
+        for (cached, query, exact), row in zip(pairs, matrix):
+            assert abs(float(row.dot(vectors[query]) / np.linalg.norm(row)) - exact) < settings.CACHE_RERANK_MARGIN / 2
+        
+        for cached, query, exact in pairs:
+            match = cache_service.find_cached_entry(query, "tool_research", threshold=0.95)
+            assert (match is not None) == (exact >= 0.95), (cached, exact)
+            if match is not None:
+                assert match.endswith(cache_service._get_topic_hash(cached))
+    
+    def test_clear_decisions_skip_the_rerank(self, cache_service):
+        """Only scores near the threshold re-embed candidate topics"""
+        cache_service.store_result("Fusion", "tool_research", {"research_report": "r"})
+        cache_service.local_cache.invalidate()
+        embed = cache_service._generate_embedding
+        calls = []
+        cache_service._generate_embedding = lambda text: calls.append(text) or embed(text)
+        
+        assert cache_service.find_cached_entry("Fusion", "tool_research") is not None
+        assert cache_service.find_cached_entry("Unrelated topic", "tool_research") is None
+        assert calls == ["Fusion", "Unrelated topic"]  # The queries only
+
+
+class TestStageCache:
+    """Test suite for stage-level caching of intermediate artifacts"""
+    
+    def test_stage_namespaces_are_separate(self, cache_service):
+        """Stage entries should not leak into final-result lookups or other stages"""
+        cache_service.store_stage_result("plan", "Topic", ["Search", "Write"])
+        
+        assert cache_service.get_stage_result("plan", "Topic") == ["Search", "Write"]
+        assert cache_service.get_stage_result("research", "Topic") is None
+        assert cache_service.get_cached_result("Topic", "multi_agent") is None
+    
+    def test_exact_match_stage_skips_embedding(self, cache_service):
+        """Report-keyed stages should match on exact text without an embedding sidecar"""
+        cache_service.store_stage_result("html", "# Report", "<h1>Report</h1>")
+        
+        assert cache_service.get_stage_result("html", "# Report") == "<h1>Report</h1>"
+        assert cache_service.get_stage_result("html", "# Other report") is None
+        assert not [k for k in cache_service.redis_client.keys("cache:stage:html:*") if k.endswith(b":embedding")]
+    
+    @pytest.mark.asyncio
+    async def test_workflow_reuses_cached_stages(self, cache_service):
+        """Tool research should skip agents whose stage output is cached"""
+        from unittest.mock import AsyncMock, patch
+        from app.workflows.tool_research import ToolResearchWorkflow
+        
+        cache_service.store_stage_result("research", "Topic", {"report": "Cached report", "sources": [{"title": "A", "url": "https://a.org"}]})
+        cache_service.store_stage_result("reflection", "Cached report", {"reflection": "Good", "revised_report": "Revised"})
+        cache_service.store_stage_result("html", "Revised", "<p>Revised</p>")
+        
+        workflow = ToolResearchWorkflow()
+        with patch('app.workflows.tool_research.cache_service', cache_service), \
+             patch('app.core.config.settings.HTML_RENDER_MODE', "llm"), \
+             patch('app.agents.research_agent.ResearchAgent.execute', new_callable=AsyncMock) as mock_research:
+            result = await workflow.execute("Topic")
+        
+        mock_research.assert_not_called()
+        workflow.client.chat.completions.create.assert_not_called()
+        assert result["revised_report"] == "Revised"
+        assert result["html_output"] == "<p>Revised</p>"
+        assert result["sources"] == [{"title": "A", "url": "https://a.org"}]
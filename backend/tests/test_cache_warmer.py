@@ -0,0 +1,111 @@
+import asyncio
+import json
+import pytest
+from unittest.mock import patch
+from app.services.admission import AdmissionController
+from app.services.metrics_service import MetricsService
+from app.workflows.cache_warmer import CacheWarmer, WarmupError
+
+
+@pytest.fixture
+def metrics(tmp_path):
+    service = MetricsService()
+    service.metrics_file = tmp_path / "metrics.json"
+    service.topics_file = tmp_path / "topic_metrics.json"
+    return service
+
+
+@pytest.fixture
+def warm_env(cache_service, metrics):
+    """Warmer wired to a fake-Redis cache, isolated metrics and an idle admission controller"""
+    calls = []
+
+    async def execute(self, topic, export_format="html"):
+        calls.append(topic)
+        await asyncio.sleep(0)
+        return {"research_report": f"Report on {topic}", "sources": [], "status": "completed"}
+
+    controller = AdmissionController(max_concurrent=8, queue_size=8, queue_timeout=1)
+    with patch('app.workflows.cache_warmer.cache_service', cache_service), \
+         patch('app.workflows.batch.cache_service', cache_service), \
+         patch('app.workflows.cache_warmer.metrics_service', metrics), \
+         patch('app.workflows.batch.admission_controller', controller), \
+         patch('app.workflows.batch.ToolResearchWorkflow.execute', execute):
+        yield calls
+
+
+class TestPopularTopics:
+    """Test suite for mining popular topics from request counts"""
+
+    def test_most_requested_first(self, metrics):
+        """Topics are ranked by request count, case-insensitively, above the minimum"""
+        for topic in ["Fusion", "fusion", "Fusion", "Qubits", "Qubits", "Rare"]:
+            metrics.record_topic("tool_research", topic)
+        metrics.record_topic("multi_agent", "Fusion")
+
+        popular = metrics.popular_topics("tool_research", limit=10, min_requests=2)
+
+        assert [p["topic"] for p in popular] == ["Fusion", "Qubits"]
+        assert popular[0]["requests"] == 3
+
+    def test_counts_survive_restart_and_merge_metrics_file(self, metrics, tmp_path):
+        """Saved counts are reloaded and workflow runs from the metrics file count too"""
+        metrics.record_topic("tool_research", "Fusion")
+        metrics.save_topic_counts()
+        metrics.metrics_file.write_text(json.dumps([{"workflow_type": "tool_research", "topic": "Fusion"}]))
+
+        restarted = MetricsService()
+        restarted.metrics_file = metrics.metrics_file
+        restarted.topics_file = metrics.topics_file
+
+        assert restarted.popular_topics("tool_research", limit=5) == [{"topic": "Fusion", "requests": 2}]
+
+
+class TestCacheWarmer:
+    """Test suite for cache warm-ups"""
+
+    @pytest.mark.asyncio
+    async def test_warms_mined_topics_into_the_cache(self, warm_env, metrics, cache_service):
+        """Popular topics are run and cached; a second warm-up finds them cached"""
+        for topic in ["Fusion", "Fusion", "Qubits", "Qubits", "Rare"]:
+            metrics.record_topic("tool_research", topic)
+        warmer = CacheWarmer()
+
+        batch = warmer.start(limit=10)
+        await batch._task
+
+        assert sorted(warm_env) == ["Fusion", "Qubits"]
+        assert cache_service.get_cached_result("Fusion", "tool_research")["research_report"] == "Report on Fusion"
+        status = warmer.status()
+        assert status["source"] == "metrics" and status["counts"] == {"completed": 2}
+        assert all(item["result"] is None for item in batch.items)  # Results live in the cache
+
+        await warmer.start(topics=["Fusion"])._task
+        assert warmer.status()["counts"] == {"cached": 1}
+        assert len(warm_env) == 2
+
+    @pytest.mark.asyncio
+    async def test_refresh_reruns_cached_topics(self, warm_env, cache_service):
+        """With refresh, cached topics are run again"""
+        cache_service.store_result("Fusion", "tool_research", {"research_report": "Old"})
+        warmer = CacheWarmer()
+
+        await warmer.start(topics=["Fusion"], refresh=True)._task
+
+        assert warm_env == ["Fusion"]
+        assert cache_service.get_cached_result("Fusion", "tool_research")["research_report"] == "Report on Fusion"
+
+    @pytest.mark.asyncio
+    async def test_one_warmup_at_a_time(self, warm_env):
+        """Starting a second warm-up while one runs is refused"""
+        warmer = CacheWarmer()
+        batch = warmer.start(topics=["Fusion"])
+
+        with pytest.raises(WarmupError):
+            warmer.start(topics=["Qubits"])
+        await batch._task
+
+    def test_nothing_to_warm(self, warm_env):
+        """Without a list or popular topics there is nothing to start"""
+        with pytest.raises(WarmupError):
+            CacheWarmer().start()
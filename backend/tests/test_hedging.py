@@ -0,0 +1,86 @@
+import asyncio
+import pytest
+from unittest.mock import patch
+from app.services.hedging import HedgePolicy, HedgeStats
+from app.services.resilience import dependencies
+
+
+@pytest.fixture(autouse=True)
+def hedging_on():
+    dependencies.reset()
+    with patch('app.core.config.settings.LLM_HEDGING', True), \
+         patch('app.core.config.settings.LLM_HEDGE_MIN_SAMPLES', 5):
+        yield
+    dependencies.reset()
+
+
+def warmed_policy(latency: float = 0.01, credit: float = 1.0) -> HedgePolicy:
+    policy = HedgePolicy()
+    stats = HedgeStats()
+    stats.latencies.extend([latency] * 10)
+    policy.stats["decide"] = stats
+    policy._credit = credit
+    return policy
+
+
+class TestHedgePolicy:
+    """Test suite for hedged OpenAI requests"""
+
+    @pytest.mark.asyncio
+    async def test_slow_primary_is_hedged_and_cancelled(self):
+        """A call slower than p95 gets a duplicate; the first response wins and the loser is cancelled"""
+        policy = warmed_policy()
+        attempts = []
+        cancelled = asyncio.Event()
+
+        async def create(**kwargs):
+            attempts.append(kwargs)
+            if len(attempts) == 1:
+                try:
+                    await asyncio.sleep(5)
+                except asyncio.CancelledError:
+                    cancelled.set()
+                    raise
+                return "primary"
+            return "hedge"
+
+        result = await policy.call("decide", create, model="gpt-4o-mini")
+        await asyncio.wait_for(cancelled.wait(), timeout=1)
+
+        assert result == "hedge"
+        assert len(attempts) == 2
+        snapshot = policy.snapshot()["decide"]
+        assert snapshot["hedges"] == 1 and snapshot["win_rate"] == 1.0
+
+    @pytest.mark.asyncio
+    async def test_budget_caps_extra_requests(self):
+        """Without hedge credit a slow call simply waits for its only request"""
+        policy = warmed_policy(credit=0.0)
+        calls = 0
+
+        async def create(**kwargs):
+            nonlocal calls
+            calls += 1
+            await asyncio.sleep(0.05)
+            return "primary"
+
+        assert await policy.call("decide", create) == "primary"
+        assert calls == 1
+        assert policy.snapshot()["decide"]["hedges"] == 0
+
+    @pytest.mark.asyncio
+    async def test_no_hedge_before_enough_samples(self):
+        """The threshold needs LLM_HEDGE_MIN_SAMPLES latencies first"""
+        policy = HedgePolicy()
+        policy._credit = 5.0
+        calls = 0
+
+        async def create(**kwargs):
+            nonlocal calls
+            calls += 1
+            return "ok"
+
+        for _ in range(3):
+            await policy.call("planner", create)
+        assert calls == 3
+        assert policy.snapshot()["planner"]["threshold_ms"] is None
@@ -0,0 +1,87 @@
+import time
+import pytest
+from unittest.mock import AsyncMock, patch
+from app.utils import render_report_html, sanitize_html
+
+
+SOURCES = [
+    {"title": "Quantum Supremacy Paper", "url": "https://arxiv.org/abs/1910.11333"},
+    {"title": "Quantum computing - Wikipedia", "url": "https://en.wikipedia.org/wiki/Quantum_computing"},
+]
+
+
+class TestRenderReportHtml:
+    """Test suite for the deterministic Markdown -> HTML renderer"""
+    
+    def test_renders_full_document(self):
+        """Output should be a complete HTML document with the report's heading as title"""
+        html = render_report_html("# Quantum Computing\n\n## Introduction\n\nQubits **matter**.")
+        
+        assert html.startswith("<!DOCTYPE html>")
+        assert "<title>Quantum Computing</title>" in html
+        assert "<h2>Introduction</h2>" in html
+        assert "<strong>matter</strong>" in html
+        assert "<style>" in html
+    
+    def test_citations_link_to_references(self):
+        """Numeric citations should link to the numbered references list"""
+        html = render_report_html("Results were confirmed [1] and extended [2], not [7].", SOURCES)
+        
+        assert '<a href="#ref-1">[1]</a>' in html
+        assert '<a href="#ref-2">[2]</a>' in html
+        assert "[7]" in html and 'href="#ref-7"' not in html
+        assert '<li id="ref-1"><a href="https://arxiv.org/abs/1910.11333">Quantum Supremacy Paper</a></li>' in html
+    
+    def test_bare_urls_are_linkified(self):
+        """Bare URLs in text should become anchors"""
+        html = render_report_html("See https://example.org/paper for details.")
+        assert '<a href="https://example.org/paper">https://example.org/paper</a>' in html
+    
+    def test_renders_quickly(self):
+        """A long report should render in milliseconds, not LLM seconds"""
+        report = "# Report\n\n" + "\n\n".join(f"## Section {i}\n\n" + "Lorem ipsum dolor sit amet. " * 60 for i in range(10))
+        start = time.perf_counter()
+        render_report_html(report, SOURCES)
+        assert time.perf_counter() - start < 1.0
+
+
+class TestSanitizeHtml:
+    """Test suite for the HTML sanitizing pass"""
+    
+    def test_strips_scripts_and_event_handlers(self):
+        """Scripts, handlers and javascript: URLs should never survive"""
+        html = sanitize_html('<p onclick="x()">Hi<script>alert(1)</script></p><a href="javascript:alert(1)">x</a><iframe src="e"></iframe>')
+        
+        assert html == '<p>Hi</p><a>x</a>'
+    
+    def test_unknown_tags_keep_text_escaped(self):
+        """Disallowed tags are dropped but their text is kept and escaped"""
+        assert sanitize_html("<blink>a < b</blink>") == "a &lt; b"
+
+
+class TestHtmlRenderMode:
+    """Test suite for local vs LLM HTML conversion in ToolResearchWorkflow"""
+    
+    @pytest.mark.asyncio
+    async def test_local_mode_skips_llm(self):
+        """Default mode should not call the LLM for HTML"""
+        from app.workflows.tool_research import ToolResearchWorkflow
+        
+        workflow = ToolResearchWorkflow()
+        html = await workflow._render_html("# Title\n\nBody", sources=SOURCES)
+        
+        workflow.client.chat.completions.create.assert_not_called()
+        assert "<h1>Title</h1>" in html
+    
+    @pytest.mark.asyncio
+    async def test_llm_mode_uses_conversion(self):
+        """llm mode should keep the original chat-completion conversion"""
+        from app.workflows.tool_research import ToolResearchWorkflow
+        
+        workflow = ToolResearchWorkflow()
+        with patch('app.core.config.settings.HTML_RENDER_MODE', "llm"), \
+             patch.object(workflow, '_convert_to_html', new_callable=AsyncMock) as mock_convert:
+            mock_convert.return_value = "<html>llm</html>"
+            html = await workflow._render_html("# Title")
+        
+        assert html == "<html>llm</html>"
@@ -0,0 +1,68 @@
+import json
+import pytest
+from app.utils import IncrementalJSONObjectParser
+
+
+def _feed_all(parser, chunks):
+    events = []
+    for chunk in chunks:
+        events += parser.feed(chunk)
+    return events
+
+
+class TestIncrementalJSONObjectParser:
+    """Test suite for streamed structured-output parsing"""
+
+    def test_reflection_completes_before_report_streams(self):
+        """The first field should close as soon as its quote does, the second should stream"""
+        payload = json.dumps({"reflection": "Needs sources.", "revised_report": "# Title\n\nBody text."})
+        parser = IncrementalJSONObjectParser()
+
+        events = _feed_all(parser, [payload[i:i + 7] for i in range(0, len(payload), 7)])
+
+        kinds = [(kind, field) for kind, field, _ in events]
+        assert kinds.index(("complete", "reflection")) < kinds.index(("delta", "revised_report"))
+        deltas = "".join(v for kind, field, v in events if kind == "delta" and field == "revised_report")
+        assert deltas == "# Title\n\nBody text."
+        assert parser.fields == json.loads(payload)
+        assert parser.done
+
+    @pytest.mark.parametrize("text", ["quote \" and \\ slash", "line\nbreak\ttab", "emoji 😀 and é"])
+    def test_escapes_split_across_chunks(self, text):
+        """Escape sequences (incl. surrogate pairs) split between chunks should decode intact"""
+        payload = json.dumps({"revised_report": text})  # ensure_ascii: non-ASCII as \\uXXXX
+        parser = IncrementalJSONObjectParser()
+
+        events = _feed_all(parser, list(payload))
+
+        deltas = "".join(v for kind, _, v in events if kind == "delta")
+        assert deltas == text
+        assert parser.fields["revised_report"] == text
+
+    @pytest.mark.parametrize("text", ["\\usepackage{amsmath}", "C:\\users\\me", "literal \\uD83D text", "\\\\usepa"])
+    def test_escaped_backslash_before_u_at_chunk_end(self, text):
+        """An escaped backslash followed by "u" is text, not a \\uXXXX escape, wherever the chunk ends"""
+        payload = json.dumps({"revised_report": text})
+        for cut in range(1, len(payload)):
+            parser = IncrementalJSONObjectParser()
+
+            events = _feed_all(parser, [payload[:cut], payload[cut:]])
+
+            assert "".join(v for kind, _, v in events if kind == "delta") == text
+            assert parser.fields["revised_report"] == text
+
+    def test_chunk_ending_in_escaped_backslash_and_u(self):
+        """The reported crash: a chunk ending in "\\\\usepa" decodes instead of raising"""
+        parser = IncrementalJSONObjectParser()
+
+        events = parser.feed('{"a": "x \\\\usepa')
+
+        assert events == [("delta", "a", "x \\usepa")]
+
+    def test_non_string_values_and_truncation(self):
+        """Non-string values are buffered until closed; a truncated stream keeps closed fields only"""
+        parser = IncrementalJSONObjectParser()
+        parser.feed('{"score": 3, "tags": ["a", "b]"], "revised_report": "partial te')
+
+        assert parser.fields == {"score": 3, "tags": ["a", "b]"]}
+        assert not parser.done
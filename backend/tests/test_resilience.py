@@ -0,0 +1,114 @@
+import asyncio
+import pytest
+from unittest.mock import patch
+from app.services.resilience import (
+    CircuitBreaker,
+    Dependency,
+    DependencyUnavailable,
+    call_tool,
+    dependencies,
+    _tool_failure,
+)
+
+
+@pytest.fixture(autouse=True)
+def fresh_dependencies():
+    dependencies.reset()
+    yield
+    dependencies.reset()
+
+
+class TestCircuitBreaker:
+    """Test suite for the per-dependency circuit breaker"""
+
+    def test_opens_then_half_open_probe_closes(self):
+        """Consecutive failures open the circuit; one probe after the cool-down closes it again"""
+        breaker = CircuitBreaker(failure_threshold=2, reset_timeout=0.05)
+        breaker.record_failure()
+        assert breaker.allow()
+        breaker.record_failure()
+        assert breaker.state == "open" and not breaker.allow()
+
+        import time
+        time.sleep(0.06)
+        assert breaker.allow()          # The single half-open probe
+        assert not breaker.allow()      # Others still fail fast
+        breaker.record_success()
+        assert breaker.state == "closed"
+
+
+class TestDependency:
+    """Test suite for breaker + bulkhead guarded calls"""
+
+    @pytest.mark.asyncio
+    async def test_retries_only_dependency_failures_within_deadline(self):
+        """Caller errors are not retried, and no retry starts that the run deadline could not cover"""
+        import httpx
+        import openai
+        from app.core.deadline import deadline_scope
+        from app.services.resilience import _openai_failure
+
+        request = httpx.Request("POST", "https://api.openai.com/v1/chat/completions")
+        errors = {
+            "bad": openai.BadRequestError("Invalid", response=httpx.Response(400, request=request), body=None),
+            "down": openai.InternalServerError("Down", response=httpx.Response(503, request=request), body=None),
+        }
+        calls = []
+
+        async def create(kind):
+            calls.append(kind)
+            raise errors[kind]
+
+        dependency = Dependency("openai", 4, _openai_failure, retries=2)
+        with patch('app.core.config.settings.OPENAI_RETRY_BACKOFF_SECONDS', 0.01):
+            with pytest.raises(openai.BadRequestError):
+                await dependency.call(create, "bad")
+            with pytest.raises(openai.InternalServerError):
+                await dependency.call(create, "down")
+        assert calls == ["bad", "down", "down", "down"]
+
+        calls.clear()
+        with patch('app.core.config.settings.OPENAI_RETRY_BACKOFF_SECONDS', 5.0), deadline_scope(1.0):
+            with pytest.raises(openai.InternalServerError):
+                await dependency.call(create, "down")
+        assert calls == ["down"]
+
+    @pytest.mark.asyncio
+    async def test_bulkhead_rejects_when_full(self):
+        """Calls beyond the concurrency limit and wait line should fail fast"""
+        with patch('app.core.config.settings.BULKHEAD_QUEUE_SIZE', 0):
+            dependency = Dependency("slow", 1, _tool_failure, threaded=True)
+        release = asyncio.Event()
+
+        async def hold():
+            await release.wait()
+            return ["ok"]
+
+        first = asyncio.create_task(dependency.call(hold))
+        await asyncio.sleep(0)
+        with pytest.raises(DependencyUnavailable) as exc:
+            await dependency.call(hold)
+        assert exc.value.reason == "bulkhead full"
+
+        release.set()
+        assert await first == ["ok"]
+        assert dependency.snapshot()["rejections"] == {"circuit_open": 0, "bulkhead_full": 1}
+
+    @pytest.mark.asyncio
+    async def test_open_circuit_returns_tool_error_without_calling(self):
+        """A tool behind an open circuit should return an error result the model can route around"""
+        calls = []
+
+        def wikipedia_search_tool(query, max_results=5):
+            calls.append(query)
+            return [{"error": "Connection reset"}]
+
+        with patch('app.core.config.settings.BREAKER_FAILURE_THRESHOLD', 2):
+            for _ in range(3):
+                result = await call_tool(wikipedia_search_tool, query="q")
+
+        assert len(calls) == 2
+        assert "temporarily unavailable" in result[0]["error"]
+        snapshot = dependencies.snapshot()["wikipedia"]
+        assert snapshot["state"] == "open"
+        assert snapshot["rejections"]["circuit_open"] == 1
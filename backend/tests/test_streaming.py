@@ -0,0 +1,310 @@
+import asyncio
+import json
+import time
+import pytest
+from unittest.mock import AsyncMock, Mock, patch
+from app.api.routes.streaming import (
+    EventChannel,
+    stream_workflow_progress,
+    stream_cached_result,
+    parse_sse_event,
+    CACHE_CHUNK_CHARS,
+)
+
+
+def _frame(payload: dict) -> str:
+    return "data: " + json.dumps(payload) + "\n\n"
+
+
+class TestEventChannel:
+    """Test suite for the bounded producer/consumer channel"""
+
+    @pytest.mark.asyncio
+    async def test_progress_events_are_coalesced_when_full(self):
+        """A full channel should keep only the newest progress event"""
+        channel = EventChannel(maxsize=2)
+
+        await channel.put(_frame({"type": "step_complete"}), "step_complete")
+        await channel.put(_frame({"type": "progress", "n": 1}), "progress")
+        await channel.put(_frame({"type": "progress", "n": 2}), "progress")
+        await channel.close()
+
+        frames = []
+        while (frame := await channel.get()) is not None:
+            frames.append(parse_sse_event(frame))
+
+        assert frames == [{"type": "step_complete"}, {"type": "progress", "n": 2}]
+        assert channel.coalesced == 1
+
+    @pytest.mark.asyncio
+    async def test_non_progress_events_wait_for_space(self):
+        """Result events should apply backpressure instead of being dropped"""
+        channel = EventChannel(maxsize=1)
+        await channel.put(_frame({"type": "step_complete", "n": 1}), "step_complete")
+
+        blocked = asyncio.create_task(channel.put(_frame({"type": "step_complete", "n": 2}), "step_complete"))
+        await asyncio.sleep(0.01)
+        assert not blocked.done()
+
+        await channel.get()
+        await asyncio.wait_for(blocked, timeout=1)
+        assert len(channel) == 1
+
+
+class TestStreamWorkflowProgress:
+    """Test suite for the decoupled SSE writer"""
+
+    @pytest.mark.asyncio
+    async def test_keepalive_sent_while_workflow_is_idle(self):
+        """Writer should emit keepalive comments during long silent stages"""
+
+        async def slow_workflow(workflow, topic, **kwargs):
+            await asyncio.sleep(0.05)
+            yield _frame({"type": "step_complete", "step": "formatting", "data": {"revised_report": "ok"}})
+
+        cache = Mock()
+        cache.find_cached_entry.return_value = None
+
+        with patch('app.api.routes.streaming.stream_tool_research_workflow', slow_workflow), \
+             patch('app.core.config.settings.STREAM_HEARTBEAT_SECONDS', 0.01):
+            frames = [f async for f in stream_workflow_progress("tool_research", "Topic", Mock(), cache)]
+
+        assert ": keepalive\n\n" in frames
+        assert parse_sse_event(frames[-1]) == {"type": "complete"}
+        cache.store_result.assert_called_once_with("Topic", "tool_research", {"revised_report": "ok"})
+
+    @pytest.mark.asyncio
+    async def test_stream_metrics_recorded(self):
+        """Each stream should record time-to-first-byte and queue depth"""
+        from app.services.metrics_service import metrics_service
+
+        cache = Mock()
+        cache.find_cached_entry.return_value = "cache:tool_research:abc"
+        cache.list_cached_fields.return_value = ["revised_report"]
+        cache.read_cached_fields.return_value = {"revised_report": "cached"}
+
+        frames = [f async for f in stream_workflow_progress("tool_research", "Topic", Mock(), cache)]
+
+        assert parse_sse_event(frames[0])["type"] == "start"
+        metric = metrics_service.stream_metrics[-1]
+        assert metric["ttfb_ms"] is not None
+        assert metric["max_queue_depth"] >= 1
+
+
+class TestCachedReplay:
+    """Test suite for progressive cache-hit delivery"""
+
+    @pytest.mark.asyncio
+    async def test_summary_first_then_chunked_bodies(self, cache_service):
+        """Cache hits should send plan/sources first and large bodies as chunked field events"""
+        html = "x" * (CACHE_CHUNK_CHARS + 10)
+        cache_service.store_result("Topic", "tool_research", {
+            "html_output": html,
+            "sources": [{"title": "A", "url": "https://a.org"}],
+            "revised_report": "Report"
+        })
+        cache_key = cache_service.find_cached_entry("Topic", "tool_research")
+
+        events = [parse_sse_event(e) async for e in stream_cached_result(cache_service, cache_key)]
+
+        assert events[0]["type"] == "cache_hit"
+        assert events[0]["data"] == {"sources": [{"title": "A", "url": "https://a.org"}]}
+        assert events[1] == {"type": "cache_field", "field": "revised_report", "data": "Report"}
+        html_chunks = [e for e in events if e.get("field") == "html_output"]
+        assert len(html_chunks) == 2
+        assert html_chunks[1]["append"] is True
+        assert "".join(e["data"] for e in html_chunks) == html
+
+    @pytest.mark.asyncio
+    async def test_repeat_replay_is_served_from_l1(self, cache_service):
+        """A replayed hit fills L1, so the next replay of the entry does not read Redis"""
+        from unittest.mock import patch
+        cache_service.store_result("Topic", "tool_research", {"sources": [], "revised_report": "Report"})
+        cache_key = cache_service.find_cached_entry("Topic", "tool_research")
+
+        first = [parse_sse_event(e) async for e in stream_cached_result(cache_service, cache_key)]
+        with patch.object(cache_service.redis_client, 'hgetall', side_effect=AssertionError("Redis read")), \
+             patch.object(cache_service.redis_client, 'hmget', side_effect=AssertionError("Redis read")):
+            second = [parse_sse_event(e) async for e in stream_cached_result(cache_service, cache_key)]
+
+        assert [e["type"] for e in second] == [e["type"] for e in first]
+        assert second[-1] == {"type": "cache_field", "field": "revised_report", "data": "Report"}
+        assert cache_service.tier_hits == {"l1": 1, "redis": 1, "cold": 0}
+
+    @pytest.mark.asyncio
+    async def test_cold_entry_is_promoted_before_the_hit_is_announced(self, cache_service, tmp_path):
+        """Demoted fields are brought back first; a payload no replica holds replays nothing (a normal run follows)"""
+        from app.services.cold_store import ColdStore
+        cache_service.local_cache = None
+        cache_service.cold_store = ColdStore(str(tmp_path / "cold.sqlite3"))
+        try:
+            for topic in ("Kept", "Lost"):
+                cache_service.store_result(topic, "tool_research", {"sources": [], "revised_report": topic * 2000})
+                assert cache_service.demote_entry(cache_service.find_cached_entry(topic, "tool_research"))
+            kept = cache_service.find_cached_entry("Kept", "tool_research")
+            lost = cache_service.find_cached_entry("Lost", "tool_research")
+            cache_service.cold_store.delete(lost)
+            
+            replay = [parse_sse_event(e) async for e in stream_cached_result(cache_service, kept)]
+            assert replay[-1] == {"type": "cache_field", "field": "revised_report", "data": "Kept" * 2000}
+            assert cache_service.promotions == 1 and cache_service.tier_hits["cold"] == 1
+            assert [e async for e in stream_cached_result(cache_service, lost)] == []
+        finally:
+            cache_service.cold_store.close()
+
+    @pytest.mark.asyncio
+    async def test_stale_entry_is_flagged(self, cache_service):
+        """Past the soft TTL the cache_hit event says the entry is stale and being refreshed"""
+        from app.services.cache_service import META_STORED_AT
+        cache_service.store_result("Topic", "tool_research", {"revised_report": "Report"})
+        cache_key = cache_service.find_cached_entry("Topic", "tool_research")
+        cache_service.redis_client.hset(cache_key, META_STORED_AT, json.dumps(time.time() - 8 * 86400))
+        cache_service.revalidator = lambda key, topic, workflow_type: True
+
+        events = [parse_sse_event(e) async for e in stream_cached_result(cache_service, cache_key)]
+
+        assert events[0]["stale"] is True and events[0]["revalidating"] is True
+        assert events[0]["age_seconds"] >= 8 * 86400
+
+
+class TestPipelinedStages:
+    """Test suite for pipelined revision -> section rendering"""
+
+    def test_splitter_completes_sections_at_headings(self):
+        """Sections should close at the next heading, ignoring headings inside code fences"""
+        from app.workflows.pipeline import MarkdownSectionSplitter
+
+        splitter = MarkdownSectionSplitter()
+        completed = []
+        for delta in ["# Title\nIntro\n## A", "\nText a\n```\n# not a heading\n```\n", "## B\nText b"]:
+            completed += splitter.feed(delta)
+
+        assert completed == ["# Title\nIntro\n", "## A\nText a\n```\n# not a heading\n```\n"]
+        assert splitter.flush() == "## B\nText b"
+
+    @pytest.mark.asyncio
+    async def test_pipelined_revision_streams_sections(self):
+        """Pipelined mode should emit partial section events and assemble the final HTML"""
+        from app.api.routes.streaming import stream_tool_research_workflow
+        from app.workflows.tool_research import ToolResearchWorkflow
+
+        async def fake_stream(self, draft, reflection):
+            for delta in ["# Report\n\nIntro text.\n", "## Findings\n\nResult [1].\n"]:
+                yield delta
+
+        workflow = ToolResearchWorkflow()
+        with patch('app.agents.research_agent.ResearchAgent.execute', new=AsyncMock(return_value="Draft")), \
+             patch('app.agents.reflection_agent.ReflectionAgent.execute', new=AsyncMock(return_value="Critique")), \
+             patch('app.agents.revision_agent.RevisionAgent.stream', new=fake_stream):
+            events = [parse_sse_event(e) async for e in stream_tool_research_workflow(workflow, "Topic", pipelined=True)]
+
+        partials = [e for e in events if e["type"] == "partial"]
+        assert [p["index"] for p in partials] == [0, 1]
+        assert partials[1]["data"].startswith("## Findings")
+
+        final = events[-1]["data"]
+        assert final["revised_report"] == "# Report\n\nIntro text.\n## Findings\n\nResult [1].\n"
+        assert "<h2>Findings</h2>" in final["html_output"]
+        assert "<title>Report</title>" in final["html_output"]
+
+
+class TestCombinedReflectRevise:
+    """Test suite for the single-call reflect+revise stage"""
+
+    @staticmethod
+    def _stream_response(payload: str, size: int = 9):
+        async def chunks():
+            for i in range(0, len(payload), size):
+                yield Mock(usage=None, choices=[Mock(delta=Mock(content=payload[i:i + size]))])
+        return chunks()
+
+    @pytest.mark.asyncio
+    async def test_reflection_sent_before_revision_streams(self):
+        """Combined mode should make one LLM call, send the reflection first and stream the revision"""
+        from app.api.routes.streaming import stream_tool_research_workflow
+        from app.workflows.tool_research import ToolResearchWorkflow
+
+        payload = json.dumps({"reflection": "Critique", "revised_report": "# Report\n\nLine one.\nLine two."})
+        workflow = ToolResearchWorkflow()
+        workflow.client.chat.completions.create = AsyncMock(return_value=self._stream_response(payload))
+
+        with patch('app.agents.research_agent.ResearchAgent.execute', new=AsyncMock(return_value="Draft")), \
+             patch('app.agents.reflection_agent.ReflectionAgent.execute', new=AsyncMock()) as reflect, \
+             patch('app.agents.revision_agent.RevisionAgent.execute', new=AsyncMock()) as revise:
+            events = [parse_sse_event(e) async for e in
+                      stream_tool_research_workflow(workflow, "Topic", combined_reflection=True, pipelined=False)]
+
+        reflect.assert_not_called()
+        revise.assert_not_called()
+        kwargs = workflow.client.chat.completions.create.call_args.kwargs
+        assert kwargs["stream"] is True
+        assert kwargs["response_format"]["type"] == "json_schema"
+
+        steps = [(e["type"], e.get("step")) for e in events]
+        assert steps.index(("step_complete", "reflection")) < steps.index(("partial", "revised"))
+        partials = [e for e in events if e["type"] == "partial"]
+        assert all(p["append"] for p in partials)
+        assert "".join(p["data"] for p in partials) == "# Report\n\nLine one.\nLine two."
+        assert events[-1]["data"]["reflection"] == "Critique"
+
+    @pytest.mark.asyncio
+    async def test_truncated_stream_resets_partial_revision(self):
+        """Falling back after a truncated stream should clear the appended text before the new revision"""
+        from app.api.routes.streaming import stream_tool_research_workflow
+        from app.workflows.tool_research import ToolResearchWorkflow
+
+        payload = '{"reflection": "Critique", "revised_report": "# Half\\nof a rev'
+        workflow = ToolResearchWorkflow()
+        workflow.client.chat.completions.create = AsyncMock(return_value=self._stream_response(payload))
+
+        with patch('app.agents.research_agent.ResearchAgent.execute', new=AsyncMock(return_value="Draft")), \
+             patch('app.agents.revision_agent.RevisionAgent.execute', new=AsyncMock(return_value="# Full revision")):
+            events = [parse_sse_event(e) async for e in
+                      stream_tool_research_workflow(workflow, "Topic", combined_reflection=True, pipelined=False)]
+
+        partials = [e for e in events if e["type"] == "partial"]
+        assert partials[0]["append"] and partials[0]["data"] == "# Half\n"
+        assert partials[-1] == {"type": "partial", "step": "revised", "append": False, "reset": True, "data": ""}
+        assert events[-1]["data"]["revised_report"] == "# Full revision"
+
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize("pipelined", [False, True])
+    async def test_api_error_falls_back_to_separate_calls(self, pipelined):
+        """An error mid-stream (dropped connection, open circuit) finishes with the two-call path, not an error event"""
+        from app.api.routes.streaming import stream_tool_research_workflow
+        from app.workflows.tool_research import ToolResearchWorkflow
+
+        async def dropped():
+            async for chunk in self._stream_response('{"reflection": "Critique", "revised_report": "# Half\\n\\nof it\\n## Next\\n'):
+                yield chunk
+            raise ConnectionResetError("stream dropped")
+
+        workflow = ToolResearchWorkflow()
+        workflow.client.chat.completions.create = AsyncMock(return_value=dropped())
+
+        async def revision_stream(self, draft, reflection):
+            yield "# Full revision\n"
+
+        with patch('app.agents.research_agent.ResearchAgent.execute', new=AsyncMock(return_value="Draft")), \
+             patch('app.agents.revision_agent.RevisionAgent.execute', new=AsyncMock(return_value="# Full revision")), \
+             patch('app.agents.revision_agent.RevisionAgent.stream', new=revision_stream):
+            events = [parse_sse_event(e) async for e in
+                      stream_tool_research_workflow(workflow, "Topic", combined_reflection=True, pipelined=pipelined)]
+
+        assert "error" not in [e["type"] for e in events]
+        assert {"type": "partial", "step": "revised", "append": False, "reset": True, "data": ""} in events
+        assert events[-1]["data"]["reflection"] == "Critique"
+        assert events[-1]["data"]["revised_report"].startswith("# Full revision")
+
+    @pytest.mark.asyncio
+    async def test_truncated_blocking_output_keeps_reflection(self):
+        """A truncated JSON response should keep the closed reflection and the original report"""
+        from app.workflows.tool_research import ToolResearchWorkflow
+
+        workflow = ToolResearchWorkflow()
+        response = Mock(usage=None, choices=[Mock(message=Mock(content='{"reflection": "Critique", "revised_report": "Half'))])
+        workflow.client.chat.completions.create = AsyncMock(return_value=response)
+
+        result = await workflow._reflect_and_rewrite("Original")
+
+        assert result == {"reflection": "Critique", "revised_report": "Original"}
@@ -97,5 +97,321 @@ class TestMultiAgentWorkflow:
             # History contains: Step1, Step2, Final synthesis = 3 total
             assert len(result.get("history", [])) == 3
             assert len(result.get("plan", [])) == 2  # Plan itself is limited to 2 steps
+    
+    @pytest.mark.asyncio
+    async def test_editor_steps_patch_the_latest_draft(self, mock_openai_client):
+        """In patch mode, editor steps should revise the latest draft instead of rewriting from the prompt"""
+        workflow = MultiAgentWorkflow()
+        
+        async def mock_decide_agent(step):
+            return {"agent": "writer_agent" if step == "Write" else "editor_agent", "task": step}
+        
+        with patch('app.agents.planner_agent.PlannerAgent.execute', new_callable=AsyncMock) as mock_planner, \
+             patch.object(workflow, '_decide_agent', side_effect=mock_decide_agent), \
+             patch('app.agents.writer_agent.WriterAgent.execute', new_callable=AsyncMock) as mock_writer, \
+             patch('app.agents.editor_agent.EditorAgent.execute', new_callable=AsyncMock) as mock_editor, \
+             patch('app.agents.editor_agent.EditorAgent.revise', new_callable=AsyncMock) as mock_revise, \
+             patch('app.core.config.settings.REVISION_MODE', 'patch'):
+            
+            mock_planner.return_value = ["Edit the outline", "Write", "Edit the draft"]
+            mock_writer.return_value = "Article written"
+            mock_editor.return_value = "Notes without a draft"
+            mock_revise.return_value = "Article edited"
+            
+            result = await workflow.execute("AI research")
+            
+            # No draft yet for the first edit step; the second one patches the writer's output
+            mock_editor.assert_called_once()
+            mock_revise.assert_awaited_once_with("Article written", "Edit the draft")
+            assert result["history"][2]["output"] == "Article edited"
+
+
+
+
+class TestSpeculativePlanning:
+    """Test suite for planning overlapped with the cache lookup"""
+    
+    @pytest.mark.asyncio
+    async def test_plan_runs_during_cache_lookup(self, mock_openai_client):
+        """The planner should start before the (slow) cache lookup finishes and feed the run"""
+        import asyncio
+        import time
+        from app.api.routes.streaming import stream_workflow_progress, parse_sse_event
+        from app.services.metrics_service import metrics_service
+        
+        async def slow_plan(self, topic):
+            await asyncio.sleep(0.1)
+            return ["Research the topic"]
+        
+        def slow_lookup(topic, workflow_type):
+            time.sleep(0.1)
+            return None
+        
+        cache = Mock()
+        cache.find_cached_entry.side_effect = slow_lookup
+        workflow = MultiAgentWorkflow(max_steps=1)
+        
+        with patch('app.core.config.settings.SPECULATIVE_PLANNING', True), \
+             patch('app.agents.planner_agent.PlannerAgent.execute', new=slow_plan), \
+             patch.object(workflow, '_decide_agent', new=AsyncMock(return_value={"agent": "writer_agent", "task": "t"})), \
+             patch('app.tools.prefetch.ToolPrefetcher.start'):
+            events = [parse_sse_event(e) async for e in
+                      stream_workflow_progress("multi_agent", "Topic", workflow, cache, max_steps=1)]
+        
+        plan_event = next(e for e in events if e and e.get("step") == "plan")
+        assert plan_event["data"] == ["Research the topic"]
+        metric = metrics_service.stage_metrics["speculative_planning"][-1]
+        assert metric["cancelled"] is False
+        assert metric["saved_ms"] > 50  # Most of the plan overlapped the 100 ms lookup
+    
+    @pytest.mark.asyncio
+    async def test_cache_hit_cancels_planner(self):
+        """A cache hit should cancel the speculative planner"""
+        workflow = MultiAgentWorkflow()
+        
+        with patch('app.agents.planner_agent.PlannerAgent.execute', new=AsyncMock(return_value=["Step"])), \
+             patch('app.tools.prefetch.ToolPrefetcher.start'):
+            workflow.speculate("Topic")
+            task = workflow._plan_task
+            workflow.cancel_speculation()
+        
+        assert task.cancelled() or task.cancelling()
+        assert workflow._plan_task is None and workflow._prefetch is None
+
+
+class TestDeadline:
+    """Test suite for the per-run deadline"""
+    
+    @pytest.mark.asyncio
+    async def test_slow_reflection_returns_partial_result(self):
+        """A stage that outlives the deadline should yield status="partial", not a failure"""
+        import asyncio
+        from app.core.deadline import deadline_scope
+        
+        async def slow_reflection(self, report):
+            await asyncio.sleep(5)
+        
+        workflow = ToolResearchWorkflow()
+        with patch('app.agents.research_agent.ResearchAgent.execute', new=AsyncMock(return_value="Research")), \
+             patch.object(ToolResearchWorkflow, '_reflect_and_rewrite', new=slow_reflection):
+            with deadline_scope(0.1):
+                result = await workflow.execute("Topic")
+        
+        assert result["status"] == "partial"
+        assert result["revised_report"] == "Research"
+        assert result["html_output"]
+    
+    @pytest.mark.asyncio
+    async def test_routing_out_of_time_ends_steps_as_partial(self, mock_openai_client):
+        """A routing call that runs out of time stops the plan instead of falling back to writer_agent"""
+        from app.core.deadline import DeadlineExceeded
+        
+        workflow = MultiAgentWorkflow()
+        with patch('app.agents.planner_agent.PlannerAgent.execute', new_callable=AsyncMock) as mock_planner, \
+             patch('app.workflows.multi_agent.hedging.call', new=AsyncMock(side_effect=DeadlineExceeded("openai_rate_limit"))), \
+             patch('app.agents.writer_agent.WriterAgent.execute', new_callable=AsyncMock) as mock_writer:
+            mock_planner.return_value = ["Research the topic", "Write the report"]
+            mock_writer.return_value = "Synthesis"
+            
+            result = await workflow.execute("Topic")
+        
+        assert result["status"] == "partial"
+        assert [item["step"] for item in result["history"]] == ["Final synthesis and polishing"]
+        mock_writer.assert_awaited_once()  # The synthesis only
+    
+    @pytest.mark.asyncio
+    async def test_hung_tool_returns_partial_result_from_other_tools(self, mock_openai_client):
+        """A hung tool is abandoned at its share of the deadline; the agent writes from the others"""
+        import threading
+        from types import SimpleNamespace
+        from app.core.deadline import deadline_scope
+        
+        release = threading.Event()
+        
+        def wikipedia_search_tool(query):
+            release.wait(5)  # Hangs past the run's deadline
+            return [{"title": "Late", "url": "https://late.org"}]
+        
+        def arxiv_search_tool(query):
+            return [{"title": "Paper", "url": "https://arxiv.org/abs/1"}]
+        
+        def tool_call(call_id, name):
+            return SimpleNamespace(id=call_id, function=SimpleNamespace(name=name, arguments='{"query": "Topic"}'))
+        
+        first = Mock(choices=[Mock(message=Mock(content=None, tool_calls=[
+            tool_call("1", "wikipedia_search_tool"), tool_call("2", "arxiv_search_tool")
+        ]))])
+        final = Mock(choices=[Mock(message=Mock(content="Report from arXiv"))])
+        create = mock_openai_client._test_client.chat.completions.create
+        create.side_effect = [first, final]
+        
+        workflow = ToolResearchWorkflow()
+        workflow.tool_func_mapping = {
+            "wikipedia_search_tool": wikipedia_search_tool,
+            "arxiv_search_tool": arxiv_search_tool
+        }
+        reflection = {"reflection": "Fine", "revised_report": "Report from arXiv"}
+        try:
+            with patch.object(ToolResearchWorkflow, '_reflect_and_rewrite', new=AsyncMock(return_value=reflection)):
+                with deadline_scope(1.0):
+                    result = await workflow.execute("Topic")
+        finally:
+            release.set()
+        
+        assert result["status"] == "partial"
+        assert result["research_report"] == "Report from arXiv"
+        tool_messages = [m for m in create.call_args_list[1].kwargs["messages"] if m["role"] == "tool"]
+        assert "timed out" in tool_messages[0]["content"]
+        assert "arxiv.org" in tool_messages[1]["content"]
+    
+    @pytest.mark.asyncio
+    async def test_retry_backoff_respects_deadline(self):
+        """Tool retries in worker threads should not sleep past the deadline"""
+        import asyncio
+        from app.core.deadline import deadline_scope, DeadlineExceeded
+        from app.tools.wikipedia_tool import _retry
+        
+        def flaky():
+            raise ConnectionError("Connection reset")
+        
+        with deadline_scope(0.5):
+            with pytest.raises(DeadlineExceeded):
+                # Backoff of 1s + 2s would exceed the 0.5s left
+                await asyncio.to_thread(_retry, flaky, 3, 1.0)
+
+
+class TestContextBuilder:
+    """Test suite for the token-budgeted multi-agent context"""
+    
+    def _history(self, steps: int) -> list:
+        filler = "\n\n".join(f"Generic filler paragraph {n} about nothing in particular." * 3 for n in range(8))
+        return [
+            {"step": f"Step {i}", "agent": "research_agent", "output": filler}
+            for i in range(steps)
+        ]
+    
+    @pytest.mark.asyncio
+    async def test_context_stays_within_budget(self, mock_openai_client):
+        """Prompt context is bounded by the token budget whatever the step count"""
+        from app.workflows.context_builder import ContextBuilder, count_tokens
+        
+        builder = ContextBuilder()
+        small = await builder.build(self._history(2), "filler", budget=400)
+        large = await builder.build(self._history(12), "filler", budget=400)
+        
+        assert count_tokens(small) <= 400
+        assert count_tokens(large) <= 400
+        assert large.count("executed by") < 12
+    
+    @pytest.mark.asyncio
+    async def test_selects_relevant_chunks(self, mock_openai_client):
+        """Chunks relevant to the task are kept over unrelated ones"""
+        from app.workflows.context_builder import ContextBuilder
+        
+        history = self._history(3)
+        history[0]["output"] += "\n\nKey finding: photonic qubits reach 99.9% gate fidelity."
+        
+        context = await ContextBuilder().build(history, "photonic qubits gate fidelity", budget=250)
+        
+        assert "photonic qubits reach 99.9% gate fidelity" in context
+        assert context.startswith("Step 1 executed by research_agent:")
+    
+    @pytest.mark.asyncio
+    async def test_older_steps_summarized(self, mock_openai_client):
+        """With CONTEXT_SUMMARIZE, steps before the recent window are replaced by their summary"""
+        from app.workflows.context_builder import ContextBuilder
+        
+        mock_openai_client._test_response.choices[0].message.content = "Summary of early work"
+        with patch('app.core.config.settings.CONTEXT_SUMMARIZE', True), \
+             patch('app.core.config.settings.CONTEXT_RECENT_STEPS', 1), \
+             patch('app.core.config.settings.CONTEXT_SUMMARY_TOKENS', 50):
+            builder = ContextBuilder(mock_openai_client._test_client)
+            context = await builder.build(self._history(2), "anything", budget=5000)
+        
+        assert context.startswith("Step 1 executed by research_agent:\nSummary of early work")
+        assert "Step 2 executed by research_agent:\nGeneric filler" in context
+
+
+class TestPlanOptimizer:
+    """Test suite for the plan optimization pass"""
+    
+    @pytest.mark.asyncio
+    async def test_dedupes_fuses_and_drops_trailing_writer(self):
+        """Duplicate searches merge, consecutive editor steps fuse, the final Markdown step goes"""
+        from app.workflows.plan_optimizer import optimize_plan
+        
+        plan = [
+            "Search for recent papers on quantum error correction",
+            "Search for recent papers on quantum error correction codes",
+            "Draft a summary of the findings",
+            "Review the draft for accuracy",
+            "Revise the draft based on the review",
+            "Generate a Markdown document containing the complete research report",
+        ]
+        optimized, report = await optimize_plan(plan)
+        
+        assert optimized[0] == plan[0]
+        assert optimized[1] == plan[2]
+        assert optimized[2].startswith("Complete these tasks together:")
+        assert len(optimized) == 3
+        assert report == {"duplicates": 1, "fused": 1, "trailing_writer": 1, "llm_calls_saved": 6}
+    
+    @pytest.mark.asyncio
+    async def test_unclassified_steps_untouched(self):
+        """Steps without a recognizable agent are neither fused nor dropped"""
+        from app.workflows.plan_optimizer import optimize_plan
+        
+        optimized, report = await optimize_plan(["Step1", "Step2"])
+        
+        assert optimized == ["Step1", "Step2"]
+        assert report["llm_calls_saved"] == 0
 
 
+class TestConvergence:
+    """Test suite for early termination of refinement steps"""
+    
+    @pytest.mark.asyncio
+    async def test_refinement_stops_once_drafts_converge(self, mock_openai_client):
+        """After a pass that leaves the draft unchanged, later writer/editor steps are skipped"""
+        workflow = MultiAgentWorkflow(max_steps=5)
+        decided = []
+        
+        async def mock_decide_agent(step):
+            decided.append(step)
+            agent = "research_agent" if "Research" in step else "writer_agent" if "Write" in step else "editor_agent"
+            return {"agent": agent, "task": step}
+        
+        with patch('app.core.config.settings.PLAN_OPTIMIZER', False), \
+             patch('app.agents.planner_agent.PlannerAgent.execute', new_callable=AsyncMock) as mock_planner, \
+             patch.object(workflow, '_decide_agent', side_effect=mock_decide_agent), \
+             patch('app.agents.research_agent.ResearchAgent.execute', new_callable=AsyncMock) as mock_research, \
+             patch('app.agents.writer_agent.WriterAgent.execute', new_callable=AsyncMock) as mock_writer, \
+             patch('app.agents.editor_agent.EditorAgent.execute', new_callable=AsyncMock) as mock_editor:
+            mock_planner.return_value = ["Research the topic", "Write a draft", "Edit the draft", "Polish the draft", "Review the draft"]
+            mock_research.return_value = "Findings"
+            mock_writer.return_value = "The final article text."
+            mock_editor.return_value = "The final article text."
+            
+            result = await workflow.execute("Topic")
+        
+        history = result["history"]
+        assert decided == ["Research the topic", "Write a draft", "Edit the draft"]
+        assert mock_editor.await_count == 1
+        assert [item.get("skipped", False) for item in history[:5]] == [False, False, False, True, True]
+        assert history[3]["output"].startswith("Converged: editor_agent output 100.0% similar")
+    
+    @pytest.mark.asyncio
+    async def test_changes_past_the_embedding_window_count(self):
+        """A long draft whose tail was rewritten has not converged, even if its embeddings match"""
+        from app.workflows.convergence import ConvergenceDetector
+        
+        opening = " ".join(f"Sentence {i} of the unchanged opening section." for i in range(120))
+        previous = opening + " " + " ".join(f"Old closing point {i}." for i in range(40))
+        current = opening + " " + " ".join(f"Revised conclusion with new evidence {i}." for i in range(40))
+        truncating_model = Mock(encode=Mock(return_value=[[1.0, 0.0], [1.0, 0.0]]))  # Sees the opening only
+        detector = ConvergenceDetector()
+        
+        with patch('app.services.cache_service.cache_service.model', truncating_model):
+            await detector.observe("writer_agent", previous)
+            assert await detector.observe("editor_agent", current) is False
+            assert await detector.observe("editor_agent", current) is True
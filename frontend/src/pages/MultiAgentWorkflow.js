@@ -114,13 +114,25 @@ const MultiAgentWorkflow = () => {
           setCurrentStep(null);
           setProgressMessage('');
         },
+        onCacheProgress: (data) => {
+          setResult({
+            plan: data.plan || [],
+            history: data.history || [],
+            final_report: data.final_report || '',
+            sources: data.sources || [],
+            cacheHit: true,
+            cacheStale: Boolean(data.cacheStale)
+          });
+          setLoading(false);
+        },
         onCacheHit: (data) => {
           const cacheResult = {
             plan: data.plan || [],
             history: data.history || [],
             final_report: data.final_report || '',
             sources: data.sources || [],
-            cacheHit: true
+            cacheHit: true,
+            cacheStale: Boolean(data.cacheStale)
           };
           setResult(cacheResult);
           const executionTime = Date.now() - startTime;
@@ -514,7 +526,9 @@ const MultiAgentWorkflow = () => {
               </ReactMarkdown>
             </div>
             {result.cacheHit && (
-              <p className="text-sm text-green-600 mt-4">Cache hit - instant result</p>
+              <p className="text-sm text-green-600 mt-4">
+                Cache hit - instant result{result.cacheStale && ' (older copy, refreshing in the background)'}
+              </p>
             )}
             {!loading && (
               <div className="flex justify-end mt-4 pt-4 border-t border-gray-100">
@@ -104,6 +104,10 @@ const ToolResearchWorkflow = () => {
           setCurrentStep(null);
           setProgressMessage('');
         },
+        onCacheProgress: (data) => {
+          setResult({ ...data, cacheHit: true });
+          setLoading(false);
+        },
         onCacheHit: (data) => {
           const cacheResult = { ...data, cacheHit: true };
           setResult(cacheResult);
@@ -550,7 +554,9 @@ const ToolResearchWorkflow = () => {
                     ⏱️ Execution time: <span className="font-semibold">{result.execution_time?.toFixed(2)}s</span>
                   </p>
                   {result.cacheHit && (
-                    <p className="text-sm text-green-600 mt-1">Cache hit - instant result</p>
+                    <p className="text-sm text-green-600 mt-1">
+                      Cache hit - instant result{result.cacheStale && ' (older copy, refreshing in the background)'}
+                    </p>
                   )}
                 </div>
                 {result.sources && (
@@ -11,6 +11,8 @@ export function streamWorkflow(workflowType, params, callbacks) {
   const url = `${API_URL}/workflows/${workflowType}/stream?${queryParams}`;
   
   const eventSource = new EventSource(url);
+  // Progressive cache hits arrive as a summary followed by field-level events
+  let cachedResult = null;
   
   eventSource.onopen = () => {
     console.log(`[SSE] Connected to ${workflowType} stream`);
@@ -27,10 +29,27 @@ export function streamWorkflow(workflowType, params, callbacks) {
           
         case 'cache_hit':
           console.log('[SSE] Cache hit - instant results');
-          if (callbacks.onCacheHit) {
+          if (data.progressive) {
+            // Stale entries (past the soft TTL) are served while the server refreshes them
+            cachedResult = { ...data.data, cacheStale: Boolean(data.stale) };
+            if (callbacks.onCacheProgress) {
+              callbacks.onCacheProgress({ ...cachedResult });
+            }
+          } else if (callbacks.onCacheHit) {
             callbacks.onCacheHit(data.data);
           }
           break;
+
+        case 'cache_field':
+          if (cachedResult) {
+            cachedResult[data.field] = data.append
+              ? (cachedResult[data.field] || '') + data.data
+              : data.data;
+            if (callbacks.onCacheProgress) {
+              callbacks.onCacheProgress({ ...cachedResult });
+            }
+          }
+          break;
           
         case 'progress':
           if (callbacks.onProgress) {
@@ -38,6 +57,14 @@ export function streamWorkflow(workflowType, params, callbacks) {
           }
           break;
           
+        case 'partial':
+          // Streamed revision: a finished section (pipelined) or text to append (combined reflect+revise)
+          // (reset: true discards the revised text received so far; the revision restarts)
+          if (callbacks.onPartial) {
+            callbacks.onPartial(data);
+          }
+          break;
+
         case 'step_complete':
           if (callbacks.onStepComplete) {
             callbacks.onStepComplete(data);
@@ -46,6 +73,9 @@ export function streamWorkflow(workflowType, params, callbacks) {
           
         case 'complete':
           console.log('[SSE] Workflow completed');
+          if (cachedResult && callbacks.onCacheHit) {
+            callbacks.onCacheHit(cachedResult);
+          }
           if (callbacks.onComplete) {
             callbacks.onComplete();
           }